@@ -4,8 +4,21 @@ from flask_wtf import CSRFProtect
 from flask_talisman import Talisman
 import os
 
-from app.database import init_db, close_connection
+from app.database import close_connection, ensure_db_initialized, get_pool, init_db_command
 from app.extensions import limiter  # Rate limiter
+from app.model_registry import warm_up
+
+
+# --- Esquema e limpeza de jobs no startup ---
+# Com preload_app roda no master do gunicorn: a conexão usada volta ao pool no
+# fim do contexto e é fechada em seguida, para não atravessar o fork dos workers.
+def init_on_startup(app):
+    from app.jobs import fail_stale_jobs
+    with app.app_context():
+        ensure_db_initialized()
+        fail_stale_jobs()
+    with app.app_context():
+        get_pool().close()
 
 
 def create_app(testing=False):
@@ -17,11 +30,68 @@ def create_app(testing=False):
     app.config['DATABASE'] = 'users.db'
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=30)
 
+    # Uploads acima deste tamanho são processados em streaming, em chunks de linhas
+    app.config['STREAMING_THRESHOLD_BYTES'] = int(os.getenv('STREAMING_THRESHOLD_BYTES', 20 * 1024 * 1024))
+    app.config['PREDICTION_CHUNK_SIZE'] = int(os.getenv('PREDICTION_CHUNK_SIZE', 50_000))
+
+    # Uploads processados em background por um pool de threads (ver app/jobs.py)
+    app.config['ASYNC_PREDICTIONS'] = os.getenv('ASYNC_PREDICTIONS', 'true').lower() == 'true'
+    app.config['JOB_WORKERS'] = int(os.getenv('JOB_WORKERS', 2))
+    # Job na fila/em execução sem atualização por mais que isso perdeu o worker
+    app.config['JOB_STALE_SECONDS'] = int(os.getenv('JOB_STALE_SECONDS', 30 * 60))
+
+    # Limiar de decisão: probabilidade de 'satisfied' acima dele vira rótulo 'satisfied'
+    app.config['DECISION_THRESHOLD'] = float(os.getenv('DECISION_THRESHOLD', 0.5))
+
+    # Número máximo de registros por requisição em /api/v1/predict
+    app.config['API_MAX_BATCH_SIZE'] = int(os.getenv('API_MAX_BATCH_SIZE', 10_000))
+
+    # Tokens de serviço aceitos pela API em 'Authorization: Bearer <token>',
+    # separados por vírgula (sem tokens, só a sessão do navegador autentica)
+    app.config['API_TOKENS'] = [t.strip() for t in os.getenv('API_TOKENS', '').split(',') if t.strip()]
+
+    # Micro-batching de /api/v1/predict/one: registros que chegam dentro da janela
+    # (tempo ou tamanho) são previstos numa única chamada ao modelo (ver app/batching.py)
+    app.config['MICROBATCH_MAX_SIZE'] = int(os.getenv('MICROBATCH_MAX_SIZE', 64))
+    app.config['MICROBATCH_MAX_WAIT_MS'] = float(os.getenv('MICROBATCH_MAX_WAIT_MS', 5))
+    app.config['MICROBATCH_TIMEOUT'] = float(os.getenv('MICROBATCH_TIMEOUT', 10))
+
+    # Cache de resultados por conteúdo do CSV + versão do modelo (ver app/result_cache.py).
+    # Sem RESULT_CACHE_DIR as entradas ficam em <UPLOAD_FOLDER>/cache.
+    app.config['RESULT_CACHE_ENABLED'] = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+    app.config['RESULT_CACHE_DIR'] = os.getenv('RESULT_CACHE_DIR')
+    app.config['RESULT_CACHE_MAX_BYTES'] = int(os.getenv('RESULT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+    # Exportações em CSV para downloads retomados (Range) em <UPLOAD_FOLDER>/downloads
+    app.config['DOWNLOAD_EXPORTS_MAX_BYTES'] = int(os.getenv('DOWNLOAD_EXPORTS_MAX_BYTES', 1024 * 1024 * 1024))
+
+    # Cria/migra o esquema do banco uma vez no startup (também via 'flask init-db')
+    app.config['DB_INIT_ON_STARTUP'] = os.getenv('DB_INIT_ON_STARTUP', 'true').lower() == 'true'
+
+    # Cache em memória do usuário logado (ver app/auth.py); TTL 0 desabilita
+    app.config['USER_CACHE_TTL'] = float(os.getenv('USER_CACHE_TTL', 30))
+    app.config['USER_CACHE_SIZE'] = int(os.getenv('USER_CACHE_SIZE', 1024))
+
+    # Contadores do rate limiter num SQLite local, compartilhado pelos workers
+    # do gunicorn (ver app/limiter_storage.py); aceita também memory://, redis://...
+    app.config['RATELIMIT_STORAGE_URI'] = os.getenv(
+        'RATELIMIT_STORAGE_URI',
+        'memory://' if testing else 'sqlite:///' + os.path.join(app.instance_path, 'ratelimit.db')
+    )
+
+    # Carrega os modelos e faz uma predição de teste já no startup (ver app/model_registry.py)
+    app.config['MODEL_WARMUP'] = os.getenv('MODEL_WARMUP', 'false').lower() == 'true'
+
     if testing:
         app.config['TESTING'] = True
         app.config['WTF_CSRF_ENABLED'] = False
         app.config['DATABASE'] = ':memory:'
         app.config['UPLOAD_FOLDER'] = os.path.join(app.root_path, 'tests', 'uploads')
+        app.config['ASYNC_PREDICTIONS'] = False
+        app.config['MODEL_WARMUP'] = False
+        app.config['RESULT_CACHE_ENABLED'] = False
+        app.config['DB_INIT_ON_STARTUP'] = False
+        app.config['USER_CACHE_TTL'] = 0
 
     # Detecta ambiente pela variável FLASK_ENV (default: development)
     env = os.getenv('FLASK_ENV', 'development')  # <-- aqui foi alterado para 'development'
@@ -65,11 +135,16 @@ def create_app(testing=False):
     from app.prediction import prediction
     from app.history import history_bp
     from app.admin import admin_bp
+    from app.api import api
 
     app.register_blueprint(auth, url_prefix='/auth')
     app.register_blueprint(prediction, url_prefix='/prediction')
     app.register_blueprint(history_bp, url_prefix='/history')
     app.register_blueprint(admin_bp, url_prefix='/admin')
+    app.register_blueprint(api, url_prefix='/api/v1')
+
+    # A API é consumida por outros serviços (JSON/Arrow), sem formulário com token CSRF
+    csrf.exempt(api)
 
     # Redireciona '/' para '/prediction'
     @app.route('/')
@@ -78,5 +153,12 @@ def create_app(testing=False):
 
     # Fecha conexão com DB ao encerrar contexto
     app.teardown_appcontext(close_connection)
+    app.cli.add_command(init_db_command)
+
+    if app.config['DB_INIT_ON_STARTUP']:
+        init_on_startup(app)
+
+    if app.config['MODEL_WARMUP']:
+        warm_up()
 
     return app
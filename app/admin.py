@@ -1,8 +1,8 @@
 from flask import Blueprint, render_template, abort, request, g
 from functools import wraps
-import math
-from app.database import get_db
-from app.auth import login_required
+import re
+from app.database import SEARCH_INDEXES, get_db
+from app.auth import invalidate_user, login_required
 from flask import redirect, url_for, flash
 from app.extensions import limiter
 
@@ -54,6 +54,8 @@ def admin_edit(table, record_id):
             values
         )
         db.commit()
+        if table == 'users':
+            invalidate_user(record_id)
 
         # ✅ Mensagem flash + redirecionamento para admin_table
         flash("Alteração concluída!", "success")
@@ -73,6 +75,51 @@ def admin_edit(table, record_id):
     )
 
 
+# Abaixo deste número de linhas o COUNT(*) exato é barato o bastante
+EXACT_COUNT_LIMIT = 100_000
+PER_PAGE = 50
+
+
+# --- Número de registros da tabela sem varrê-la inteira ---
+# O intervalo de ids (MIN/MAX saem direto da árvore do rowid) é um limite
+# superior que só erra pelas linhas apagadas; em tabelas pequenas conta de fato.
+# Retorna (total, exato?).
+def estimate_row_count(cursor, table):
+    # Subconsultas separadas: juntas no mesmo SELECT o SQLite varre a tabela
+    cursor.execute(f"SELECT (SELECT MIN(id) FROM {table}), (SELECT MAX(id) FROM {table})")
+    low, high = cursor.fetchone()
+    if low is None:
+        return 0, True
+    span = high - low + 1
+    if span <= EXACT_COUNT_LIMIT:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        return cursor.fetchone()[0], True
+    return span, False
+
+
+# A coluna tem índice de busca FTS5 (criado pela migração, se houver FTS5)?
+def search_indexed(cursor, table, column):
+    if column not in SEARCH_INDEXES.get(table, ()):
+        return False
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f"{table}_fts",))
+    return cursor.fetchone() is not None
+
+
+# Expressão MATCH restrita à coluna: cada palavra vira um token com prefixo.
+# Pontuação é descartada, como faz o tokenizador; None se não sobrar nenhuma.
+def fts_query(search, column):
+    tokens = re.findall(r'\w+', search)
+    if not tokens:
+        return None
+    terms = ' '.join(f'"{token}"*' for token in tokens)
+    return f"{column} : ({terms})"
+
+
+def _cursor_arg(name):
+    value = request.args.get(name, type=int)
+    return value if value is not None and value >= 0 else None
+
+
 @admin_bp.route('/table/<table>')
 @login_required
 @limiter.limit("50 per minute")
@@ -88,38 +135,57 @@ def admin_table(table):
     cursor.execute(f"PRAGMA table_info({table})")
     columns = [col[1] for col in cursor.fetchall()]
 
-    # Parâmetros da busca
+    # Parâmetros da busca (a coluna vai para o SQL, então só aceita colunas da tabela)
     search = request.args.get('search', '').strip()
     column = request.args.get('column', columns[0] if columns else 'id')
-
-    # Paginação
-    page = max(int(request.args.get('page', 1)), 1)
-    per_page = 50
-    offset = (page - 1) * per_page
-
-    # Consulta com filtro de busca, se informado
-    if search and column:
-        like = f"%{search}%"
-        cursor.execute(
-            f"SELECT * FROM {table} WHERE {column} LIKE ? LIMIT ? OFFSET ?",
-            (like, per_page, offset)
-        )
-        rows = cursor.fetchall()
-        cursor.execute(
-            f"SELECT COUNT(*) FROM {table} WHERE {column} LIKE ?",
-            (like,)
-        )
-        total = cursor.fetchone()[0]
+    if column not in columns:
+        column = 'id'
+
+    # Paginação por chave (keyset) sobre o id: ?after=<último id> avança e
+    # ?before=<primeiro id> volta, sempre com custo de uma página, seja qual for
+    # a profundidade. O antigo ?page=N é aceito e leva à primeira página.
+    after = _cursor_arg('after')
+    before = _cursor_arg('before') if after is None else None
+
+    # Colunas com índice FTS5 buscam por tokens com prefixo ("ana sil" acha
+    # "Ana Silva") direto no índice; as demais, ou sem FTS5, continuam com LIKE
+    source, id_col = table, 'id'
+    conditions, params = [], []
+    match = fts_query(search, column) if search and search_indexed(cursor, table, column) else None
+    if match:
+        fts = f"{table}_fts"
+        source, id_col = f"{fts} JOIN {table} ON {table}.id = {fts}.rowid", f"{fts}.rowid"
+        conditions.append(f"{fts} MATCH ?")
+        params.append(match)
+    elif search and column:
+        conditions.append(f"{column} LIKE ?")
+        params.append(f"%{search}%")
+    if after is not None:
+        conditions.append(f"{id_col} > ?")
+        params.append(after)
+    elif before is not None:
+        conditions.append(f"{id_col} < ?")
+        params.append(before)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    order = 'DESC' if before is not None else 'ASC'
+
+    # Uma linha a mais indica se existe outra página na mesma direção
+    cursor.execute(
+        f"SELECT {table}.* FROM {source} {where} ORDER BY {id_col} {order} LIMIT ?",
+        params + [PER_PAGE + 1]
+    )
+    rows = cursor.fetchall()
+    more = len(rows) > PER_PAGE
+    rows = rows[:PER_PAGE]
+    if before is not None:
+        rows.reverse()
+        has_prev, has_next = more, True
     else:
-        cursor.execute(
-            f"SELECT * FROM {table} LIMIT ? OFFSET ?",
-            (per_page, offset)
-        )
-        rows = cursor.fetchall()
-        cursor.execute(f"SELECT COUNT(*) FROM {table}")
-        total = cursor.fetchone()[0]
+        has_prev, has_next = after is not None, more
 
-    total_pages = math.ceil(total / per_page) if total else 1
+    # Sem busca mostra o total (estimado nas tabelas grandes); com busca, contar
+    # as ocorrências exigiria varrer a tabela, então não é exibido
+    total, total_exact = (None, True) if search else estimate_row_count(cursor, table)
 
     return render_template(
         'admin/table.html',
@@ -128,8 +194,10 @@ def admin_table(table):
         rows=rows,
         search=search,
         column=column,
-        page=page,
-        total_pages=total_pages
+        prev_cursor=rows[0]['id'] if rows and has_prev else None,
+        next_cursor=rows[-1]['id'] if rows and has_next else None,
+        total=total,
+        total_exact=total_exact
     )
 
 from flask import flash, redirect, url_for
@@ -152,6 +220,8 @@ def admin_delete(table, record_id):
 
     cursor.execute(f"DELETE FROM {table} WHERE id = ?", (record_id,))
     db.commit()
+    if table == 'users':
+        invalidate_user(record_id)
 
     flash('Registro deletado com sucesso!', 'success')
     return redirect(url_for('admin.admin_table', table=table))
@@ -0,0 +1,159 @@
+from concurrent.futures import TimeoutError
+from functools import wraps
+import hmac
+import io
+
+from flask import Blueprint, Response, request, session, jsonify, current_app as app
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app.auth import skip_user_lookup
+from app.batching import get_batcher
+from app.model_registry import get_model_assets
+from app.features import engineer_features
+from app.pipeline import predict_frame
+
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+# Blueprint da API JSON (registrado em /api/v1)
+api = Blueprint('api', __name__)
+
+
+# Token de serviço do cabeçalho 'Authorization: Bearer <token>' é um dos API_TOKENS?
+def _valid_api_token():
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return False
+    # Comparação em tempo constante, contra todos os tokens configurados
+    matches = [hmac.compare_digest(token.encode(), valid.encode()) for valid in app.config['API_TOKENS']]
+    return any(matches)
+
+
+# Como login_required, mas responde 401 em JSON em vez de redirecionar. Aceita
+# a sessão do navegador ou, para outros serviços, um token de API.
+def api_login_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not session.get('user_id') and not _valid_api_token():
+            return jsonify(error='Autenticação necessária.'), 401
+        return f(*args, **kwargs)
+    return decorated
+
+
+class PayloadError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Lê o lote de passageiros do corpo da requisição ---
+# JSON colunar: {"data": {"Age": [25, 40], "Class": ["Eco", "Business"], ...}}
+# ou um stream IPC do Arrow (Content-Type application/vnd.apache.arrow.stream).
+def _read_batch():
+    if request.mimetype == ARROW_MIMETYPE:
+        try:
+            table = pa.ipc.open_stream(request.get_data()).read_all()
+        except pa.ArrowInvalid as e:
+            raise PayloadError(f'Payload Arrow inválido: {e}')
+        return table.to_pandas()
+
+    if not request.is_json:
+        raise PayloadError(f'Content-Type deve ser application/json ou {ARROW_MIMETYPE}.', 415)
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('data'), dict):
+        raise PayloadError('Envie um objeto JSON com o campo "data" no formato {coluna: [valores]}.')
+    try:
+        return pd.DataFrame(payload['data'])
+    except ValueError as e:
+        raise PayloadError(f'Colunas inválidas: {e}')
+
+
+# --- Monta a resposta no mesmo formato (JSON colunar ou Arrow) ---
+def _build_response(ids, labels, probas):
+    if request.accept_mimetypes.best == ARROW_MIMETYPE:
+        columns = {'prediction': labels, 'probability': probas}
+        if ids is not None:
+            columns = {'id': ids, **columns}
+        table = pa.table(columns)
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(sink.getvalue(), mimetype=ARROW_MIMETYPE)
+
+    body = {
+        'count': len(labels),
+        'prediction': labels.tolist(),
+        'probability': probas.tolist()
+    }
+    if ids is not None:
+        body['id'] = ids.tolist()
+    return jsonify(body)
+
+
+# --- Predição em lote: só features + preprocessor.transform + predict_proba ---
+# Sem EDA, gráficos, banco ou template.
+@api.route('/predict', methods=['POST'])
+@skip_user_lookup
+@api_login_required
+def predict():
+    try:
+        df = _read_batch()
+    except PayloadError as e:
+        return jsonify(error=str(e)), e.status
+
+    if df.empty:
+        return jsonify(error='O lote está vazio.'), 400
+    max_batch = app.config['API_MAX_BATCH_SIZE']
+    if len(df) > max_batch:
+        return jsonify(error=f'Lote com {len(df)} registros; o máximo é {max_batch}.'), 413
+
+    ids = df['id'].to_numpy() if 'id' in df.columns else None
+    assets = get_model_assets()
+    try:
+        engineer_features(df)
+        predict_frame(
+            df, assets.model, assets.preprocessor, assets.label_encoder, assets.feature_columns,
+            app.config['DECISION_THRESHOLD']
+        )
+    except (KeyError, ValueError, TypeError) as e:
+        return jsonify(error=f'Registros inválidos: {e}'), 400
+
+    return _build_response(
+        ids,
+        df['prediction'].to_numpy(dtype=object),
+        df['probability'].to_numpy(dtype=np.float64)
+    )
+
+
+# --- Predição de um único registro, agrupada com requisições concorrentes ---
+# Corpo: o registro do passageiro como objeto JSON ({"Age": 34, "Class": "Eco", ...})
+@api.route('/predict/one', methods=['POST'])
+@skip_user_lookup
+@api_login_required
+def predict_one():
+    batcher = get_batcher()
+    # Em andamento desde já: um lote aberto por outra requisição espera por esta
+    with batcher.in_flight() as slot:
+        record = request.get_json(silent=True)
+        if not isinstance(record, dict) or not record:
+            return jsonify(error='Envie o registro do passageiro como um objeto JSON.'), 400
+
+        try:
+            result = batcher.predict(record, timeout=app.config['MICROBATCH_TIMEOUT'], slot=slot)
+        except TimeoutError:
+            return jsonify(error='Tempo esgotado aguardando a predição.'), 504
+        except (KeyError, ValueError, TypeError) as e:
+            return jsonify(error=f'Registro inválido: {e}'), 400
+
+    if 'id' in record:
+        result = {'id': record['id'], **result}
+    return jsonify(result)
+
+
+# Métricas do micro-batching deste processo
+@api.route('/predict/stats')
+@skip_user_lookup
+@api_login_required
+def predict_stats():
+    return jsonify(get_batcher().stats())
@@ -1,9 +1,12 @@
-from flask import Blueprint, request, render_template, redirect, url_for, session, flash, g
+from flask import Blueprint, request, render_template, redirect, url_for, session, flash, g, current_app
+from collections import OrderedDict
 from functools import wraps
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
 import sqlite3
-from app.database import get_db, init_db
+import threading
+import time
+from app.database import get_db, ensure_db_initialized
 from app.extensions import limiter
 
 auth = Blueprint('auth', __name__)  # Define um blueprint para as rotas de autenticação
@@ -17,10 +20,84 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated
 
+# --- Marca rotas que não usam g.user (a busca do usuário é pulada) ---
+def skip_user_lookup(f):
+    f.skip_user_lookup = True
+    return f
+
+
+# --- Cache em memória das linhas de usuários (TTL + LRU) ---
+# Evita o SELECT em users a cada requisição. Alterações feitas por este
+# processo invalidam a entrada na hora; as de outros workers aparecem depois
+# de no máximo 'ttl' segundos.
+class UserCache:
+    def __init__(self, max_size=1024, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        row = loader(user_id)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, row)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return row
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+# Um cache por aplicação; None quando desabilitado (USER_CACHE_TTL = 0)
+def get_user_cache():
+    if current_app.config['USER_CACHE_TTL'] <= 0:
+        return None
+    cache = current_app.extensions.get('user_cache')
+    if cache is None:
+        cache = current_app.extensions.setdefault('user_cache', UserCache(
+            current_app.config['USER_CACHE_SIZE'], current_app.config['USER_CACHE_TTL']
+        ))
+    return cache
+
+
+# Chamado por quem altera a tabela users (perfil, login, admin)
+def invalidate_user(user_id=None):
+    cache = get_user_cache()
+    if cache is not None:
+        cache.invalidate(user_id)
+
+
+def _load_user(user_id):
+    return get_db().execute(
+        'SELECT * FROM users WHERE id = ?',
+        (user_id,)
+    ).fetchone()
+
+
 @auth.route('/register', methods=['GET', 'POST'])
 @limiter.limit("10 per minute")
 def register():
-    init_db()
+    ensure_db_initialized()
     if request.method == 'POST':
         username = request.form['username'].strip()
         email = request.form['email'].strip().lower()
@@ -69,7 +146,7 @@ def register():
 @auth.route('/login', methods=['GET', 'POST'])
 @limiter.limit("10 per minute")
 def login():
-    init_db()
+    ensure_db_initialized()
     if request.method == 'POST':
         username = request.form['username'].strip()
         password = request.form['password']
@@ -103,6 +180,7 @@ def login():
                 (user['id'],)
             )
             conn.commit()
+            invalidate_user(user['id'])  # is_admin e demais colunas relidos no login
             session.permanent = True
             session['user_id'] = user['id']
             session['username'] = username
@@ -159,6 +237,7 @@ def profile():
             (new_hash, user_id)
         )
         conn.commit()
+        invalidate_user(user_id)
         flash('Senha atualizada com sucesso!', 'success')
         return redirect(url_for('auth.profile'))
 
@@ -174,10 +253,10 @@ def logout():
 @auth.before_app_request
 def load_logged_in_user():
     user_id = session.get('user_id')
-    if user_id is None:
+    view = current_app.view_functions.get(request.endpoint)
+    # Rotas inexistentes (404), arquivos estáticos e rotas marcadas não precisam do usuário
+    if user_id is None or view is None or request.endpoint == 'static' or getattr(view, 'skip_user_lookup', False):
         g.user = None
-    else:
-        g.user = get_db().execute(
-            'SELECT * FROM users WHERE id = ?',
-            (user_id,)
-        ).fetchone()
+        return
+    cache = get_user_cache()
+    g.user = _load_user(user_id) if cache is None else cache.get(user_id, _load_user)
@@ -0,0 +1,206 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pandas as pd
+from flask import current_app
+
+from app.model_registry import get_model_assets
+from app.features import engineer_features
+from app.pipeline import predict_frame, required_input_columns
+
+
+# --- Métricas do micro-batching (tamanho dos lotes, espera na fila, vazão) ---
+class BatchMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.batches = 0
+        self.records = 0
+        self.max_batch_size = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.inference_seconds = 0.0
+
+    def record(self, batch_size, waits, seconds):
+        with self._lock:
+            self.batches += 1
+            self.records += batch_size
+            self.max_batch_size = max(self.max_batch_size, batch_size)
+            self.total_wait += sum(waits)
+            self.max_wait = max(self.max_wait, max(waits))
+            self.inference_seconds += seconds
+
+    def snapshot(self):
+        with self._lock:
+            records = self.records or 1
+            return {
+                'batches': self.batches,
+                'records': self.records,
+                'avg_batch_size': round(self.records / (self.batches or 1), 2),
+                'max_batch_size': self.max_batch_size,
+                'avg_queue_wait_ms': round(self.total_wait / records * 1000, 3),
+                'max_queue_wait_ms': round(self.max_wait * 1000, 3),
+                'avg_batch_inference_ms': round(self.inference_seconds / (self.batches or 1) * 1000, 3),
+                # Registros por segundo de inferência e desde o início do processo
+                'throughput_rps': round(self.records / self.inference_seconds, 1) if self.inference_seconds else 0.0,
+                'uptime_rps': round(self.records / max(time.time() - self.started_at, 1e-9), 1)
+            }
+
+
+# --- Agrupa predições de registros individuais em lotes ---
+# Requisições concorrentes entram numa fila; uma thread junta os registros que
+# chegam dentro da janela (max_wait segundos ou max_batch_size registros),
+# faz uma única chamada ao pré-processador/modelo e devolve cada resultado ao
+# chamador pelo seu Future. A janela só é esperada se houver outras requisições
+# em andamento no processo (ver in_flight): com workers síncronos do gunicorn
+# (uma requisição por vez) o registro é previsto na hora.
+class MicroBatcher:
+    def __init__(self, max_batch_size=64, max_wait=0.005, threshold=0.5, assets_loader=get_model_assets):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.threshold = threshold
+        self.assets_loader = assets_loader
+        self.metrics = BatchMetrics()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    # --- Requisição de predição em andamento ---
+    # Conta da entrada na view até o resultado do lote ficar pronto, para que o
+    # lote saiba se ainda pode chegar outro registro.
+    @contextmanager
+    def in_flight(self):
+        slot = {'released': False}
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield slot
+        finally:
+            self._release(slot)
+
+    def _release(self, slot):
+        with self._lock:
+            if not slot['released']:
+                slot['released'] = True
+                self._in_flight -= 1
+
+    def submit(self, record, slot=None):
+        future = Future()
+        if slot is not None:
+            # Libera a vaga já na thread do lote, antes de a requisição acordar
+            future.add_done_callback(lambda _: self._release(slot))
+        self._queue.put((record, future, time.perf_counter()))
+        self._ensure_thread()
+        return future
+
+    def predict(self, record, timeout=None, slot=None):
+        if slot is None:
+            with self.in_flight() as slot:
+                return self.submit(record, slot).result(timeout)
+        return self.submit(record, slot).result(timeout)
+
+    def stats(self):
+        return {
+            **self.metrics.snapshot(),
+            'queue_depth': self._queue.qsize(),
+            'in_flight': self._in_flight,
+            'max_batch_size_config': self.max_batch_size,
+            'max_wait_ms_config': self.max_wait * 1000
+        }
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            # A janela começa quando o primeiro registro entrou na fila
+            deadline = items[0][2] + self.max_wait
+            while len(items) < self.max_batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.perf_counter()
+                # Nenhuma outra requisição a caminho: esperar não juntaria nada
+                if remaining <= 0 or self._in_flight <= len(items):
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._score(items)
+
+    def _score(self, items):
+        start = time.perf_counter()
+        waits = [start - enqueued for _, _, enqueued in items]
+        try:
+            assets = self.assets_loader()
+        except Exception as e:
+            for _, future, _ in items:
+                future.set_exception(e)
+            return
+
+        # Registros com colunas faltando são recusados antes de juntar o lote;
+        # caso contrário virariam NaN no DataFrame e seriam previstos assim mesmo
+        required = required_input_columns(assets.preprocessor)
+        valid = []
+        for record, future, _ in items:
+            missing = [c for c in required if c not in record]
+            if missing:
+                future.set_exception(KeyError(f"colunas ausentes: {missing}"))
+            else:
+                valid.append((record, future))
+
+        if valid:
+            try:
+                results = self._predict_records(assets, [record for record, _ in valid])
+            except Exception:
+                # Um registro inválido não deve derrubar o lote inteiro: refaz um a um
+                for record, future in valid:
+                    try:
+                        future.set_result(self._predict_records(assets, [record])[0])
+                    except Exception as e:
+                        future.set_exception(e)
+            else:
+                for (_, future), result in zip(valid, results):
+                    future.set_result(result)
+        self.metrics.record(len(items), waits, time.perf_counter() - start)
+
+    def _predict_records(self, assets, records):
+        df = pd.DataFrame.from_records(records)
+        engineer_features(df)
+        predict_frame(
+            df, assets.model, assets.preprocessor, assets.label_encoder, assets.feature_columns,
+            self.threshold
+        )
+        return [
+            {'prediction': label, 'probability': float(proba)}
+            for label, proba in zip(df['prediction'], df['probability'])
+        ]
+
+
+# Um batcher por processo, criado sob demanda dentro do worker (a thread não
+# sobreviveria a um fork do master do gunicorn)
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = MicroBatcher(
+                max_batch_size=current_app.config['MICROBATCH_MAX_SIZE'],
+                max_wait=current_app.config['MICROBATCH_MAX_WAIT_MS'] / 1000,
+                threshold=current_app.config['DECISION_THRESHOLD']
+            )
+    return _batcher
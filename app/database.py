@@ -1,15 +1,108 @@
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice, repeat
+import click
 from flask import g, current_app
+from flask.cli import with_appcontext
 
-# Função para obter conexão com o banco de dados, respeitando configuração em current_app
+# Pragmas aplicados a toda conexão nova. Em WAL leitores não bloqueiam o
+# escritor (e vice-versa); 'synchronous = NORMAL' é seguro em WAL e evita um
+# fsync por transação. busy_timeout faz a conexão esperar pelo lock de escrita
+# em vez de falhar com "database is locked".
+CONNECTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 10_000,  # ms
+    'cache_size': -16000,  # ~16 MB por conexão
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY'
+}
+
+# Conexões ociosas guardadas por thread (contextos aninhados usam mais de uma)
+POOL_MAX_IDLE = 2
+
+
+# --- Pool de conexões por thread ---
+# Cada thread reaproveita as suas conexões entre requisições, em vez de abrir e
+# fechar uma por contexto. Conexões do SQLite não podem trocar de thread nem
+# atravessar um fork (gunicorn com preload), por isso o pool é local à thread
+# e descartado quando o PID muda.
+class ConnectionPool:
+    def __init__(self, database, pragmas=CONNECTION_PRAGMAS, max_idle=POOL_MAX_IDLE):
+        self.database = database
+        self.pragmas = pragmas
+        self.max_idle = max_idle
+        self.created = 0
+        self.reused = 0
+        self._generation = 0
+        self._pid = os.getpid()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, detect_types=sqlite3.PARSE_DECLTYPES)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        with self._lock:
+            self.created += 1
+        return conn
+
+    # Conexões ociosas desta thread (vazio depois de um fork ou de close())
+    def _idle(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._generation += 1
+        if getattr(self._local, 'generation', None) != self._generation:
+            self._local.generation = self._generation
+            self._local.idle = []
+        return self._local.idle
+
+    def acquire(self):
+        idle = self._idle()
+        if idle:
+            with self._lock:
+                self.reused += 1
+            return idle.pop()
+        return self._connect()
+
+    # Devolve a conexão ao pool, sem transação pendente
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        idle = self._idle()
+        if len(idle) < self.max_idle:
+            idle.append(conn)
+        else:
+            conn.close()
+
+    # Fecha as conexões ociosas desta thread; as das outras são descartadas no próximo uso
+    def close(self):
+        for conn in self._idle():
+            conn.close()
+        self._local.idle = []
+        self._generation += 1
 
+    def stats(self):
+        with self._lock:
+            return {'created': self.created, 'reused': self.reused}
+
+
+# Um pool por aplicação, criado no primeiro uso (depois de DATABASE configurado)
+def get_pool():
+    pool = current_app.extensions.get('sqlite_pool')
+    if pool is None or pool.database != current_app.config['DATABASE']:
+        pool = current_app.extensions['sqlite_pool'] = ConnectionPool(current_app.config['DATABASE'])
+    return pool
+
+
+# Função para obter conexão com o banco de dados, respeitando configuração em current_app
 def get_db():
     if 'db' not in g:
-        g.db = sqlite3.connect(
-            current_app.config['DATABASE'],
-            detect_types=sqlite3.PARSE_DECLTYPES
-        )
-        g.db.row_factory = sqlite3.Row
+        g.db = get_pool().acquire()
     return g.db
 
 
@@ -21,79 +114,208 @@ def initialize_database(app):
         init_db()
     yield
 
-# Função para fechar a conexão ao fim da requisição
+# Devolve a conexão ao pool ao fim da requisição
 def close_connection(e=None):
     db = g.pop('db', None)
     if db is not None:
-        db.close()
-def init_db():
-    db = get_db()
-    cursor = db.cursor()
+        get_pool().release(db)
+# --- Migrações do esquema ---
+# Cada migração leva o banco da versão anterior para a sua; a versão aplicada
+# fica gravada em PRAGMA user_version. Bancos criados antes do controle de
+# versão (user_version = 0) passam pelas mesmas migrações, por isso elas usam
+# IF NOT EXISTS e conferem as colunas antes de alterá-las.
 
-    # Verifica se a tabela 'users' existe
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='users';")
-    table_exists = cursor.fetchone()
+def _migration_1_base_schema(db):
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            failed_attempts INTEGER DEFAULT 0,
+            locked_until DATETIME,
+            created_at DATETIME,
+            is_admin BOOLEAN DEFAULT 0
+        )
+    ''')
+    # Bancos antigos não tinham a coluna is_admin
+    columns = [col[1] for col in db.execute("PRAGMA table_info(users)")]
+    if 'is_admin' not in columns:
+        db.execute("ALTER TABLE users ADD COLUMN is_admin BOOLEAN DEFAULT 0")
 
-    if table_exists:
-        # Verifica se a coluna 'is_admin' existe
-        cursor.execute("PRAGMA table_info(users);")
-        columns = [col[1] for col in cursor.fetchall()]
-        if 'is_admin' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN is_admin BOOLEAN DEFAULT 0;")
-            db.commit()
-    else:
-        # Cria as tabelas, já que não existe a tabela 'users'
-        cursor.executescript('''
-            CREATE TABLE users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                failed_attempts INTEGER DEFAULT 0,
-                locked_until DATETIME,
-                created_at DATETIME,
-                is_admin BOOLEAN DEFAULT 0
-            );
-
-            CREATE TABLE uploads (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                filename TEXT NOT NULL,
-                original_filename TEXT NOT NULL,
-                upload_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-                processed BOOLEAN DEFAULT 0,
-                num_rows INTEGER,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            );
-
-            CREATE TABLE predictions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                upload_id INTEGER NOT NULL,
-                passenger_id TEXT,
-                prediction TEXT,
-                probability REAL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (upload_id) REFERENCES uploads(id)
-            );
-
-            CREATE TABLE logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                action TEXT,
-                details TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            );
-
-            CREATE TABLE user_settings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                preference_name TEXT NOT NULL,
-                preference_value TEXT,
-                FOREIGN KEY (user_id) REFERENCES users(id)
-            );
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS uploads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            filename TEXT NOT NULL,
+            original_filename TEXT NOT NULL,
+            upload_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+            processed BOOLEAN DEFAULT 0,
+            num_rows INTEGER,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            upload_id INTEGER NOT NULL,
+            passenger_id TEXT,
+            prediction TEXT,
+            probability REAL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (upload_id) REFERENCES uploads(id)
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            action TEXT,
+            details TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS user_settings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            preference_name TEXT NOT NULL,
+            preference_value TEXT,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+
+
+# Tabela de jobs de predição em background
+def _migration_2_jobs(db):
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            original_filename TEXT NOT NULL,
+            source_path TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            progress REAL DEFAULT 0,
+            rows_processed INTEGER DEFAULT 0,
+            message TEXT,
+            result_path TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+
+
+# Índices dos caminhos de acesso da aplicação: o histórico filtra uploads por
+# usuário ordenando pela data; predições só são lidas por upload (o rowid/id
+# já faz parte do índice, então ORDER BY id também sai dele)
+def _migration_3_indexes(db):
+    db.execute("CREATE INDEX IF NOT EXISTS idx_uploads_user_date ON uploads (user_id, upload_date)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_predictions_upload ON predictions (upload_id)")
+
+
+# Colunas de texto indexadas para a busca do admin (tabelas FTS5 <tabela>_fts)
+SEARCH_INDEXES = {
+    'users': ['username', 'email'],
+    'uploads': ['original_filename', 'filename'],
+    'logs': ['action', 'details'],
+}
+
+
+def fts5_available(db):
+    return any(row[0] == 'ENABLE_FTS5' for row in db.execute("PRAGMA compile_options"))
+
+
+# Índices FTS5 "external content": guardam só os tokens e leem o texto da
+# própria tabela; triggers os mantêm em sincronia. Opcional: se o SQLite não
+# tiver FTS5 a migração não cria nada e a busca do admin continua com LIKE.
+def _migration_4_search_indexes(db):
+    if not fts5_available(db):
+        current_app.logger.warning("SQLite sem FTS5: busca do admin continuará usando LIKE")
+        return
+    for table, columns in SEARCH_INDEXES.items():
+        fts = f"{table}_fts"
+        cols = ', '.join(columns)
+        new_values = ', '.join(f"new.{col}" for col in columns)
+        old_values = ', '.join(f"old.{col}" for col in columns)
+        db.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+            f"{cols}, content='{table}', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new_values});
+            END
         ''')
-        db.commit()
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+            END
+        ''')
+        # Só alterações nas colunas indexadas (o login atualiza outras colunas de users)
+        db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {fts} (rowid, {cols}) VALUES (new.id, {new_values});
+            END
+        ''')
+        # Indexa as linhas que já existiam
+        db.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+# Jobs guardam o upload que criaram, para que um job interrompido (worker
+# morto) possa ser limpo; o índice atende à varredura de jobs parados
+def _migration_5_job_upload(db):
+    db.execute("ALTER TABLE jobs ADD COLUMN upload_id INTEGER REFERENCES uploads(id)")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_updated ON jobs (status, updated_at)")
+
+
+MIGRATIONS = [
+    (1, 'tabelas iniciais', _migration_1_base_schema),
+    (2, 'jobs de predição em background', _migration_2_jobs),
+    (3, 'índices de uploads e predições', _migration_3_indexes),
+    (4, 'índices de busca FTS5 do admin', _migration_4_search_indexes),
+    (5, 'upload de origem dos jobs', _migration_5_job_upload),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(db):
+    return db.execute("PRAGMA user_version").fetchone()[0]
+
+
+# Aplica as migrações pendentes, cada uma na sua transação (junto com o novo
+# user_version). Retorna as versões aplicadas.
+def migrate(db):
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        if version <= schema_version(db):
+            continue
+        # BEGIN IMMEDIATE pega o lock de escrita: outro processo pode ter migrado antes
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if version <= schema_version(db):
+                db.rollback()
+                continue
+            apply(db)
+            db.execute(f"PRAGMA user_version = {version}")
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        current_app.logger.info(f"Migração {version} aplicada: {description}")
+        applied.append(version)
+    return applied
+
+
+def init_db():
+    db = get_db()
+    migrate(db)
+
+    cursor = db.cursor()
 
     # Atualiza o usuário 'test' para admin, se existir
     try:
@@ -101,3 +323,92 @@ def init_db():
         db.commit()
     except sqlite3.OperationalError as e:
         current_app.logger.error(f"Erro ao definir admin: {e}")
+
+
+def _initialized_databases():
+    return current_app.extensions.setdefault('db_initialized', set())
+
+
+_init_lock = threading.Lock()
+
+
+# --- Inicializa o banco uma única vez por processo ---
+# Normalmente já feito no startup (create_app) ou por 'flask init-db'; aqui
+# fica só a checagem em memória, sem consulta nem escrita no banco. Um banco
+# ':memory:' é diferente a cada conexão, então é sempre inicializado.
+def ensure_db_initialized():
+    database = current_app.config['DATABASE']
+    if database != ':memory:' and database in _initialized_databases():
+        return
+    with _init_lock:
+        if database == ':memory:' or database not in _initialized_databases():
+            init_db()
+            _initialized_databases().add(database)
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Cria ou migra o esquema do banco de dados."""
+    init_db()
+    click.echo(f"Banco inicializado (versão do esquema {schema_version(get_db())}).")
+
+
+# Pragmas aplicados durante gravações em lote (restaurados ao final)
+BULK_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -64000  # ~64 MB
+}
+
+
+@contextmanager
+def bulk_pragmas(conn):
+    pragmas = dict(BULK_PRAGMAS)
+    # O SQLite não permite alterar 'synchronous' com uma transação aberta
+    if conn.in_transaction:
+        pragmas.pop('synchronous')
+    previous = {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in pragmas}
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    try:
+        yield conn
+    finally:
+        for name, value in previous.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+
+# Grava as predições de um upload em lote, coluna a coluna, numa única transação.
+# passenger_ids, labels e probabilities são arrays (NumPy/pandas) do mesmo tamanho.
+# Retorna o número de linhas, o tempo gasto e a taxa em linhas/s.
+def bulk_insert_predictions(conn, upload_id, passenger_ids, labels, probabilities, batch_size=10_000):
+    start = time.perf_counter()
+    rows = zip(
+        repeat(upload_id),
+        [str(pid) for pid in passenger_ids],
+        labels.tolist(),
+        probabilities.tolist()
+    )
+    with bulk_pragmas(conn):
+        try:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                conn.executemany(
+                    '''INSERT INTO predictions (upload_id, passenger_id, prediction, probability)
+                       VALUES (?, ?, ?, ?)''',
+                    batch
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    count = len(probabilities)
+    seconds = time.perf_counter() - start
+    return {
+        'rows': count,
+        'seconds': seconds,
+        'rows_per_sec': count / seconds if seconds > 0 else float('inf')
+    }
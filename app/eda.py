@@ -1,34 +1,59 @@
 import pandas as pd
+import plotly
 import plotly.express as px
 import plotly.io as pio
 from sklearn.cluster import KMeans
 from sklearn.metrics import accuracy_score, roc_auc_score
 import numpy as np
 from scipy.stats import entropy
-import joblib
-
-# --- Função para carregar os modelos e objetos necessários para predição ---
-def load_model_assets():
-    # Carrega o modelo final treinado (XGBoost neste caso)
-    model = joblib.load('models/xgb_final_model.pkl')
-    # Carrega o pré-processador usado para preparar os dados (ex: transformação, codificação)
-    preprocessor = joblib.load('models/preprocessor.pkl')
-    # Carrega o codificador de labels para transformar rótulos em números e vice-versa
-    label_encoder = joblib.load('models/label_encoder.pkl')
-    # Carrega a lista/ordem das colunas usadas como features no modelo
-    feature_columns = pd.read_json('models/feature_columns.json')
-
-    # Retorna todos os objetos para usar na aplicação
-    return model, preprocessor, label_encoder, feature_columns
+import os
+import time
+
+# Caminho do bundle do plotly.js distribuído com o pacote plotly. A página de
+# resultados carrega este arquivo uma única vez (ver prediction.plotly_js).
+PLOTLYJS_PATH = os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js')
+PLOTLYJS_VERSION = plotly.__version__
+
+# --- Converte uma figura em HTML sem embutir o plotly.js ---
+# Cada gráfico leva apenas o div e a especificação JSON da figura.
+def figure_html(fig):
+    return pio.to_html(fig, full_html=False, include_plotlyjs=False)
+
+# --- Faixas usadas nos gráficos (as mesmas para o modo completo e o streaming) ---
+AGE_CHART_BINS = [0, 18, 30, 45, 60, 100]
+AGE_CHART_LABELS = ['0–17', '18–30', '31–45', '46–60', '60+']
+DELAY_CHART_BINS = [-np.inf, 0, 10, 30, np.inf]
+DELAY_CHART_LABELS = ['Sem Atraso', 'Leve', 'Moderado', 'Grave']
+AGE_GRUPO_BINS = [0, 25, 40, 55, 70, 100]
+AGE_GRUPO_LABELS = ['<=25', '26-40', '41-55', '56-70', '70+']
+DISTANCE_GRUPO_LABELS = ['Muito Curto', 'Curto', 'Médio', 'Longo', 'Muito Longo']
+
+def age_chart_groups(ages):
+    return pd.cut(ages, bins=AGE_CHART_BINS, labels=AGE_CHART_LABELS, include_lowest=True)
+
+def delay_chart_categories(total_delay):
+    # <= 0: Sem Atraso, <= 10: Leve, <= 30: Moderado, acima: Grave
+    return pd.cut(total_delay, bins=DELAY_CHART_BINS, labels=DELAY_CHART_LABELS)
+
+# Agrupamento usado nos gráficos de "% satisfeitos" (None se a variável não existir)
+def pizza_groups(df, var):
+    if var == 'Flight Distance_grupo' and 'Flight Distance' in df.columns and var not in df.columns:
+        return pd.cut(df['Flight Distance'], 5, labels=DISTANCE_GRUPO_LABELS)
+    if var == 'Age_grupo' and 'Age' in df.columns and var not in df.columns:
+        return pd.cut(df['Age'], AGE_GRUPO_BINS, labels=AGE_GRUPO_LABELS)
+    if var in df.columns:
+        return df[var]
+    return None
 
 # --- Função para criar tabelas HTML para EDA (Análise Exploratória de Dados) ---
-def generate_eda_tables(df):
+def generate_eda_tables(df, corr_matrix=None):
     tables = {}
-    # Seleciona só colunas numéricas para análise
-    numeric_cols = df.select_dtypes(include='number')
+    # Matriz de correlação das colunas numéricas (pode vir já calculada)
+    if corr_matrix is None:
+        corr_matrix = df.select_dtypes(include='number').corr()
     # Se existir a coluna 'satisfaction', calcula correlações com outras variáveis numéricas
-    if 'satisfaction' in numeric_cols.columns:
-        corr = numeric_cols.corr()['satisfaction'].drop('satisfaction').sort_values(ascending=False)
+    if 'satisfaction' in corr_matrix.columns:
+        corr = corr_matrix['satisfaction'].drop('satisfaction').sort_values(ascending=False)
         corr_df = pd.DataFrame({'Variável': corr.index, 'Correlação': corr.values})
         # Filtra para mostrar só correlações acima de 0.1 (em módulo)
         corr_df = corr_df[abs(corr_df['Correlação']) >= 0.1]
@@ -37,32 +62,36 @@ def generate_eda_tables(df):
     return tables
 
 # --- Função para construir tabela detalhada de correlações entre todas variáveis numéricas ---
-def build_sorted_correlation_table(df, threshold=0.1):
+def build_sorted_correlation_table(df, threshold=0.1, top_n=None):
     # Pega só as colunas numéricas
     num_cols = df.select_dtypes(include=['number']).columns
-    # Calcula matriz de correlação absoluta arredondada
-    corr = df[num_cols].corr().abs().round(2)
-    # Transforma a matriz em formato "long" para listar pares de features e suas correlações
-    corr_long = (
-        corr
-        .stack()
-        .reset_index()
-        .rename(columns={'level_0': 'Feature 1', 'level_1': 'Feature 2', 0: 'Correlation'})
-    )
-    # Remove pares iguais e filtra só correlações acima do limite (threshold)
-    corr_long = corr_long[
-        (corr_long['Feature 1'] != corr_long['Feature 2']) &
-        (corr_long['Correlation'] >= threshold)
-    ]
-    # Cria um par ordenado para evitar duplicatas (ex: (A,B) == (B,A))
-    corr_long['pair'] = corr_long.apply(
-        lambda row: tuple(sorted([row['Feature 1'], row['Feature 2']])),
-        axis=1
-    )
-    # Remove pares repetidos e ordena pela correlação decrescente
-    corr_long = corr_long.drop_duplicates('pair').drop(columns='pair')
-    corr_long = corr_long.sort_values(by='Correlation', ascending=False).reset_index(drop=True)
-    return corr_long
+    return sorted_correlation_pairs(df[num_cols].corr(), threshold, top_n)
+
+# --- Lista os pares de features de uma matriz de correlação já calculada ---
+# (usado também pelo modo streaming, que acumula a matriz por chunks)
+# Trabalha direto no array: o triângulo superior (i < j) já contém cada par
+# uma única vez, sem precisar ordenar/deduplicar pares em Python.
+# top_n limita a tabela aos N pares mais correlacionados.
+def sorted_correlation_pairs(corr, threshold=0.1, top_n=None):
+    names = np.asarray(corr.columns)
+    values = np.round(np.abs(corr.to_numpy(dtype=float)), 2)
+    rows, cols = np.triu_indices(len(names), k=1)
+    pair_values = values[rows, cols]
+
+    # Filtra só correlações acima do limite (NaN nunca passa no filtro)
+    keep = np.flatnonzero(pair_values >= threshold)
+    if top_n is not None and 0 < top_n < len(keep):
+        # Acha o N-ésimo maior valor sem ordenar todos os pares e descarta o resto
+        cutoff = np.partition(pair_values[keep], len(keep) - top_n)[len(keep) - top_n]
+        keep = keep[pair_values[keep] >= cutoff]
+    # Ordena pela correlação decrescente (estável: empates seguem a ordem da matriz)
+    keep = keep[np.argsort(-pair_values[keep], kind='stable')][:top_n]
+
+    return pd.DataFrame({
+        'Feature 1': names[rows[keep]],
+        'Feature 2': names[cols[keep]],
+        'Correlation': pair_values[keep]
+    })
 
 # --- Função que gera um resumo estatístico e métricas do dataframe e resultados de predição ---
 def generate_summary(df, y_true=None, y_pred=None, y_prob=None):
@@ -114,127 +143,216 @@ def generate_summary(df, y_true=None, y_pred=None, y_prob=None):
 
     return summary
 
+# --- Agregados usados pelos gráficos ---
+# Os gráficos recebem apenas contagens por categoria/bin (barras), então o
+# tamanho da figura depende do número de bins e não do número de passageiros.
+PROBABILITY_BINS = 50
+PROBABILITY_EDGES = np.linspace(0, 1, PROBABILITY_BINS + 1)
+
+def prediction_counts(predictions):
+    return predictions.value_counts().sort_index()
+
+def probability_histogram(y_prob):
+    counts, edges = np.histogram(np.asarray(y_prob, dtype=float), bins=PROBABILITY_EDGES)
+    return counts, edges
+
+def grouped_counts(groups, predictions):
+    return pd.crosstab(groups, predictions)
+
 # --- Função para criar gráfico da distribuição das previsões (satisfeito x insatisfeito) ---
 def generate_prediction_distribution_plot(df):
-    fig = px.histogram(df, x='prediction', color='prediction', title='Distribuição das Previsões')
-    fig.update_layout(template='plotly_dark')  # tema escuro para o gráfico
-    return pio.to_html(fig, full_html=False)
+    return plot_prediction_counts(prediction_counts(df['prediction']))
 
 # --- Função para criar gráfico da distribuição das probabilidades previstas ---
 def generate_probability_distribution_plot(y_prob):
-    fig = px.histogram(x=y_prob, nbins=50, title='Distribuição das Probabilidades de Satisfação')
-    fig.update_layout(template='plotly_dark', xaxis_title='Probabilidade', yaxis_title='Frequência')
-    return pio.to_html(fig, full_html=False)
+    return plot_probability_counts(*probability_histogram(y_prob))
 
 # --- Função para gerar gráfico de distribuição por faixas etárias ---
-def generate_age_group_distribution(df):
+# age_groups pode vir já calculado; o DataFrame não é alterado
+def generate_age_group_distribution(df, age_groups=None):
     if 'Age' in df.columns:
-        bins = [0, 18, 30, 45, 60, 100]
-        labels = ['0–17', '18–30', '31–45', '46–60', '60+']
-        # Cria uma nova coluna categorizando as idades em grupos
-        df['age_group'] = pd.cut(df['Age'], bins=bins, labels=labels, include_lowest=True)
-        fig = px.histogram(df, x='age_group', color='prediction', barmode='group', title='Distribuição por Faixa Etária')
-        fig.update_layout(template='plotly_dark', xaxis_title='Faixa Etária', yaxis_title='Contagem')
-        return pio.to_html(fig, full_html=False)
+        if age_groups is None:
+            age_groups = age_chart_groups(df['Age'])
+        return plot_age_group_counts(grouped_counts(age_groups, df['prediction']))
     return None
 
 # --- Função para gerar gráfico de distribuição por categoria de atraso ---
-def generate_delay_category_plot(df):
+# delay_categories pode vir já calculado; o DataFrame não é alterado
+def generate_delay_category_plot(df, delay_categories=None):
     if 'total_delay' in df.columns:
-        # Função auxiliar para categorizar o atraso em faixas qualitativas
-        def categorize_delay(x):
-            if x <= 0:
-                return 'Sem Atraso'
-            elif x <= 10:
-                return 'Leve'
-            elif x <= 30:
-                return 'Moderado'
-            else:
-                return 'Grave'
-        # Aplica a categorização ao dataframe
-        df['delay_category'] = df['total_delay'].apply(categorize_delay)
-        fig = px.histogram(df, x='delay_category', color='prediction', barmode='group', title='Distribuição por Categoria de Atraso')
-        fig.update_layout(template='plotly_dark', xaxis_title='Categoria de Atraso', yaxis_title='Contagem')
-        return pio.to_html(fig, full_html=False)
+        if delay_categories is None:
+            delay_categories = delay_chart_categories(df['total_delay'])
+        return plot_delay_category_counts(grouped_counts(delay_categories, df['prediction']))
     return None
 
-import plotly.express as px
-import plotly.io as pio
+# --- Gráficos a partir de contagens já agregadas ---
+def plot_prediction_counts(counts):
+    # counts: Series com o número de passageiros por classe prevista
+    data = pd.DataFrame({'prediction': counts.index.astype(str), 'count': counts.values})
+    fig = px.bar(data, x='prediction', y='count', color='prediction', title='Distribuição das Previsões')
+    fig.update_layout(template='plotly_dark', yaxis_title='count')
+    return figure_html(fig)
+
+def plot_probability_counts(counts, edges):
+    # counts/edges: resultado de np.histogram sobre as probabilidades previstas
+    centers = (edges[:-1] + edges[1:]) / 2
+    fig = px.bar(x=centers, y=counts, title='Distribuição das Probabilidades de Satisfação')
+    fig.update_traces(width=float(edges[1] - edges[0]))
+    fig.update_layout(template='plotly_dark', xaxis_title='Probabilidade', yaxis_title='Frequência', bargap=0)
+    return figure_html(fig)
+
+def plot_grouped_counts(table, title, xaxis_title):
+    # table: DataFrame com categorias no índice e uma coluna por classe prevista
+    data = table.rename_axis('group').reset_index().melt(id_vars='group', var_name='prediction', value_name='count')
+    data['group'] = data['group'].astype(str)
+    fig = px.bar(data, x='group', y='count', color='prediction', barmode='group', title=title)
+    fig.update_layout(template='plotly_dark', xaxis_title=xaxis_title, yaxis_title='Contagem')
+    return figure_html(fig)
+
+def plot_age_group_counts(table):
+    return plot_grouped_counts(table, 'Distribuição por Faixa Etária', 'Faixa Etária')
+
+def plot_delay_category_counts(table):
+    return plot_grouped_counts(table, 'Distribuição por Categoria de Atraso', 'Categoria de Atraso')
+
+# --- Gráfico de barras horizontais com % de satisfeitos por categoria ---
+def plot_satisfaction_rate(var, pct):
+    # pct: Series com o percentual de satisfeitos indexado pelas categorias de var
+    s = pd.DataFrame({var: pct.index, 'pct': pct.values}).dropna()
+    fig = px.bar(
+        s,
+        y=var,
+        x='pct',
+        orientation='h',
+        title=f'% Satisfeitos por {var}',
+        template='plotly_dark',
+        text='pct'
+    )
+    fig.update_traces(texttemplate='%{text}%', textposition='outside')
+    fig.update_layout(
+        width=350,
+        height=350,
+        margin=dict(l=20, r=20, t=40, b=20),
+        title_x=0.5,
+        xaxis=dict(range=[0,100], title='% Satisfeitos'),
+        yaxis=dict(title=var)
+    )
+    return figure_html(fig)
 
 # --- Função para gerar vários gráficos estilo “pizza” (barras horizontais) para variáveis categóricas ---
 def generate_pizza_charts(df, vars_to_plot):
-    pizza_imgs = {}
+    return EDAEngine(df).pizza_charts(vars_to_plot)
 
-    # Cria faixas agrupadas para distância do voo (se ainda não existirem)
-    if 'Flight Distance' in df.columns and 'Flight Distance_grupo' not in df.columns:
-        df['Flight Distance_grupo'] = pd.cut(
-            df['Flight Distance'], 5,
-            labels=['Muito Curto','Curto','Médio','Longo','Muito Longo']
-        )
-    # Cria faixas agrupadas para idade (se ainda não existirem)
-    if 'Age' in df.columns and 'Age_grupo' not in df.columns:
-        df['Age_grupo'] = pd.cut(
-            df['Age'], [0,25,40,55,70,100],
-            labels=['<=25','26-40','41-55','56-70','70+']
-        )
+# --- Motor de EDA de um upload ---
+# Cada agregado (faixas, taxas, matriz de correlação) e cada gráfico é calculado
+# uma única vez e guardado em cache; gráficos e tabelas que dependem do mesmo
+# agregado reaproveitam o valor. timings guarda o tempo gasto em cada etapa.
+class EDAEngine:
+    def __init__(self, df, probabilities=None):
+        self.df = df
+        self.probabilities = df['probability'] if probabilities is None else probabilities
+        self.cache = {}
+        self.timings = {}
 
-    # Escolhe qual coluna usar para calcular percentual de satisfeitos:
-    # Prioriza a coluna com valor real ('satisfaction_flag'), senão usa a predita
-    if 'satisfaction_flag' in df.columns:
-        flag_col = 'satisfaction_flag'
-    elif 'prediction' in df.columns:
-        # Cria uma coluna binária para predição: 1 se satisfeito, 0 caso contrário
-        df['prediction_flag'] = (df['prediction'] == 'satisfied').astype(int)
-        flag_col = 'prediction_flag'
-    else:
-        # Se não tiver como calcular, retorna vazio
-        return pizza_imgs
-
-    # Para cada variável categórica, gera gráfico de barras horizontais mostrando % de satisfeitos por categoria
-    for var in vars_to_plot:
-        if var not in df.columns:
-            continue
-        s = df.groupby(var)[flag_col].mean().reset_index()
-        s['pct'] = (s[flag_col] * 100).round(1)
-        s = s.dropna()
-        fig = px.bar(
-            s,
-            y=var,
-            x='pct',
-            orientation='h',
-            title=f'% Satisfeitos por {var}',
-            template='plotly_dark',
-            text='pct'
-        )
-        fig.update_traces(texttemplate='%{text}%', textposition='outside')
-        fig.update_layout(
-            width=350,
-            height=350,
-            margin=dict(l=20, r=20, t=40, b=20),
-            title_x=0.5,
-            xaxis=dict(range=[0,100], title='% Satisfeitos'),
-            yaxis=dict(title=var)
-        )
-        # Salva o gráfico em formato HTML dentro do dicionário
-        pizza_imgs[var] = pio.to_html(fig, full_html=False, include_plotlyjs='cdn')
+    def _memo(self, key, compute):
+        if key not in self.cache:
+            start = time.perf_counter()
+            self.cache[key] = compute()
+            self.timings[key] = round(time.perf_counter() - start, 4)
+        return self.cache[key]
+
+    # --- Agregados ---
+    def age_groups(self):
+        return self._memo('age_groups', lambda: age_chart_groups(self.df['Age']))
+
+    def delay_categories(self):
+        return self._memo('delay_categories', lambda: delay_chart_categories(self.df['total_delay']))
+
+    def prediction_counts(self):
+        return self._memo('prediction_counts', lambda: prediction_counts(self.df['prediction']))
+
+    def probability_histogram(self):
+        return self._memo('probability_histogram', lambda: probability_histogram(self.probabilities))
+
+    def age_group_counts(self):
+        return self._memo('age_group_counts', lambda: grouped_counts(self.age_groups(), self.df['prediction']))
 
-    return pizza_imgs
+    def delay_category_counts(self):
+        return self._memo('delay_category_counts', lambda: grouped_counts(self.delay_categories(), self.df['prediction']))
+
+    def satisfaction_flag(self):
+        # Prioriza o valor real ('satisfaction_flag'), senão usa a predição
+        def compute():
+            if 'satisfaction_flag' in self.df.columns:
+                return self.df['satisfaction_flag']
+            if 'prediction' in self.df.columns:
+                return (self.df['prediction'] == 'satisfied').astype(int)
+            return None
+        return self._memo('satisfaction_flag', compute)
+
+    def satisfaction_rate(self, var):
+        def compute():
+            groups = pizza_groups(self.df, var)
+            flag = self.satisfaction_flag()
+            if groups is None or flag is None:
+                return None
+            return (flag.groupby(groups, observed=False).mean() * 100).round(1)
+        return self._memo(f'satisfaction_rate:{var}', compute)
+
+    def correlation_matrix(self):
+        return self._memo('correlation_matrix', lambda: self.df.select_dtypes(include=['number']).corr())
+
+    # --- Gráficos ---
+    def prediction_chart(self):
+        return self._memo('graph_html', lambda: plot_prediction_counts(self.prediction_counts()))
+
+    def probability_chart(self):
+        return self._memo('prob_html', lambda: plot_probability_counts(*self.probability_histogram()))
+
+    def age_group_chart(self):
+        if 'Age' not in self.df.columns:
+            return None
+        return self._memo('age_group_html', lambda: plot_age_group_counts(self.age_group_counts()))
+
+    def delay_category_chart(self):
+        if 'total_delay' not in self.df.columns:
+            return None
+        return self._memo('delay_cat_html', lambda: plot_delay_category_counts(self.delay_category_counts()))
+
+    def pizza_charts(self, vars_to_plot):
+        charts = {}
+        for var in vars_to_plot:
+            pct = self.satisfaction_rate(var)
+            if pct is not None:
+                charts[var] = self._memo(f'pizza:{var}', lambda: plot_satisfaction_rate(var, pct))
+        return charts
+
+    # --- Tabelas ---
+    def eda_tables(self):
+        return self._memo('eda_tables', lambda: generate_eda_tables(self.df, self.correlation_matrix()))
+
+    def correlation_table(self, threshold=0.1, top_n=None):
+        return self._memo(
+            f'correlation_table:{threshold}:{top_n}',
+            lambda: sorted_correlation_pairs(self.correlation_matrix(), threshold, top_n)
+        )
 
 # --- Função principal que reúne toda análise exploratória e gráficos para retornar para frontend ---
-def perform_eda(df):
+def perform_eda(df, engine=None):
+    engine = engine or EDAEngine(df)
     eda_html = {}
     # Gera as tabelas em HTML da análise básica (correlações, etc)
-    eda_html.update(generate_eda_tables(df))
+    eda_html.update(engine.eda_tables())
     # Gráfico da distribuição das previsões
-    eda_html['graph_html']     = generate_prediction_distribution_plot(df)
+    eda_html['graph_html']     = engine.prediction_chart()
     # Gráfico da distribuição das probabilidades previstas
-    eda_html['prob_html']      = generate_probability_distribution_plot(df['probability'])
+    eda_html['prob_html']      = engine.probability_chart()
     # Gráfico de distribuição por faixa etária
-    eda_html['age_group_html'] = generate_age_group_distribution(df)
+    eda_html['age_group_html'] = engine.age_group_chart()
     # Gráfico de distribuição por categoria de atraso
-    eda_html['delay_cat_html'] = generate_delay_category_plot(df)
+    eda_html['delay_cat_html'] = engine.delay_category_chart()
     # Gera gráficos para variáveis categóricas principais
     vars_to_plot = ['Gender', 'Customer Type', 'Type of Travel', 'Class']
-    eda_html['pizza_imgs'] = generate_pizza_charts(df, vars_to_plot)
+    eda_html['pizza_imgs'] = engine.pizza_charts(vars_to_plot)
     # Retorna o dicionário com todo HTML dos gráficos e tabelas, junto com o dataframe para uso posterior
     return eda_html, df
@@ -2,4 +2,6 @@
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+import app.limiter_storage  # noqa: F401  registra o esquema sqlite:// no limits
+
 limiter = Limiter(key_func=get_remote_address)
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+# Engenharia de features usada na predição (uploads, API, micro-batching) e no
+# treino offline (scripts/), para que as duas pontas calculem exatamente as
+# mesmas colunas.
+
+# Colunas de avaliação de serviço usadas na engenharia de features
+SERVICE_COLS = [
+    'Inflight wifi service', 'Departure/Arrival time convenient', 'Ease of Online booking',
+    'Gate location', 'Food and drink', 'Online boarding', 'Seat comfort',
+    'Inflight entertainment', 'On-board service', 'Leg room service',
+    'Baggage handling', 'Checkin service', 'Inflight service', 'Cleanliness'
+]
+
+AGE_GROUP_BINS = [0, 18, 35, 60, 120]
+AGE_GROUP_LABELS = ['Child', 'Young', 'Adult', 'Senior']
+DELAY_CATEGORY_BINS = [-1, 0, 15, 60, np.inf]
+DELAY_CATEGORY_LABELS = ['No Delay', 'Short', 'Moderate', 'Severe']
+
+EPS = 1e-9
+
+
+# --- Bloco de notas de serviço como matriz float32 contígua ---
+# Copia coluna a coluna, sem materializar df[SERVICE_COLS] (que copiaria o
+# bloco inteiro no dtype original, int64, antes da conversão).
+def service_block(df):
+    X = np.empty((len(df), len(SERVICE_COLS)), dtype=np.float32)
+    for j, col in enumerate(SERVICE_COLS):
+        X[:, j] = df[col].to_numpy()
+    return X
+
+
+# --- Features do bloco de serviços: média, desvio padrão (ddof=1) e entropia ---
+# Calculadas numa única passada sobre a matriz float32, com um só buffer
+# auxiliar do tamanho do bloco. X é usada como área de trabalho e sobrescrita.
+def service_features(X):
+    if np.isnan(X).any():
+        return _service_features_nan(X)
+
+    n_cols = X.shape[1]
+    total = X.sum(axis=1)
+    score = total / n_cols
+
+    buf = np.subtract(X, score[:, None])
+    consistency = np.sqrt(np.einsum('ij,ij->i', buf, buf) / (n_cols - 1))
+
+    # Entropia da distribuição das notas: p = nota / soma da linha
+    np.divide(X, (total + EPS)[:, None], out=buf)
+    np.add(buf, EPS, out=X)
+    np.log(X, out=X)
+    entropy = -np.einsum('ij,ij->i', buf, X)
+
+    return score.astype(np.float64), consistency.astype(np.float64), entropy.astype(np.float64)
+
+
+# Mesmo cálculo ignorando notas ausentes (como o pandas faz)
+def _service_features_nan(X):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        counts = (~np.isnan(X)).sum(axis=1)
+        total = np.nansum(X, axis=1)
+        score = total / counts
+        dev = X - score[:, None]
+        consistency = np.sqrt(np.nansum(dev * dev, axis=1) / (counts - 1))
+        consistency[counts < 2] = np.nan
+        p = X / (total + EPS)[:, None]
+        entropy = -np.nansum(p * np.log(p + EPS), axis=1)
+    return score.astype(np.float64), consistency.astype(np.float64), entropy.astype(np.float64)
+
+
+# --- Engenharia de features (aplicada a um DataFrame ou a um chunk) ---
+def engineer_features(df):
+    departure = df['Departure Delay in Minutes'].to_numpy(dtype=np.float64)
+    arrival = df['Arrival Delay in Minutes'].to_numpy(dtype=np.float64)
+    total_delay = np.where(np.isnan(departure), 0, departure) + np.where(np.isnan(arrival), 0, arrival)
+
+    df['total_delay'] = total_delay
+    df['delay_ratio'] = total_delay / (df['Flight Distance'].to_numpy(dtype=np.float64) + 1)
+    df['delay_indicator'] = (total_delay > 0).astype(int)
+
+    score, consistency, entropy = service_features(service_block(df))
+    df['service_score'] = score
+    df['service_consistency'] = consistency
+    df['service_entropy'] = entropy
+
+    df['age_group'] = pd.cut(df['Age'], bins=AGE_GROUP_BINS, labels=AGE_GROUP_LABELS)
+    df['delay_category'] = pd.cut(df['total_delay'], bins=DELAY_CATEGORY_BINS, labels=DELAY_CATEGORY_LABELS)
+    return df
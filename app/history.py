@@ -35,10 +35,11 @@ def download_file(filename):
 @history_bp.app_errorhandler(404)
 def page_not_found(e):
     return render_template('404.html'), 404
-from flask import Blueprint, render_template, session, send_file, abort, current_app
+from flask import Blueprint, Response, render_template, request, session, send_file, abort, current_app, stream_with_context
 import os
 from app.database import get_db  # Importa função para conectar ao banco de dados
-from app.auth import login_required  # Decorator para proteger rotas, exige login
+from app.storage import RESULTS_EXTENSION, export_in_background, export_path, gzip_chunks, iter_csv, iter_file  # Resultados em Parquet convertidos para CSV no download
+from app.auth import login_required, skip_user_lookup  # Decorators de login e da busca do usuário
 
 # Cria um blueprint chamado 'history' para organizar as rotas relacionadas ao histórico de uploads
 history_bp = Blueprint('history', __name__)
@@ -60,13 +61,56 @@ def history():
     return render_template('history.html', uploads=uploads)
 
 # Rota para download do arquivo CSV processado pelo usuário
+# Suporta GET condicional (ETag/Last-Modified -> 304), Range (download retomado)
+# e compressão gzip em streaming quando o cliente aceita.
 @history_bp.route('/download/<filename>')
+@skip_user_lookup
 @login_required  # Também protege o download, só usuários logados podem baixar
 def download_file(filename):
     path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)  # Caminho completo do arquivo
-    if os.path.exists(path):  # Verifica se o arquivo existe no servidor
+    if not os.path.exists(path):  # Verifica se o arquivo existe no servidor
+        abort(404)  # Se não existir, retorna erro 404 (arquivo não encontrado)
+
+    is_parquet = filename.endswith(RESULTS_EXTENSION)
+    use_gzip = request.range is None and request.accept_encodings['gzip'] > 0
+    if not is_parquet and not use_gzip:
+        # CSV em disco: o send_file já trata ETag, Last-Modified e Range
         return send_file(path, as_attachment=True)  # Envia o arquivo para download
-    abort(404)  # Se não existir, retorna erro 404 (arquivo não encontrado)
+
+    st = os.stat(path)
+    etag = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+    download_name = filename[:-len(RESULTS_EXTENSION)] + '.csv' if is_parquet else filename
+
+    if request.range is not None:
+        # Range precisa do tamanho total: serve a exportação em CSV do resultado.
+        # Se ainda não existe, é gerada em background e esta resposta ignora o
+        # Range (200 com o arquivo inteiro, em streaming).
+        exports = os.path.join(current_app.config['UPLOAD_FOLDER'], 'downloads')
+        csv_path = export_path(exports, download_name[:-4], etag)
+        if os.path.exists(csv_path):
+            os.utime(csv_path)  # uso recente (LRU)
+            return send_file(csv_path, as_attachment=True, download_name=download_name,
+                             etag=etag, last_modified=st.st_mtime)
+        export_in_background(path, exports, download_name[:-4], etag,
+                             current_app.config['DOWNLOAD_EXPORTS_MAX_BYTES'])
+
+    # Resultado convertido para CSV (e comprimido) em streaming, lote a lote
+    chunks = iter_csv(path) if is_parquet else iter_file(path)
+    if use_gzip:
+        chunks = gzip_chunks(chunks)
+        etag += '-gzip'
+    response = Response(
+        stream_with_context(chunks),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={download_name}'}
+    )
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.accept_ranges = 'bytes'
+    response.set_etag(etag)
+    response.last_modified = st.st_mtime
+    return response.make_conditional(request)
 
 # Tratador de erro 404 para o blueprint, renderiza uma página customizada
 @history_bp.app_errorhandler(404)
@@ -0,0 +1,186 @@
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app.database import get_db
+from app.pipeline import discard_upload, process_upload
+from app.result_cache import get_result_cache, json_default
+
+# Estados possíveis de um job
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+ACTIVE = (QUEUED, RUNNING)
+
+STALE_MESSAGE = 'Processamento interrompido (o servidor foi reiniciado). Envie o arquivo novamente.'
+
+# Pool de threads do processo. É criado sob demanda, já dentro do worker do
+# gunicorn, para não ser herdado (sem threads) por processos filhos após o fork.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config['JOB_WORKERS'],
+                thread_name_prefix='prediction-job'
+            )
+    return _executor
+
+
+# --- Acesso à tabela 'jobs' ---
+def create_job(user_id, original_filename, source_path):
+    job_id = uuid.uuid4().hex
+    conn = get_db()
+    conn.execute(
+        '''INSERT INTO jobs (id, user_id, original_filename, source_path, status)
+           VALUES (?, ?, ?, ?, ?)''',
+        (job_id, user_id, original_filename, source_path, QUEUED)
+    )
+    conn.commit()
+    return job_id
+
+
+def update_job(job_id, **fields):
+    assignments = ', '.join(f"{key} = ?" for key in fields)
+    conn = get_db()
+    conn.execute(
+        f"UPDATE jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (*fields.values(), job_id)
+    )
+    conn.commit()
+
+
+def get_job(job_id, user_id=None):
+    conn = get_db()
+    if user_id is None:
+        job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    else:
+        job = conn.execute(
+            'SELECT * FROM jobs WHERE id = ? AND user_id = ?',
+            (job_id, user_id)
+        ).fetchone()
+    # Um job parado há tempo demais é dado como falho já na consulta
+    if job is not None and job['status'] in ACTIVE and fail_stale_jobs(job_id):
+        job = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return job
+
+
+# --- Jobs interrompidos ---
+# Um job em 'queued'/'running' sem atualização há mais de JOB_STALE_SECONDS
+# perdeu o worker que o executava (deploy, crash, reciclagem por max_requests).
+# É marcado como falho e o que deixou para trás é removido: a cópia do upload
+# e o upload ainda não processado (linha, predições e arquivo de resultado).
+# Roda no startup e quando um job ativo é consultado. Retorna quantos falharam.
+def fail_stale_jobs(job_id=None):
+    conn = get_db()
+    stale = "status IN (?, ?) AND updated_at < datetime('now', ?)"
+    params = [*ACTIVE, f"-{int(current_app.config['JOB_STALE_SECONDS'])} seconds"]
+    if job_id is not None:
+        stale += ' AND id = ?'
+        params.append(job_id)
+
+    failed = 0
+    for job in conn.execute(f'SELECT * FROM jobs WHERE {stale}', params).fetchall():
+        # Só falha se continuar parado (o worker pode ter atualizado nesse meio tempo)
+        cursor = conn.execute(
+            f"UPDATE jobs SET status = ?, message = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ? AND {stale}",
+            (FAILED, STALE_MESSAGE, job['id'], *params)
+        )
+        conn.commit()
+        if not cursor.rowcount:
+            continue
+        failed += 1
+        current_app.logger.warning(f"Job {job['id']} parado desde {job['updated_at']}: marcado como falho")
+        _remove_source(current_app, job['source_path'])
+        if job['upload_id'] is not None:
+            _discard_pending_upload(conn, job['upload_id'])
+    return failed
+
+
+def _discard_pending_upload(conn, upload_id):
+    upload = conn.execute('SELECT filename, processed FROM uploads WHERE id = ?', (upload_id,)).fetchone()
+    if upload is None or upload['processed']:
+        return
+    discard_upload(conn, upload_id, os.path.join(current_app.config['UPLOAD_FOLDER'], upload['filename']))
+
+
+# Remove a cópia temporária do upload (o CSV de exemplo é mantido)
+def _remove_source(app, source_path):
+    if os.path.dirname(os.path.abspath(source_path)) == os.path.abspath(app.config['UPLOAD_FOLDER']):
+        try:
+            os.remove(source_path)
+        except OSError:
+            pass
+
+
+def load_job_result(job):
+    with open(job['result_path'], encoding='utf-8') as f:
+        return json.load(f)
+
+
+# --- Grava o resultado e marca o job como concluído ---
+def finish_job(job_id, context):
+    result_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{job_id}_result.json")
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(context, f, default=json_default)
+    update_job(
+        job_id, status=DONE, progress=100,
+        rows_processed=context['num_passengers'], result_path=result_path
+    )
+
+
+# --- Enfileira o processamento de um upload já salvo em disco ---
+# (os artefatos do modelo são carregados pelo próprio worker, via registro)
+# cache_key, se informado, grava o resultado no cache de resultados ao final.
+def submit_job(job_id, assets=None, chunksize=None, cache_key=None):
+    app = current_app._get_current_object()
+    return get_executor().submit(run_job, app, job_id, assets, chunksize, cache_key)
+
+
+# --- Executa o pipeline de predição dentro de um contexto da aplicação ---
+def run_job(app, job_id, assets=None, chunksize=None, cache_key=None):
+    with app.app_context():
+        job = get_job(job_id)
+        source_path = job['source_path']
+        if job['status'] != QUEUED:
+            # Ficou tempo demais na fila e já foi dado como falho
+            return
+        update_job(job_id, status=RUNNING)
+        try:
+            size = os.path.getsize(source_path) or 1
+            with open(source_path, 'rb') as fh:
+                # O progresso é estimado pelos bytes já lidos do arquivo
+                def progress(rows):
+                    fraction = min(fh.tell() / size, 1.0)
+                    update_job(job_id, rows_processed=rows, progress=round(fraction * 99, 1))
+
+                context = process_upload(
+                    fh, job['original_filename'], job['user_id'], assets,
+                    chunksize=chunksize, progress=progress,
+                    on_upload=lambda upload_id: update_job(job_id, upload_id=upload_id)
+                )
+
+            finish_job(job_id, context)
+
+            cache = get_result_cache()
+            if cache is not None and cache_key is not None:
+                cache.store(cache_key, context, context['upload_id'])
+        except Exception as e:
+            app.logger.exception(f"Erro no job {job_id}")
+            update_job(job_id, status=FAILED, message=str(e))
+            # Nada de upload pela metade no histórico de um job que falhou
+            upload_id = get_job(job_id)['upload_id']
+            if upload_id is not None:
+                _discard_pending_upload(get_db(), upload_id)
+        finally:
+            _remove_source(app, source_path)
+
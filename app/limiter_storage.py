@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from limits.storage import Storage
+
+# Armazenamento do rate limiter num arquivo SQLite local, compartilhado pelos
+# workers do gunicorn sem depender de Redis/Memcached. Registrado no 'limits'
+# com o esquema sqlite:// (ver RATELIMIT_STORAGE_URI em app/__init__.py):
+#   sqlite:///caminho/absoluto/ratelimit.db
+# Suporta a estratégia padrão do Flask-Limiter (fixed-window).
+
+# Contadores de rate limit podem se perder num crash sem problema: sem fsync
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'OFF',
+    'busy_timeout': 5000,  # ms
+}
+
+# A cada tantos incrementos, o processo apaga as janelas já expiradas
+PURGE_EVERY = 1000
+
+
+class SQLiteStorage(Storage):
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        parsed = urlparse(uri)
+        self.path = parsed.netloc + parsed.path
+        if not self.path:
+            raise ValueError("Informe o arquivo do banco: sqlite:///caminho/ratelimit.db")
+        self._local = threading.local()
+        self._pid = None
+        self._incr_count = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+        # Cria a tabela com uma conexão descartável (o master do gunicorn não
+        # deve manter conexões abertas através do fork)
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        conn.close()
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit: cada comando é uma transação atômica
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        for name, value in SQLITE_PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    # Uma conexão por thread, recriada depois de um fork
+    @property
+    def _conn(self):
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._local = threading.local()
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # --- Incrementa o contador da janela (ou abre uma nova, se expirou) ---
+    # Um único UPSERT atômico, seguro entre processos.
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        now = time.time()
+        count = self._conn.execute(
+            '''INSERT INTO rate_limits (key, count, expires_at) VALUES (?, ?, ?)
+               ON CONFLICT (key) DO UPDATE SET
+                   count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END,
+                   expires_at = CASE WHEN expires_at <= ? OR ? THEN excluded.expires_at ELSE expires_at END
+               RETURNING count''',
+            (key, amount, now + expiry, now, now, bool(elastic_expiry))
+        ).fetchone()[0]
+
+        self._incr_count += 1
+        if self._incr_count % PURGE_EVERY == 0:
+            self._conn.execute('DELETE FROM rate_limits WHERE expires_at <= ?', (now,))
+        return count
+
+    def get(self, key):
+        row = self._conn.execute(
+            'SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._conn.execute(
+            'SELECT expires_at FROM rate_limits WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            self._conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._conn.execute('DELETE FROM rate_limits').rowcount
+
+    def clear(self, key):
+        self._conn.execute('DELETE FROM rate_limits WHERE key = ?', (key,))
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Pasta dos artefatos do modelo (pode ser trocada pela variável MODELS_DIR)
+MODELS_DIR = os.getenv(
+    'MODELS_DIR',
+    os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'models'))
+)
+
+# Artefatos carregados para predição. É uma tupla, então continua podendo ser
+# desempacotada como antes (model, preprocessor, label_encoder, feature_columns, cluster_model).
+# A versão (hash do conteúdo dos arquivos) fica fora da tupla, como atributo,
+# e acompanha os artefatos que de fato fazem a predição.
+class ModelAssets(namedtuple(
+    'ModelAssets',
+    ['model', 'preprocessor', 'label_encoder', 'feature_columns', 'cluster_model']
+)):
+    def __new__(cls, *fields, version=None, **kwargs):
+        self = super().__new__(cls, *fields, **kwargs)
+        self.version = version
+        return self
+
+# Cache do processo: os artefatos são carregados uma única vez, na primeira
+# predição (ou no warm-up), e compartilhados por todas as threads do worker
+_assets = None
+_lock = threading.Lock()
+_stats = {}
+
+
+# --- Memória residente (RSS) do processo em bytes ---
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        # Fora do Linux: usa o pico de memória do processo
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# --- Memória do processo lida de /proc/<pid>/smaps_rollup (Linux), em bytes ---
+# uss: páginas privadas do processo (o que ele realmente custa a mais);
+# pss: páginas compartilhadas divididas entre os processos que as usam.
+# Com o gunicorn em preload, o modelo fica nas páginas compartilhadas com o
+# master e só o USS cresce por worker.
+def process_memory(pid='self'):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+    }
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_artifact(name, loader, models_dir):
+    path = os.path.join(models_dir, name)
+    start = time.perf_counter()
+    obj = loader(path)
+    _stats['artifacts'][name] = {
+        'seconds': round(time.perf_counter() - start, 4),
+        'file_bytes': os.path.getsize(path),
+        'sha256': _file_digest(path)
+    }
+    return obj
+
+
+def _load_feature_columns(path):
+    # Lista com a ordem das colunas após o pré-processamento
+    with open(path, encoding='utf-8') as f:
+        return list(json.load(f))
+
+
+# --- Lê os artefatos do disco (sem cache) ---
+def load_model_assets(models_dir=None):
+    models_dir = models_dir or MODELS_DIR
+    _stats.clear()
+    _stats['artifacts'] = {}
+    rss_before = rss_bytes()
+    start = time.perf_counter()
+
+    model = _load_artifact('xgb_final_model.pkl', joblib.load, models_dir)
+    preprocessor = _load_artifact('preprocessor.pkl', joblib.load, models_dir)
+    label_encoder = _load_artifact('label_encoder.pkl', joblib.load, models_dir)
+    feature_columns = _load_artifact('feature_columns.json', _load_feature_columns, models_dir)
+    # Modelo de segmentação (KMeans) treinado offline, se existir
+    # (gerado por scripts/train_cluster_model.py)
+    cluster_model = None
+    if os.path.exists(os.path.join(models_dir, 'cluster_model.pkl')):
+        cluster_model = _load_artifact('cluster_model.pkl', joblib.load, models_dir)
+
+    _stats['load_seconds'] = round(time.perf_counter() - start, 4)
+    # Versão dos artefatos: hash do conteúdo de todos os arquivos carregados
+    version = hashlib.sha256(''.join(
+        f"{name}:{info['sha256']};" for name, info in sorted(_stats['artifacts'].items())
+    ).encode()).hexdigest()[:16]
+    _stats['version'] = version
+    _stats['rss_bytes'] = rss_bytes()
+    _stats['rss_delta_bytes'] = _stats['rss_bytes'] - rss_before
+    _stats['pid'] = os.getpid()
+    logger.info(
+        f"Modelos carregados de {models_dir} em {_stats['load_seconds']}s "
+        f"(RSS +{_stats['rss_delta_bytes'] / 2**20:.1f} MB, total {_stats['rss_bytes'] / 2**20:.1f} MB)"
+    )
+    return ModelAssets(model, preprocessor, label_encoder, feature_columns, cluster_model, version=version)
+
+
+# --- Artefatos em cache no processo (carregados na primeira chamada) ---
+def get_model_assets():
+    global _assets
+    if _assets is None:
+        with _lock:
+            if _assets is None:
+                _assets = load_model_assets()
+    return _assets
+
+
+# Descarta o cache (ex.: depois de trocar os arquivos em models/)
+def reset_model_assets():
+    global _assets
+    with _lock:
+        _assets = None
+        _stats.clear()
+
+
+# Versão dos artefatos em cache, os mesmos que fazem a predição
+# (None se não foram carregados do disco pelo registro)
+def model_version():
+    return get_model_assets().version
+
+
+# Tempo de carga, memória e warm-up do último carregamento
+def get_load_stats():
+    return dict(_stats)
+
+
+# --- Linha de exemplo para o warm-up, montada a partir do pré-processador ---
+# Colunas numéricas recebem 0 e categóricas a primeira categoria do encoder.
+def _warmup_frame(preprocessor):
+    columns = list(preprocessor.feature_names_in_)
+    row = dict.fromkeys(columns, 0.0)
+    for _, transformer, cols in getattr(preprocessor, 'transformers_', []):
+        if not isinstance(cols, (list, tuple, np.ndarray)):
+            continue
+        steps = transformer.steps if hasattr(transformer, 'steps') else [(None, transformer)]
+        for _, step in steps:
+            categories = getattr(step, 'categories_', None)
+            if categories is None:
+                continue
+            for col, cats in zip(cols, categories):
+                if col in row:
+                    row[col] = cats[0]
+    return pd.DataFrame([row], columns=columns)
+
+
+# --- Carrega os artefatos e faz uma predição de teste ---
+# Chamado no startup (MODEL_WARMUP) ou no post_fork do gunicorn, para que a
+# primeira requisição não pague a carga nem a inicialização do XGBoost.
+def warm_up():
+    assets = get_model_assets()
+    start = time.perf_counter()
+    try:
+        # Mesmo caminho das predições servidas
+        from app.pipeline import predict_frame
+        predict_frame(_warmup_frame(assets.preprocessor), *assets[:4])
+    except Exception:
+        # O warm-up é só uma otimização; a predição real reporta o erro se houver
+        logger.exception("Falha no warm-up do modelo")
+        return assets
+    _stats['warmup_seconds'] = round(time.perf_counter() - start, 4)
+    _stats['rss_bytes'] = rss_bytes()
+    logger.info(f"Warm-up do modelo em {_stats['warmup_seconds']}s (pid {os.getpid()})")
+    return assets
@@ -0,0 +1,442 @@
+import itertools
+import os
+import uuid
+import numpy as np
+import pandas as pd
+from flask import current_app
+from sklearn.cluster import KMeans
+from sklearn.metrics import accuracy_score, roc_auc_score
+
+from app.database import get_db, bulk_insert_predictions
+from app.features import engineer_features
+from app.storage import RESULTS_EXTENSION, ResultWriter
+from app.model_registry import get_model_assets
+from app.eda import (
+    EDAEngine,
+    AGE_GRUPO_BINS,
+    AGE_GRUPO_LABELS,
+    DISTANCE_GRUPO_LABELS,
+    PROBABILITY_BINS,
+    PROBABILITY_EDGES,
+    age_chart_groups,
+    delay_chart_categories,
+    grouped_counts,
+    prediction_counts,
+    sorted_correlation_pairs,
+    plot_prediction_counts,
+    plot_probability_counts,
+    plot_age_group_counts,
+    plot_delay_category_counts,
+    plot_satisfaction_rate
+)
+
+# Variáveis exibidas nos gráficos de "% satisfeitos" da página de resultados
+PIZZA_VARS = [
+    'Online boarding', 'Inflight entertainment', 'Seat comfort', 'On-board service', 'Cleanliness', 'Leg room service',
+    'Inflight wifi service', 'Baggage handling', 'Checkin service', 'Inflight service', 'Food and drink',
+    'Ease of Online booking', 'Flight Distance_grupo', 'Age_grupo'
+]
+
+# Features cujas médias são exibidas no resumo
+METRIC_COLS = [
+    'total_delay', 'delay_ratio', 'delay_indicator',
+    'service_score', 'service_consistency', 'service_entropy'
+]
+
+AUC_BINS = 10000
+
+
+# Features usadas na segmentação dos passageiros
+CLUSTER_FEATURES = ['service_score', 'total_delay']
+
+
+# --- Atribui cada linha ao centróide mais próximo (distância euclidiana) ---
+def nearest_centroid(X, centers):
+    distances = ((X[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    return distances.argmin(axis=1)
+
+
+# --- Segmentação por KMeans ---
+# Usa o modelo pré-treinado (models/cluster_model.pkl), de modo que os ids de
+# cluster sejam comparáveis entre uploads. Sem ele, ajusta um KMeans no
+# primeiro chunk e reaproveita os centróides nos seguintes.
+def assign_clusters(df, cluster_model=None):
+    X = df[CLUSTER_FEATURES].to_numpy(dtype=float)
+    if cluster_model is None:
+        current_app.logger.warning("Modelo de clusters não encontrado; ajustando KMeans no upload.")
+        cluster_model = KMeans(n_clusters=3, random_state=42).fit(X)
+    df['cluster'] = nearest_centroid(X, cluster_model.cluster_centers_)
+    return cluster_model
+
+
+# --- Colunas de entrada esperadas pelo modelo ---
+# As do pré-processador, menos as que engineer_features cria.
+def required_input_columns(preprocessor):
+    return [c for c in getattr(preprocessor, 'feature_names_in_', []) if c not in METRIC_COLS]
+
+
+# --- Inferência: adiciona as colunas 'prediction' e 'probability' ---
+# Uma única passada do modelo: os rótulos saem da probabilidade da classe
+# positiva com o limiar de decisão (model.predict usa > 0.5). A matriz do
+# pré-processador vai direto para o modelo, sem ser copiada para um DataFrame;
+# as colunas seguem a ordem de feature_columns.
+def predict_frame(df, model, preprocessor, label_encoder, feature_columns, threshold=0.5):
+    df_model = df.drop(columns=['id', 'satisfaction', 'age_group', 'delay_category', 'cluster'], errors='ignore')
+
+    X_proc = preprocessor.transform(df_model)
+    if X_proc.shape[1] != len(feature_columns):
+        raise ValueError(
+            f"O pré-processador gerou {X_proc.shape[1]} colunas; o modelo espera {len(feature_columns)}."
+        )
+
+    probas = model.predict_proba(X_proc)[:, 1]
+    preds = (probas > threshold).astype(int)
+
+    df['prediction'] = label_encoder.inverse_transform(preds)
+    df['probability'] = probas
+
+    if 'satisfaction_flag' not in df.columns and 'satisfaction' in df.columns:
+        df['satisfaction_flag'] = (df['satisfaction'] == 'satisfied').astype(int)
+    return preds, probas
+
+
+# --- Agregados acumulados chunk a chunk para a página de resultados ---
+# Guarda apenas contagens, somas e momentos: a memória não cresce com o
+# número de linhas do arquivo. Com charts=False (modo completo, em que o
+# EDAEngine gera os gráficos a partir do DataFrame) só acumula os totais e as
+# médias do resumo.
+class RunningAggregates:
+    def __init__(self, pizza_vars=PIZZA_VARS, charts=True):
+        self.pizza_vars = pizza_vars
+        self.charts = charts
+        self.num_rows = 0
+        self.positives = 0
+        self.proba_sum = 0.0
+        self.metric_sums = dict.fromkeys(METRIC_COLS, 0.0)
+        self.metric_counts = dict.fromkeys(METRIC_COLS, 0)
+        self.prediction_counts = pd.Series(dtype='int64')
+        self.proba_edges = PROBABILITY_EDGES
+        self.proba_counts = np.zeros(PROBABILITY_BINS, dtype=np.int64)
+        self.age_table = None
+        self.delay_table = None
+        # Acurácia e AUC (apenas se o arquivo tiver a coluna 'satisfaction')
+        self.labeled = 0
+        self.correct = 0
+        self.auc_edges = np.linspace(0, 1, AUC_BINS + 1)
+        self.auc_pos = np.zeros(AUC_BINS, dtype=np.int64)
+        self.auc_neg = np.zeros(AUC_BINS, dtype=np.int64)
+        # % de satisfeitos por variável: valor -> (soma do flag, contagem)
+        self.rate_sums = {}
+        self.rate_counts = {}
+        # Momentos para a correlação par a par (ignorando NaN como o pandas)
+        self.corr_cols = None
+        self.corr_n = None
+        self.corr_sx = None
+        self.corr_sxx = None
+        self.corr_sxy = None
+
+    @staticmethod
+    def _add(acc, new):
+        return new if acc is None else acc.add(new, fill_value=0)
+
+    def update(self, df, preds, probas, true_labels=None):
+        self.num_rows += len(df)
+        self.positives += int((preds == 1).sum())
+        self.proba_sum += float(probas.sum())
+
+        for col in METRIC_COLS:
+            values = df[col]
+            self.metric_sums[col] += float(values.sum())
+            self.metric_counts[col] += int(values.count())
+
+        if not self.charts:
+            return
+
+        self.prediction_counts = self.prediction_counts.add(prediction_counts(df['prediction']), fill_value=0)
+        self.proba_counts += np.histogram(probas, bins=self.proba_edges)[0]
+
+        if 'Age' in df.columns:
+            age_group = age_chart_groups(df['Age'])
+            self.age_table = self._add(self.age_table, grouped_counts(age_group, df['prediction']))
+        delay_category = delay_chart_categories(df['total_delay'])
+        self.delay_table = self._add(self.delay_table, grouped_counts(delay_category, df['prediction']))
+
+        if true_labels is not None:
+            self.labeled += len(true_labels)
+            self.correct += int((true_labels == preds).sum())
+            self.auc_pos += np.histogram(probas[true_labels == 1], bins=self.auc_edges)[0]
+            self.auc_neg += np.histogram(probas[true_labels == 0], bins=self.auc_edges)[0]
+
+        self._update_rates(df)
+        self._update_correlation(df)
+
+    def _update_rates(self, df):
+        if 'satisfaction_flag' in df.columns:
+            flag = df['satisfaction_flag']
+        else:
+            flag = (df['prediction'] == 'satisfied').astype(int)
+        # As faixas de idade/distância são montadas no final a partir dos valores brutos
+        sources = {'Flight Distance_grupo': 'Flight Distance', 'Age_grupo': 'Age'}
+        for var in self.pizza_vars:
+            col = sources.get(var, var)
+            if col not in df.columns:
+                continue
+            grouped = flag.groupby(df[col])
+            self.rate_sums[var] = self._add(self.rate_sums.get(var), grouped.sum())
+            self.rate_counts[var] = self._add(self.rate_counts.get(var), grouped.count())
+
+    def _update_correlation(self, df):
+        if self.corr_cols is None:
+            self.corr_cols = list(df.select_dtypes(include=['number']).columns)
+            k = len(self.corr_cols)
+            self.corr_n = np.zeros((k, k))
+            self.corr_sx = np.zeros((k, k))
+            self.corr_sxx = np.zeros((k, k))
+            self.corr_sxy = np.zeros((k, k))
+        X = df.reindex(columns=self.corr_cols).apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        mask = ~np.isnan(X)
+        M = mask.astype(float)
+        X0 = np.where(mask, X, 0.0)
+        # Para cada par (i, j) só entram as linhas em que ambas as colunas têm valor
+        self.corr_n += M.T @ M
+        self.corr_sx += X0.T @ M
+        self.corr_sxx += (X0 ** 2).T @ M
+        self.corr_sxy += X0.T @ X0
+
+    def correlation_matrix(self):
+        n = self.corr_n
+        sx, sy = self.corr_sx, self.corr_sx.T
+        sxx, syy = self.corr_sxx, self.corr_sxx.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = n * self.corr_sxy - sx * sy
+            var = (n * sxx - sx ** 2) * (n * syy - sy ** 2)
+            corr = cov / np.sqrt(var)
+        corr[var <= 0] = np.nan
+        return pd.DataFrame(corr, index=self.corr_cols, columns=self.corr_cols)
+
+    def metrics(self):
+        means = {
+            col: (self.metric_sums[col] / self.metric_counts[col]) if self.metric_counts[col] else float('nan')
+            for col in METRIC_COLS
+        }
+        return {
+            'avg_total_delay': round(means['total_delay'], 2),
+            'avg_delay_ratio': round(means['delay_ratio'], 4),
+            'delay_indicator_rate': round(means['delay_indicator'] * 100, 2),
+            'avg_service_score': round(means['service_score'], 2),
+            'avg_service_consistency': round(means['service_consistency'], 2),
+            'avg_service_entropy': round(means['service_entropy'], 4)
+        }
+
+    def accuracy(self):
+        if not self.labeled:
+            return None
+        return round(self.correct / self.labeled * 100, 2)
+
+    def roc_auc(self):
+        # AUC aproximada pelos histogramas de probabilidade de cada classe
+        pos, neg = self.auc_pos.sum(), self.auc_neg.sum()
+        if not pos or not neg:
+            return None
+        neg_below = np.cumsum(self.auc_neg) - self.auc_neg
+        auc = (self.auc_pos * (neg_below + 0.5 * self.auc_neg)).sum() / (pos * neg)
+        return round(float(auc) * 100, 2)
+
+    def satisfaction_rates(self):
+        rates = {}
+        for var in self.pizza_vars:
+            if var not in self.rate_counts:
+                continue
+            sums, counts = self.rate_sums[var], self.rate_counts[var]
+            if var == 'Flight Distance_grupo':
+                groups = pd.cut(counts.index.to_series(), 5, labels=DISTANCE_GRUPO_LABELS)
+            elif var == 'Age_grupo':
+                groups = pd.cut(counts.index.to_series(), AGE_GRUPO_BINS, labels=AGE_GRUPO_LABELS)
+            else:
+                groups = None
+            if groups is not None:
+                sums = sums.groupby(groups.values, observed=False).sum()
+                counts = counts.groupby(groups.values, observed=False).sum()
+            rates[var] = (sums / counts.where(counts > 0) * 100).round(1)
+        return rates
+
+
+# --- Leitura do CSV: inteiro ou em chunks de tamanho fixo ---
+def iter_csv_chunks(source, chunksize=None):
+    if chunksize is None:
+        yield pd.read_csv(source)
+        return
+    with pd.read_csv(source, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk
+
+
+# --- Pipeline completo de um upload ---
+# Com chunksize=None o arquivo é lido inteiro e a EDA completa é gerada a partir
+# do DataFrame. Com chunksize definido o arquivo é processado em streaming:
+# features, inferência, escrita do CSV e inserção no banco são feitas chunk a
+# chunk e a página de resultados é montada só a partir dos agregados.
+# progress, se informado, é chamado com o número de linhas já processadas;
+# on_upload, com o id do upload assim que ele é registrado no banco.
+def process_upload(source, original_filename, user_id, assets=None, chunksize=None, progress=None,
+                   on_upload=None):
+    # Sem artefatos explícitos usa os do registro do processo (carregados uma única vez)
+    if assets is None:
+        assets = get_model_assets()
+    model, preprocessor, label_encoder, feature_columns, cluster_model = assets
+    threshold = current_app.config['DECISION_THRESHOLD']
+    streaming = chunksize is not None
+
+    # Lê o primeiro chunk antes de registrar o upload, para que erros de leitura
+    # não deixem registros pendentes no banco
+    chunks = iter_csv_chunks(source, chunksize)
+    first_chunk = next(chunks)
+
+    out_path = os.path.join(current_app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}_predictions{RESULTS_EXTENSION}")
+
+    conn = get_db()
+    cursor = conn.execute(
+        '''INSERT INTO uploads (user_id, filename, original_filename, processed, num_rows)
+           VALUES (?, ?, ?, ?, ?)''',
+        (user_id, os.path.basename(out_path), original_filename, 0, 0)
+    )
+    conn.commit()
+    upload_id = cursor.lastrowid
+    if on_upload is not None:
+        on_upload(upload_id)
+
+    # Uma falha no meio do arquivo (coluna ausente, erro do modelo...) não deixa
+    # upload pendente, predições parciais nem Parquet incompleto para trás
+    try:
+        aggregates = RunningAggregates(charts=streaming)
+        frames = []
+        all_preds, all_probas, all_true = [], [], []
+        insert_rows, insert_seconds = 0, 0.0
+
+        # Resultado gravado em Parquet (comprimido e tipado); o CSV só é gerado no download
+        with ResultWriter(out_path) as writer:
+            for chunk in itertools.chain([first_chunk], chunks):
+                engineer_features(chunk)
+                cluster_model = assign_clusters(chunk, cluster_model)
+                preds, probas = predict_frame(chunk, model, preprocessor, label_encoder, feature_columns, threshold)
+
+                true_labels = None
+                if 'satisfaction' in chunk.columns:
+                    true_labels = label_encoder.transform(chunk['satisfaction'])
+
+                aggregates.update(chunk, preds, probas, true_labels)
+                writer.write(chunk)
+                stats = _insert_predictions(conn, upload_id, chunk)
+                insert_rows += stats['rows']
+                insert_seconds += stats['seconds']
+
+                if not streaming:
+                    frames.append(chunk)
+                    all_preds.append(preds)
+                    all_probas.append(probas)
+                    if true_labels is not None:
+                        all_true.append(true_labels)
+
+                if progress is not None:
+                    progress(aggregates.num_rows)
+
+        conn.execute(
+            'UPDATE uploads SET processed = 1, num_rows = ? WHERE id = ?',
+            (aggregates.num_rows, upload_id)
+        )
+        conn.commit()
+    except BaseException:
+        discard_upload(conn, upload_id, out_path)
+        raise
+
+    current_app.logger.info(
+        f"Upload {upload_id}: {insert_rows} predições gravadas em {insert_seconds:.2f}s "
+        f"({insert_rows / insert_seconds if insert_seconds else 0:.0f} linhas/s)"
+    )
+
+    context = dict(
+        num_passengers=aggregates.num_rows,
+        satisfaction_rate=round(aggregates.positives / max(aggregates.num_rows, 1) * 100, 2),
+        avg_proba=round(aggregates.proba_sum / max(aggregates.num_rows, 1) * 100, 2),
+        filename=os.path.basename(out_path),
+        upload_id=upload_id,
+        **aggregates.metrics()
+    )
+
+    if streaming:
+        context.update(_streaming_charts(aggregates))
+    else:
+        df = frames[0]
+        preds, probas = all_preds[0], all_probas[0]
+        context.update(_full_charts(df, preds, probas, all_true[0] if all_true else None))
+    return context
+
+
+# --- Remove um upload que não chegou ao fim: linha, predições e arquivo ---
+def discard_upload(conn, upload_id, path):
+    if conn.in_transaction:
+        conn.rollback()
+    conn.execute('DELETE FROM predictions WHERE upload_id = ?', (upload_id,))
+    conn.execute('DELETE FROM uploads WHERE id = ?', (upload_id,))
+    conn.commit()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# --- Inserção das predições de um chunk ---
+def _insert_predictions(conn, upload_id, df):
+    passenger_ids = df['id'].to_numpy() if 'id' in df.columns else np.full(len(df), '')
+    return bulk_insert_predictions(
+        conn, upload_id,
+        passenger_ids,
+        df['prediction'].to_numpy(),
+        df['probability'].to_numpy()
+    )
+
+
+# --- Gráficos e tabelas a partir do DataFrame completo ---
+def _full_charts(df, preds, probas, true_labels):
+    if true_labels is not None:
+        accuracy = round(accuracy_score(true_labels, preds) * 100, 2)
+        roc_auc = round(roc_auc_score(true_labels, probas) * 100, 2)
+    else:
+        accuracy = None
+        roc_auc = None
+
+    # Cada gráfico e agregado é calculado uma única vez pelo motor de EDA
+    engine = EDAEngine(df, probas)
+    context = dict(
+        accuracy=accuracy,
+        roc_auc=roc_auc,
+        graph_html=engine.prediction_chart(),
+        prob_html=engine.probability_chart(),
+        age_group_html=engine.age_group_chart(),
+        delay_cat_html=engine.delay_category_chart(),
+        pizza_imgs=engine.pizza_charts(PIZZA_VARS),
+        tables=[engine.correlation_table().to_html(classes='data correlation-sorted', index=False)]
+    )
+    current_app.logger.info(f"Tempos da EDA (s): {engine.timings}")
+    return context
+
+
+# --- Gráficos e tabelas a partir dos agregados (modo streaming) ---
+def _streaming_charts(aggregates):
+    corr_df = sorted_correlation_pairs(aggregates.correlation_matrix())
+    corr_table_html = corr_df.to_html(classes='data correlation-sorted', index=False)
+
+    age_group_html = None
+    if aggregates.age_table is not None:
+        age_group_html = plot_age_group_counts(aggregates.age_table)
+
+    return dict(
+        accuracy=aggregates.accuracy(),
+        roc_auc=aggregates.roc_auc(),
+        graph_html=plot_prediction_counts(aggregates.prediction_counts),
+        prob_html=plot_probability_counts(aggregates.proba_counts, aggregates.proba_edges),
+        age_group_html=age_group_html,
+        delay_cat_html=plot_delay_category_counts(aggregates.delay_table),
+        pizza_imgs={var: plot_satisfaction_rate(var, pct) for var, pct in aggregates.satisfaction_rates().items()},
+        tables=[corr_table_html]
+    )
@@ -1,38 +1,39 @@
-from flask import Blueprint, request, session, redirect, url_for, render_template, flash, current_app as app
+from flask import Blueprint, request, session, redirect, url_for, render_template, flash, jsonify, abort, send_file, current_app as app
 from markupsafe import Markup
 import os
 import uuid
 import pandas as pd
-import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.metrics import accuracy_score, roc_auc_score
 from werkzeug.utils import secure_filename
 
 # Importações do próprio projeto
 from app.extensions import limiter
-from app.auth import login_required
-from app.eda import (
-    perform_eda,
-    build_sorted_correlation_table,
-    generate_prediction_distribution_plot,
-    generate_probability_distribution_plot,
-    generate_age_group_distribution,
-    generate_delay_category_plot,
-    generate_pizza_charts,
-    load_model_assets
-)
+from app.auth import login_required, skip_user_lookup
+from app.eda import PLOTLYJS_PATH, PLOTLYJS_VERSION
+from app.pipeline import process_upload
+from app.jobs import create_job, finish_job, submit_job, get_job, load_job_result, DONE, FAILED
+from app.model_registry import model_version
+from app.result_cache import content_digest, get_result_cache
 from app.database import get_db
+from app.storage import RESULTS_EXTENSION, read_page, result_columns
 
 # Criação do blueprint para rotas de predição
 prediction = Blueprint('prediction', __name__)
 
-# Carregamento dos artefatos do modelo (modelo, pre-processador, codificador e nomes das features)
-model, preprocessor, label_encoder, feature_columns = load_model_assets()
-
 # Função auxiliar para verificar se o ficheiro é CSV
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() == 'csv'
 
+# Tamanho em bytes de um caminho local ou de um upload (FileStorage)
+def _source_size(source):
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    stream = source.stream
+    pos = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(pos)
+    return size
+
 @prediction.route('/', methods=['GET', 'POST'])
 @login_required
 @limiter.limit("10 per minute")  # Limite de 10 requisições por minuto por usuário
@@ -47,7 +48,7 @@ def index():
             if not os.path.exists(test_path):
                 flash('Arquivo de exemplo não encontrado.', 'error')
                 return redirect(request.url)
-            df = pd.read_csv(test_path)
+            source = test_path
             original_filename = 'test.csv'
 
         elif action == 'upload':
@@ -61,150 +62,184 @@ def index():
                 flash('Por favor, envie um arquivo CSV válido.', 'error')
                 return redirect(request.url)
 
-            try:
-                df = pd.read_csv(file)
-                original_filename = file.filename
-            except Exception as e:
-                flash(f'Erro ao ler o CSV: {e}', 'error')
-                return redirect(request.url)
+            source = file
+            original_filename = file.filename
         else:
             flash('Ação inválida.', 'error')
             return redirect(request.url)
 
-        # ------------------- Engenharia de features -------------------
-
-        df['total_delay'] = df['Departure Delay in Minutes'].fillna(0) + df['Arrival Delay in Minutes'].fillna(0)
-        df['delay_ratio'] = df['total_delay'] / (df['Flight Distance'] + 1)
-        df['delay_indicator'] = (df['total_delay'] > 0).astype(int)
-
-        service_cols = [
-            'Inflight wifi service', 'Departure/Arrival time convenient', 'Ease of Online booking',
-            'Gate location', 'Food and drink', 'Online boarding', 'Seat comfort',
-            'Inflight entertainment', 'On-board service', 'Leg room service',
-            'Baggage handling', 'Checkin service', 'Inflight service', 'Cleanliness'
-        ]
-
-        df['service_score'] = df[service_cols].mean(axis=1)
-        df['service_consistency'] = df[service_cols].std(axis=1)
-
-        eps = 1e-9
-        total_service = df[service_cols].sum(axis=1) + eps
-        probs = df[service_cols].div(total_service, axis=0)
-        df['service_entropy'] = - (probs * np.log(probs + eps)).sum(axis=1)
+        # Arquivos grandes são processados em streaming, chunk a chunk
+        chunksize = None
+        if _source_size(source) > app.config['STREAMING_THRESHOLD_BYTES']:
+            chunksize = app.config['PREDICTION_CHUNK_SIZE']
+
+        # Mesmo arquivo + mesma versão do modelo: reaproveita o resultado do cache
+        cache = get_result_cache()
+        cache_key = None
+        version = model_version() if cache is not None else None
+        if version is not None:
+            cache_key = cache.key(
+                content_digest(source), version,
+                threshold=app.config['DECISION_THRESHOLD'], streaming=chunksize is not None
+            )
+            context = cache.restore(cache_key, user_id, original_filename)
+            if context is not None:
+                # Clientes da API assíncrona recebem um job já concluído
+                if app.config['ASYNC_PREDICTIONS'] and request.accept_mimetypes.best == 'application/json':
+                    job_id = create_job(user_id, original_filename, '')
+                    finish_job(job_id, context)
+                    return jsonify(
+                        job_id=job_id,
+                        status=DONE,
+                        status_url=url_for('prediction.job_status', job_id=job_id),
+                        results_url=url_for('prediction.job_results', job_id=job_id)
+                    )
+                flash('Arquivo já processado anteriormente; resultado recuperado do cache.', 'success')
+                return _render_results(context)
+
+        # Modo assíncrono: salva o upload, cria o job e responde imediatamente
+        if app.config['ASYNC_PREDICTIONS']:
+            if isinstance(source, str):
+                source_path = os.path.abspath(source)
+            else:
+                source_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}_upload.csv")
+                source.save(source_path)
+            job_id = create_job(user_id, original_filename, source_path)
+            submit_job(job_id, chunksize=chunksize, cache_key=cache_key)
+
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify(
+                    job_id=job_id,
+                    status_url=url_for('prediction.job_status', job_id=job_id)
+                ), 202
+            return redirect(url_for('prediction.job_page', job_id=job_id))
+
+        try:
+            context = process_upload(
+                source, original_filename, user_id,
+                chunksize=chunksize
+            )
+        except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+            flash(f'Erro ao ler o CSV: {e}', 'error')
+            return redirect(request.url)
 
-        df['age_group'] = pd.cut(df['Age'], bins=[0,18,35,60,120], labels=['Child','Young','Adult','Senior'])
+        if cache_key is not None:
+            cache.store(cache_key, context, context['upload_id'])
 
-        bins = [-1,0,15,60,np.inf]
-        labels = ['No Delay','Short','Moderate','Severe']
-        df['delay_category'] = pd.cut(df['total_delay'], bins=bins, labels=labels)
+        flash('Arquivo processado com sucesso!', 'success')
+        return _render_results(context)
 
-        kmeans = KMeans(n_clusters=3, random_state=42)
-        df['cluster'] = kmeans.fit_predict(df[['service_score', 'total_delay']])
+    # GET renderiza página de upload
+    return render_template('index.html')
 
-        df_model = df.drop(columns=['id', 'satisfaction', 'age_group', 'delay_category', 'cluster'], errors='ignore')
 
-        X_proc = preprocessor.transform(df_model)
-        df_proc = pd.DataFrame(X_proc, columns=feature_columns)
+def _render_results(context):
+    # Resultados em Parquet são paginados no servidor (ver results_data); os
+    # antigos, em CSV, ainda trazem a prévia em HTML com as primeiras linhas
+    filename = context['filename']
+    if filename.endswith(RESULTS_EXTENSION):
+        context['data_columns'] = result_columns(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+        context['data_url'] = url_for('prediction.results_data', filename=filename)
+    if context.get('df_table_html'):
+        context['df_table_html'] = Markup(context['df_table_html'])
+    context['tables'] = [Markup(t) for t in context['tables']]
+    context['plotly_version'] = PLOTLYJS_VERSION
+    return render_template('results.html', **context)
 
-        preds = model.predict(df_proc)
-        probas = model.predict_proba(df_proc)[:, 1]
 
-        df['prediction'] = label_encoder.inverse_transform(preds)
-        df['probability'] = probas
+# Maior página aceita pela tabela de resultados
+RESULTS_MAX_PAGE = 100
 
-        if 'satisfaction' in df.columns:
-            true_labels = label_encoder.transform(df['satisfaction'])
-            accuracy = round(accuracy_score(true_labels, preds) * 100, 2)
-            roc_auc = round(roc_auc_score(true_labels, probas) * 100, 2)
-        else:
-            accuracy = None
-            roc_auc = None
-
-        if 'satisfaction_flag' not in df.columns and 'satisfaction' in df.columns:
-            df['satisfaction_flag'] = (df['satisfaction'] == 'satisfied').astype(int)
-
-        # ------------------- EDA e visualizações -------------------
-
-        eda_html, df = perform_eda(df)
-        corr_df = build_sorted_correlation_table(df)
-        corr_table_html = corr_df.to_html(classes='data correlation-sorted', index=False)
-
-        graph_html       = generate_prediction_distribution_plot(df)
-        prob_html        = generate_probability_distribution_plot(probas)
-        age_group_html   = generate_age_group_distribution(df)
-        delay_cat_html   = generate_delay_category_plot(df)
-
-        pizza_imgs = generate_pizza_charts(df, [
-            'Online boarding', 'Inflight entertainment', 'Seat comfort', 'On-board service', 'Cleanliness', 'Leg room service',
-            'Inflight wifi service', 'Baggage handling', 'Checkin service', 'Inflight service', 'Food and drink',
-            'Ease of Online booking', 'Flight Distance_grupo', 'Age_grupo'
-        ])
-
-        df_display = df.copy()
-        if 'satisfaction_flag' in df_display.columns:
-            df_display = df_display.drop(columns=['satisfaction_flag'])
-        cols_to_move = ['satisfaction', 'prediction', 'probability']
-        cols_to_move = [c for c in cols_to_move if c in df_display.columns]
-        cols = [c for c in df_display.columns if c not in cols_to_move] + cols_to_move
-        df_display = df_display[cols]
-        df_display_limited = df_display.head(100)
-        df_table_html = df_display_limited.to_html(classes='data', index=False)
-
-        metrics = {
-            'avg_total_delay': round(df['total_delay'].mean(), 2),
-            'avg_delay_ratio': round(df['delay_ratio'].mean(), 4),
-            'delay_indicator_rate': round(df['delay_indicator'].mean() * 100, 2),
-            'avg_service_score': round(df['service_score'].mean(), 2),
-            'avg_service_consistency': round(df['service_consistency'].mean(), 2),
-            'avg_service_entropy': round(df['service_entropy'].mean(), 4)
-        }
-
-        out_csv = os.path.join(app.config['UPLOAD_FOLDER'], f"{uuid.uuid4().hex}_predictions.csv")
-        df.to_csv(out_csv, index=False)
-
-        conn = get_db()
-        cursor = conn.execute(
-            '''INSERT INTO uploads (user_id, filename, original_filename, processed, num_rows)
-               VALUES (?, ?, ?, ?, ?)''',
-            (user_id, os.path.basename(out_csv), original_filename, 1, len(df))
-        )
-        conn.commit()
-        upload_id = cursor.lastrowid
-
-        for idx, row in df.iterrows():
-            passenger_id = str(row.get('id', ''))
-            conn.execute(
-                '''INSERT INTO predictions (upload_id, passenger_id, prediction, probability)
-                   VALUES (?, ?, ?, ?)''',
-                (upload_id, passenger_id, row['prediction'], float(row['probability']))
-            )
-        conn.commit()
 
-        flash('Arquivo processado com sucesso!', 'success')
+# --- Linhas do resultado no protocolo server-side do DataTables ---
+# Cada página, ordenação e busca é resolvida no Parquet do upload; a resposta
+# tem o tamanho de uma página, seja qual for o número de linhas do arquivo.
+@prediction.route('/results/<filename>/data')
+@skip_user_lookup  # consultado a cada troca de página
+@login_required
+def results_data(filename):
+    owner = get_db().execute(
+        'SELECT 1 FROM uploads WHERE user_id = ? AND filename = ?', (session.get('user_id'), filename)
+    ).fetchone()
+    path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if owner is None or not filename.endswith(RESULTS_EXTENSION) or not os.path.exists(path):
+        abort(404)
+
+    args = request.args
+    draw = args.get('draw', 0, type=int)
+    start = max(args.get('start', 0, type=int), 0)
+    length = args.get('length', 10, type=int)
+    if length < 1 or length > RESULTS_MAX_PAGE:
+        length = RESULTS_MAX_PAGE
+
+    columns = result_columns(path)
+    order = None
+    index = args.get('order[0][column]', type=int)
+    if index is not None and 0 <= index < len(columns):
+        order = (columns[index], args.get('order[0][dir]') == 'desc')
+
+    total, filtered, rows = read_page(path, start, length, order=order, search=args.get('search[value]', '').strip())
+    return jsonify(draw=draw, recordsTotal=total, recordsFiltered=filtered, data=rows)
+
+
+# Bundle do plotly.js servido localmente e cacheado pelo navegador; a versão vai
+# na query string da URL, então o cache pode ser longo
+@prediction.route('/assets/plotly.min.js')
+@skip_user_lookup
+def plotly_js():
+    return send_file(PLOTLYJS_PATH, mimetype='application/javascript', conditional=True, max_age=31536000)
+
+
+# Estado e progresso de um job (consultado periodicamente pela página de espera)
+@prediction.route('/jobs/<job_id>')
+@skip_user_lookup  # consultado em polling pela página do job
+@login_required
+def job_status(job_id):
+    job = get_job(job_id, session.get('user_id'))
+    if job is None:
+        return jsonify(error='Job não encontrado.'), 404
+    payload = {
+        'job_id': job['id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'rows_processed': job['rows_processed'],
+        'message': job['message']
+    }
+    if job['status'] == DONE:
+        payload['results_url'] = url_for('prediction.job_results', job_id=job_id)
+    return jsonify(payload)
+
+
+# Página de espera que acompanha o job até terminar
+@prediction.route('/jobs/<job_id>/view')
+@login_required
+def job_page(job_id):
+    job = get_job(job_id, session.get('user_id'))
+    if job is None:
+        abort(404)
+    return render_template('job.html', job=job)
 
-        return render_template(
-            'results.html',
-            eda_html=eda_html,
-            num_passengers=len(df),
-            satisfaction_rate=round((preds == 1).mean() * 100, 2),
-            avg_proba=round(probas.mean() * 100, 2),
-            accuracy=accuracy,
-            roc_auc=roc_auc,
-            avg_total_delay=metrics['avg_total_delay'],
-            avg_delay_ratio=metrics['avg_delay_ratio'],
-            delay_indicator_rate=metrics['delay_indicator_rate'],
-            avg_service_score=metrics['avg_service_score'],
-            avg_service_consistency=metrics['avg_service_consistency'],
-            avg_service_entropy=metrics['avg_service_entropy'],
-            graph_html=graph_html,
-            prob_html=prob_html,
-            age_group_html=age_group_html,
-            delay_cat_html=delay_cat_html,
-            pizza_imgs=pizza_imgs,
-            df_table_html=Markup(df_table_html),
-            tables=[Markup(corr_table_html)],
-            filename=os.path.basename(out_csv)
-        )
 
-    # GET renderiza página de upload
-    return render_template('index.html')
+# Resultados de um job concluído
+@prediction.route('/jobs/<job_id>/results')
+@login_required
+def job_results(job_id):
+    job = get_job(job_id, session.get('user_id'))
+    if job is None:
+        abort(404)
+    if job['status'] == FAILED:
+        flash(f"Erro ao processar o arquivo: {job['message']}", 'error')
+        return redirect(url_for('prediction.index'))
+    if job['status'] != DONE:
+        return redirect(url_for('prediction.job_page', job_id=job_id))
+    return _render_results(load_job_result(job))
+
+
+# Contadores do cache de resultados deste processo
+@prediction.route('/cache/stats')
+@login_required
+def cache_stats():
+    cache = get_result_cache()
+    if cache is None:
+        return jsonify(enabled=False)
+    return jsonify(enabled=True, **cache.stats())
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+from flask import current_app
+
+from app.database import get_db
+from app.storage import evict_lru
+
+# Cache de resultados em disco, indexado pelo hash do CSV enviado e pela versão
+# dos artefatos do modelo. Cada entrada é uma pasta com:
+#   context.json     -> métricas, tabelas e gráficos (HTML com a especificação das figuras)
+#   predictions.*    -> arquivo de predições do upload original (Parquet)
+#   meta.json        -> upload de origem e número de linhas
+# Um reenvio do mesmo arquivo reaproveita tudo isso sem inferência nem EDA.
+# O acesso mais recente é a data de modificação da pasta (LRU por tamanho).
+
+
+# Converte tipos do NumPy para tipos nativos na serialização em JSON
+def json_default(value):
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+# --- Hash do conteúdo de um caminho local ou de um upload (FileStorage) ---
+def content_digest(source):
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    else:
+        stream = source.stream
+        pos = stream.tell()
+        stream.seek(0)
+        for block in iter(lambda: stream.read(1 << 20), b''):
+            digest.update(block)
+        stream.seek(pos)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    # Chave da entrada: conteúdo + versão do modelo + parâmetros que mudam o resultado
+    @staticmethod
+    def key(digest, model_version, **params):
+        extra = ';'.join(f"{name}={params[name]}" for name in sorted(params))
+        return hashlib.sha256(f"{digest};{model_version};{extra}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    # --- Recupera uma entrada e a registra como um novo upload do usuário ---
+    # As predições são copiadas no próprio SQLite a partir do upload de origem.
+    # Se ele não existir mais (ou estiver incompleto) a entrada é descartada.
+    def restore(self, key, user_id, original_filename):
+        entry = self._path(key)
+        try:
+            with open(os.path.join(entry, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(os.path.join(entry, 'context.json'), encoding='utf-8') as f:
+                context = json.load(f)
+        except (OSError, ValueError):
+            self._count(hit=False)
+            return None
+
+        ext = meta.get('ext', '.csv')
+        cached_file = os.path.join(entry, f'predictions{ext}')
+        filename = f"{uuid.uuid4().hex}_predictions{ext}"
+        out_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+        try:
+            os.link(cached_file, out_path)
+        except OSError:
+            try:
+                shutil.copyfile(cached_file, out_path)
+            except OSError:
+                self.discard(key)
+                self._count(hit=False)
+                return None
+
+        conn = get_db()
+        cursor = conn.execute(
+            '''INSERT INTO uploads (user_id, filename, original_filename, processed, num_rows)
+               VALUES (?, ?, ?, ?, ?)''',
+            (user_id, filename, original_filename, 1, meta['num_rows'])
+        )
+        upload_id = cursor.lastrowid
+        copied = conn.execute(
+            '''INSERT INTO predictions (upload_id, passenger_id, prediction, probability)
+               SELECT ?, passenger_id, prediction, probability
+               FROM predictions WHERE upload_id = ? ORDER BY id''',
+            (upload_id, meta['upload_id'])
+        ).rowcount
+        if copied != meta['num_rows']:
+            conn.rollback()
+            os.remove(out_path)
+            self.discard(key)
+            self._count(hit=False)
+            return None
+        conn.commit()
+
+        os.utime(entry)
+        self._count(hit=True)
+        # O contexto passa a apontar para o upload recém-criado (do usuário atual)
+        context['filename'] = filename
+        context['upload_id'] = upload_id
+        return context
+
+    # --- Grava o resultado de um upload recém-processado ---
+    def store(self, key, context, upload_id):
+        entry = self._path(key)
+        if os.path.isdir(entry):
+            return
+        result_path = os.path.join(current_app.config['UPLOAD_FOLDER'], context['filename'])
+        ext = os.path.splitext(result_path)[1]
+        tmp = f"{entry}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(tmp)
+            try:
+                os.link(result_path, os.path.join(tmp, f'predictions{ext}'))
+            except OSError:
+                shutil.copyfile(result_path, os.path.join(tmp, f'predictions{ext}'))
+            with open(os.path.join(tmp, 'context.json'), 'w', encoding='utf-8') as f:
+                json.dump(context, f, default=json_default)
+            with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump({'upload_id': upload_id, 'num_rows': context['num_passengers'],
+                           'ext': ext, 'created_at': time.time()}, f)
+            # Publica a entrada de forma atômica (outro processo pode ter gravado antes)
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+    def discard(self, key):
+        shutil.rmtree(self._path(key), ignore_errors=True)
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.tmp') or not os.path.isdir(path):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                entries.append((os.stat(path).st_mtime, size, name))
+            except OSError:
+                continue
+        return entries
+
+    # --- Remove as entradas usadas há mais tempo até caber no limite de tamanho ---
+    def evict(self):
+        removed = evict_lru(self._entries(), self.max_bytes, self.discard)
+        with self._lock:
+            self.evictions += removed
+
+    def stats(self):
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes
+            }
+
+
+# Um cache por aplicação; None quando desabilitado
+def get_result_cache():
+    if not current_app.config['RESULT_CACHE_ENABLED']:
+        return None
+    cache = current_app.extensions.get('result_cache')
+    if cache is None:
+        directory = current_app.config['RESULT_CACHE_DIR'] or os.path.join(current_app.config['UPLOAD_FOLDER'], 'cache')
+        cache = current_app.extensions.setdefault(
+            'result_cache', ResultCache(directory, current_app.config['RESULT_CACHE_MAX_BYTES'])
+        )
+    return cache
@@ -0,0 +1,322 @@
+import glob
+import os
+import re
+import threading
+import uuid
+import zlib
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# Resultados processados ficam em Parquet comprimido (colunas tipadas); o CSV
+# só é gerado, em streaming, quando o usuário faz o download.
+RESULTS_EXTENSION = '.parquet'
+PARQUET_COMPRESSION = 'zstd'
+CSV_BATCH_ROWS = 50_000
+FILE_BLOCK_BYTES = 1 << 20
+GZIP_LEVEL = 6
+# Row groups pequenos: uma página da tabela de resultados lê só o grupo que a contém
+ROW_GROUP_ROWS = 65_536
+# Colunas exibidas por último na tabela de resultados (rótulos e predição)
+LABEL_COLUMNS = ['satisfaction', 'prediction', 'probability']
+HIDDEN_COLUMNS = ['satisfaction_flag']
+# Termos que podem aparecer no texto de um número
+NUMERIC_SEARCH = re.compile(r'[0-9.eE+-]+')
+# Até esta posição a página ordenada sai de uma seleção parcial (top-k), sem
+# ordenar o arquivo inteiro
+SELECT_K_LIMIT = 10_000
+
+
+# --- Grava os chunks de um upload num único arquivo Parquet ---
+# O esquema é o do primeiro chunk; os seguintes são convertidos para ele.
+class ResultWriter:
+    def __init__(self, path, compression=PARQUET_COMPRESSION):
+        self.path = path
+        self.compression = compression
+        self._writer = None
+        self._schema = None
+
+    def write(self, df):
+        if self._writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._schema = table.schema
+            self._writer = pq.ParquetWriter(self.path, self._schema, compression=self.compression)
+        else:
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        self._writer.write_table(table, row_group_size=ROW_GROUP_ROWS)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- Converte o Parquet em CSV sob demanda, lote a lote ---
+# Cada lote passa pelo to_csv do pandas, para que o arquivo baixado seja
+# idêntico ao CSV que era gravado antes (mesma formatação de números e aspas).
+def iter_csv(path, batch_rows=CSV_BATCH_ROWS):
+    parquet = pq.ParquetFile(path)
+    header = True
+    for batch in parquet.iter_batches(batch_size=batch_rows):
+        yield batch.to_pandas().to_csv(index=False, header=header).encode()
+        header = False
+    if header:
+        # Arquivo sem linhas: envia só o cabeçalho
+        yield (','.join(parquet.schema_arrow.names) + '\n').encode()
+
+
+# Blocos de um arquivo já em CSV (uploads antigos)
+def iter_file(path, block_size=FILE_BLOCK_BYTES):
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            yield block
+
+
+# --- Comprime em gzip, sob demanda, uma sequência de blocos de bytes ---
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # cabeçalho gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+# --- Grava o CSV de um resultado Parquet em disco (escrita atômica) ---
+# Usado quando o tamanho total precisa ser conhecido (requisições com Range).
+def export_csv(path, dest):
+    if os.path.exists(dest):
+        return dest
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            for chunk in iter_csv(path):
+                f.write(chunk)
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return dest
+
+
+# --- Remove as entradas usadas há mais tempo até o total caber em max_bytes ---
+# entries: (mtime, tamanho, nome); discard(nome) apaga uma entrada.
+# Retorna quantas foram removidas.
+def evict_lru(entries, max_bytes, discard):
+    entries = sorted(entries)
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, name in entries:
+        if total <= max_bytes:
+            break
+        discard(name)
+        total -= size
+        removed += 1
+    return removed
+
+
+# --- Exportações em CSV para downloads retomados (Range) ---
+# Ficam em <UPLOAD_FOLDER>/downloads como <nome>-<etag>.csv. São geradas numa
+# thread, para não prender o worker do gunicorn: enquanto não existem, o
+# download é servido inteiro em streaming. Uma nova exportação apaga as de
+# versões anteriores do mesmo resultado, e a pasta é limitada por tamanho (LRU
+# pela data de modificação, atualizada a cada uso).
+_exports_running = set()
+_exports_lock = threading.Lock()
+
+
+def export_path(directory, name, etag):
+    return os.path.join(directory, f"{name}-{etag}.csv")
+
+
+def _export_entries(directory):
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.csv') and entry.is_file():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.name))
+    return entries
+
+
+def prune_exports(directory, max_bytes):
+    return evict_lru(_export_entries(directory), max_bytes,
+                     lambda name: _remove_quietly(os.path.join(directory, name)))
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _run_export(path, dest, name, max_bytes):
+    directory = os.path.dirname(dest)
+    try:
+        export_csv(path, dest)
+        for old in glob.glob(os.path.join(glob.escape(directory), glob.escape(name) + '-*.csv')):
+            if old != dest:
+                _remove_quietly(old)
+        prune_exports(directory, max_bytes)
+    except OSError:
+        pass
+    finally:
+        with _exports_lock:
+            _exports_running.discard(dest)
+
+
+def export_in_background(path, directory, name, etag, max_bytes):
+    dest = export_path(directory, name, etag)
+    with _exports_lock:
+        if dest in _exports_running:
+            return None
+        _exports_running.add(dest)
+    thread = threading.Thread(target=_run_export, args=(path, dest, name, max_bytes),
+                              name='csv-export', daemon=True)
+    thread.start()
+    return thread
+
+
+# --- Colunas da tabela de resultados, na ordem de exibição ---
+def display_columns(columns):
+    labels = [c for c in LABEL_COLUMNS if c in columns]
+    return [c for c in columns if c not in labels and c not in HIDDEN_COLUMNS] + labels
+
+
+def result_columns(path):
+    return display_columns(pq.read_schema(path).names)
+
+
+# Colunas dictionary (texto e categóricas) viram valores simples
+def _plain(column):
+    if pa.types.is_dictionary(column.type):
+        return column.cast(column.type.value_type)
+    return column
+
+
+# --- Linhas em que alguma coluna contém o termo (sem diferenciar maiúsculas) ---
+# Colunas de texto chegam do Parquet como dictionary: o termo é procurado só nos
+# valores distintos. Números só viram texto se o termo puder aparecer neles.
+def _search_mask(table, search):
+    numeric = NUMERIC_SEARCH.fullmatch(search) is not None
+    mask = None
+    for column in table.columns:
+        if pa.types.is_dictionary(column.type):
+            found = pa.chunked_array([
+                pc.match_substring(pc.cast(chunk.dictionary, pa.string()), search, ignore_case=True).take(chunk.indices)
+                for chunk in column.chunks
+            ], type=pa.bool_())
+        elif pa.types.is_string(column.type) or numeric:
+            found = pc.match_substring(pc.cast(column, pa.string()), search, ignore_case=True)
+        else:
+            continue
+        found = pc.fill_null(found, False)
+        mask = found if mask is None else pc.or_(mask, found)
+    return mask
+
+
+# --- Busca row group a row group no arquivo ---
+# Cada row group é descartado antes de ler o próximo: só ficam em memória as
+# posições das linhas encontradas e, se houver ordenação, as chaves delas.
+def _search_rows(parquet, columns, search, order_column=None):
+    needed = list(columns)
+    if order_column is not None and order_column not in needed:
+        needed.append(order_column)
+    indices, keys = [], []
+    offset = 0
+    # Um row group por vez (iter_batches lê vários à frente e guarda em buffer)
+    for group in range(parquet.num_row_groups):
+        table = parquet.read_row_group(group, columns=needed)
+        mask = _search_mask(table.select(columns), search)
+        if mask is not None:
+            found = pc.indices_nonzero(mask)
+            indices.append(found.to_numpy().astype(np.int64) + offset)
+            if order_column is not None:
+                keys.append(_plain(table.column(order_column)).take(found))
+        offset += table.num_rows
+
+    indices = np.concatenate(indices) if indices else np.empty(0, dtype=np.int64)
+    if order_column is None or not len(indices):
+        return indices, None
+    return indices, pa.chunked_array([chunk for key in keys for chunk in key.chunks])
+
+
+# --- Lê do Parquet só os row groups que contêm as linhas pedidas ---
+# Devolve as linhas na ordem de indices.
+def _take_rows(parquet, indices, columns):
+    if len(indices) == 0:
+        return parquet.schema_arrow.empty_table().select(columns)
+    sizes = [parquet.metadata.row_group(i).num_rows for i in range(parquet.num_row_groups)]
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    groups = np.searchsorted(offsets, indices, side='right') - 1
+    # De cada row group só as linhas pedidas ficam em memória (numa página
+    # ordenada elas podem estar espalhadas pelo arquivo inteiro)
+    parts, positions = [], []
+    for group in np.unique(groups):
+        rows = np.flatnonzero(groups == group)
+        table = parquet.read_row_group(int(group), columns=columns)
+        parts.append(table.take(indices[rows] - offsets[group]))
+        positions.append(rows)
+    return pa.concat_tables(parts).take(np.argsort(np.concatenate(positions)))
+
+
+# --- Uma página do resultado (paginação, ordenação e busca no servidor) ---
+# Sem busca nem ordenação só os row groups da página são lidos. Ordenar lê a
+# coluna ordenada; a busca lê as colunas exibidas e filtra de forma vetorizada.
+# order é (coluna, descendente?) ou None. Retorna (total, filtrados, linhas).
+def read_page(path, start, length, order=None, search=''):
+    parquet = pq.ParquetFile(path, read_dictionary=_string_columns(path))
+    columns = display_columns(parquet.schema_arrow.names)
+    total = parquet.metadata.num_rows
+
+    if not search and order is None:
+        indices = np.arange(min(start, total), min(start + length, total))
+        filtered = total
+    else:
+        if search:
+            indices, keys = _search_rows(parquet, columns, search, order[0] if order else None)
+        else:
+            indices = np.arange(total)
+            keys = parquet.read(columns=[order[0]]).column(order[0])
+        filtered = len(indices)
+        if order is not None and filtered:
+            indices = _sorted(keys, indices, order[1], start + length)
+        indices = indices[start:start + length]
+
+    page = _take_rows(parquet, indices, columns)
+    # Floats não finitos não são JSON válido
+    page = pa.table([
+        pc.if_else(pc.is_finite(col), col, None) if pa.types.is_floating(col.type) else _plain(col)
+        for col in page.columns
+    ], names=columns)
+    rows = [list(row.values()) for row in page.to_pylist()]
+    return total, filtered, rows
+
+
+def _string_columns(path):
+    schema = pq.read_schema(path)
+    return [field.name for field in schema if pa.types.is_string(field.type)]
+
+
+# --- Posições (em indices) ordenadas pela coluna, nulos no fim ---
+# Empates seguem a ordem do arquivo, então as páginas nunca repetem linhas.
+def _sorted(column, indices, descending, stop):
+    keys = _plain(column)
+    if len(indices) != len(keys):
+        keys = keys.take(indices)
+    direction = 'descending' if descending else 'ascending'
+    if stop <= SELECT_K_LIMIT and stop < len(indices):
+        table = pa.table({'key': keys, 'row': np.arange(len(indices))})
+        ranking = pc.select_k_unstable(table, k=stop, sort_keys=[('key', direction), ('row', 'ascending')])
+    else:
+        ranking = pc.array_sort_indices(keys, order=direction, null_placement='at_end')
+    return indices[ranking.to_numpy()]
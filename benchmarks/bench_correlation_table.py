@@ -0,0 +1,66 @@
+# Benchmark da tabela de pares de correlação: stack + apply(sorted) por linha
+# (implementação anterior) vs. sorted_correlation_pairs com np.triu_indices.
+# Mede só a montagem da tabela a partir de uma matriz já calculada.
+#
+#   python benchmarks/bench_correlation_table.py [colunas ...]
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from app.eda import sorted_correlation_pairs  # noqa: E402
+
+
+def make_corr(k, n=2_000):
+    rng = np.random.default_rng(0)
+    data = rng.random((n, k)) @ rng.random((k, k))
+    return pd.DataFrame(data, columns=[f'col_{i}' for i in range(k)]).corr()
+
+
+def pairs_stack_apply(corr, threshold=0.1):
+    corr = corr.abs().round(2)
+    corr_long = (
+        corr
+        .stack()
+        .reset_index()
+        .rename(columns={'level_0': 'Feature 1', 'level_1': 'Feature 2', 0: 'Correlation'})
+    )
+    corr_long = corr_long[
+        (corr_long['Feature 1'] != corr_long['Feature 2']) &
+        (corr_long['Correlation'] >= threshold)
+    ]
+    corr_long['pair'] = corr_long.apply(
+        lambda row: tuple(sorted([row['Feature 1'], row['Feature 2']])),
+        axis=1
+    )
+    corr_long = corr_long.drop_duplicates('pair').drop(columns='pair')
+    return corr_long.sort_values(by='Correlation', ascending=False).reset_index(drop=True)
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(k):
+    corr = make_corr(k)
+    repeat = 3 if k > 100 else 10
+    old_time, old = timed(lambda: pairs_stack_apply(corr), repeat)
+    new_time, new = timed(lambda: sorted_correlation_pairs(corr), repeat)
+    top_time, _ = timed(lambda: sorted_correlation_pairs(corr, top_n=20), repeat)
+    assert old['Correlation'].tolist() == new['Correlation'].tolist()
+    print(f"{k:>5} colunas {len(new):>8} pares  stack+apply {old_time * 1e3:9.2f}ms  "
+          f"triu {new_time * 1e3:8.2f}ms  triu top20 {top_time * 1e3:8.2f}ms")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [25, 100, 300]
+    for k in sizes:
+        run(k)
@@ -0,0 +1,76 @@
+# Benchmark da engenharia de features: implementação anterior em pandas
+# (várias passadas sobre as 14 colunas de serviço) vs. app.features, que lê o
+# bloco de serviços uma vez como float32 e calcula tudo com NumPy.
+# Mede o tempo e o pico de memória alocada (tracemalloc) por chamada.
+#
+#   python benchmarks/bench_features.py [linhas ...]
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from app.features import SERVICE_COLS, engineer_features  # noqa: E402
+
+
+def make_frame(n):
+    rng = np.random.default_rng(0)
+    data = {
+        'Age': rng.integers(7, 85, n),
+        'Flight Distance': rng.integers(50, 5000, n),
+        'Departure Delay in Minutes': rng.integers(0, 100, n),
+        'Arrival Delay in Minutes': rng.integers(0, 100, n).astype(float),
+    }
+    for col in SERVICE_COLS:
+        data[col] = rng.integers(0, 6, n)
+    return pd.DataFrame(data)
+
+
+def engineer_features_pandas(df):
+    df['total_delay'] = df['Departure Delay in Minutes'].fillna(0) + df['Arrival Delay in Minutes'].fillna(0)
+    df['delay_ratio'] = df['total_delay'] / (df['Flight Distance'] + 1)
+    df['delay_indicator'] = (df['total_delay'] > 0).astype(int)
+    df['service_score'] = df[SERVICE_COLS].mean(axis=1)
+    df['service_consistency'] = df[SERVICE_COLS].std(axis=1)
+    eps = 1e-9
+    total_service = df[SERVICE_COLS].sum(axis=1) + eps
+    probs = df[SERVICE_COLS].div(total_service, axis=0)
+    df['service_entropy'] = - (probs * np.log(probs + eps)).sum(axis=1)
+    df['age_group'] = pd.cut(df['Age'], bins=[0, 18, 35, 60, 120], labels=['Child', 'Young', 'Adult', 'Senior'])
+    df['delay_category'] = pd.cut(df['total_delay'], bins=[-1, 0, 15, 60, np.inf],
+                                  labels=['No Delay', 'Short', 'Moderate', 'Severe'])
+    return df
+
+
+def measure(fn, df, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        frame = df.copy()
+        start = time.perf_counter()
+        fn(frame)
+        best = min(best, time.perf_counter() - start)
+
+    frame = df.copy()
+    tracemalloc.start()
+    fn(frame)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def run(n):
+    df = make_frame(n)
+    per_million = 1_000_000 / n
+    for name, fn in [('pandas', engineer_features_pandas), ('numpy', engineer_features)]:
+        seconds, peak = measure(fn, df)
+        print(f"{name:>7} {n:>9} linhas  {seconds * 1e3:9.1f}ms  pico {peak / 2**20:8.1f} MB  "
+              f"({seconds * per_million:.2f}s e {peak * per_million / 2**20:.0f} MB por milhão de linhas)")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for n in sizes:
+        run(n)
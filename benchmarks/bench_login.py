@@ -0,0 +1,65 @@
+# Benchmark das páginas de login/registro: init_db() a cada requisição
+# (comportamento anterior: sqlite_master, PRAGMA table_info e um UPDATE com
+# commit por visualização) vs. ensure_db_initialized(), que só consulta uma
+# flag em memória. Mede requisições/s e escritas no banco por requisição.
+#
+#   python benchmarks/bench_login.py [requisições]
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from app import create_app  # noqa: E402
+from app.database import get_db, init_db  # noqa: E402
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE', 'COMMIT')
+
+
+def make_app(path, init_per_request):
+    app = create_app(testing=True)
+    app.config['DATABASE'] = path
+    app.limiter.enabled = False
+    if init_per_request:
+        app.before_request(init_db)
+    with app.app_context():
+        init_db()
+    return app
+
+
+def run(name, init_per_request, n):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app = make_app(path, init_per_request)
+    client = app.test_client()
+    client.post('/auth/register', data={
+        'username': 'bench', 'email': 'bench@example.com',
+        'password': 'benchpass123', 'confirm_password': 'benchpass123'
+    })
+
+    statements = []
+    with app.app_context():
+        get_db().set_trace_callback(statements.append)
+
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get('/auth/login')
+    get_seconds = time.perf_counter() - start
+    writes = sum(1 for sql in statements if sql.split()[0].upper() in WRITES)
+
+    start = time.perf_counter()
+    for _ in range(max(n // 10, 1)):
+        client.post('/auth/login', data={'username': 'bench', 'password': 'benchpass123'})
+    post_seconds = time.perf_counter() - start
+
+    print(f"{name:>22}  GET /auth/login {n / get_seconds:8.0f} req/s  ({writes / n:.1f} escritas/req)  "
+          f"POST /auth/login {max(n // 10, 1) / post_seconds:6.1f} req/s")
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    run('init_db por requisição', True, n)
+    run('ensure_db_initialized', False, n)
@@ -0,0 +1,95 @@
+# Benchmark da etapa de inferência: DataFrame(X_proc) + model.predict +
+# model.predict_proba (implementação anterior) vs. predict_frame, que faz uma
+# única passada de predict_proba direto sobre a matriz do pré-processador.
+# Usa um XGBoost treinado em dados sintéticos com o esquema do dataset.
+#
+#   python benchmarks/bench_predict_single_pass.py [linhas ...]
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder, StandardScaler
+from xgboost import XGBClassifier
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from app.features import SERVICE_COLS, engineer_features  # noqa: E402
+from app.pipeline import predict_frame  # noqa: E402
+
+CATEGORICAL = ['Gender', 'Customer Type', 'Type of Travel', 'Class']
+DROP = ['id', 'satisfaction', 'age_group', 'delay_category', 'cluster']
+
+
+def make_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {
+        'id': np.arange(n),
+        'Gender': rng.choice(['Male', 'Female'], n),
+        'Customer Type': rng.choice(['Loyal Customer', 'disloyal Customer'], n),
+        'Age': rng.integers(7, 85, n),
+        'Type of Travel': rng.choice(['Business travel', 'Personal Travel'], n),
+        'Class': rng.choice(['Business', 'Eco', 'Eco Plus'], n),
+        'Flight Distance': rng.integers(50, 5000, n),
+    }
+    for col in SERVICE_COLS:
+        data[col] = rng.integers(0, 6, n)
+    data['Departure Delay in Minutes'] = rng.integers(0, 100, n)
+    data['Arrival Delay in Minutes'] = rng.integers(0, 100, n).astype(float)
+    df = pd.DataFrame(data)
+    score = df[SERVICE_COLS].mean(axis=1) + rng.normal(0, 0.5, n)
+    df['satisfaction'] = np.where(score > 2.6, 'satisfied', 'neutral or dissatisfied')
+    return engineer_features(df)
+
+
+def train_assets():
+    df = make_frame(20_000)
+    label_encoder = LabelEncoder().fit(df['satisfaction'])
+    X = df.drop(columns=DROP, errors='ignore')
+    numeric = [c for c in X.columns if c not in CATEGORICAL]
+    preprocessor = ColumnTransformer(
+        [('cat', OneHotEncoder(handle_unknown='ignore'), CATEGORICAL), ('num', StandardScaler(), numeric)],
+        sparse_threshold=0
+    )
+    X_proc = preprocessor.fit_transform(X)
+    feature_columns = list(preprocessor.get_feature_names_out())
+    model = XGBClassifier(n_estimators=300, max_depth=6).fit(
+        pd.DataFrame(X_proc, columns=feature_columns), label_encoder.transform(df['satisfaction'])
+    )
+    return model, preprocessor, label_encoder, feature_columns
+
+
+def predict_two_pass(df, model, preprocessor, label_encoder, feature_columns):
+    X_proc = preprocessor.transform(df.drop(columns=DROP, errors='ignore'))
+    df_proc = pd.DataFrame(X_proc, columns=feature_columns)
+    preds = model.predict(df_proc)
+    probas = model.predict_proba(df_proc)[:, 1]
+    df['prediction'] = label_encoder.inverse_transform(preds)
+    df['probability'] = probas
+    return preds, probas
+
+
+def best_of(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(n, assets):
+    df = make_frame(n, seed=1)
+    old_time, (old_preds, old_probas) = best_of(lambda: predict_two_pass(df.copy(), *assets))
+    new_time, (new_preds, new_probas) = best_of(lambda: predict_frame(df.copy(), *assets))
+    assert (old_preds == new_preds).all() and np.allclose(old_probas, new_probas)
+    print(f"{n:>9} linhas  predict+predict_proba {old_time * 1e3:9.1f}ms  "
+          f"predict_proba único {new_time * 1e3:9.1f}ms  ({old_time / new_time:.2f}x)")
+
+
+if __name__ == '__main__':
+    assets = train_assets()
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    for n in sizes:
+        run(n, assets)
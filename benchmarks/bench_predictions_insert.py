@@ -0,0 +1,79 @@
+# Benchmark da gravação da tabela 'predictions': loop com iterrows + execute
+# (implementação anterior) vs. bulk_insert_predictions (executemany em lote).
+#
+#   python benchmarks/bench_predictions_insert.py [linhas ...]
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from app.database import bulk_insert_predictions  # noqa: E402
+
+SCHEMA = '''
+    CREATE TABLE predictions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        upload_id INTEGER NOT NULL,
+        passenger_id TEXT,
+        prediction TEXT,
+        probability REAL,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+
+def make_frame(n):
+    rng = np.random.default_rng(0)
+    probability = rng.random(n)
+    return pd.DataFrame({
+        'id': np.arange(n),
+        'Age': rng.integers(7, 85, n),
+        'Class': rng.choice(['Business', 'Eco', 'Eco Plus'], n),
+        'prediction': np.where(probability > 0.5, 'satisfied', 'neutral or dissatisfied'),
+        'probability': probability
+    })
+
+
+def insert_iterrows(conn, upload_id, df):
+    for idx, row in df.iterrows():
+        passenger_id = str(row.get('id', ''))
+        conn.execute(
+            '''INSERT INTO predictions (upload_id, passenger_id, prediction, probability)
+               VALUES (?, ?, ?, ?)''',
+            (upload_id, passenger_id, row['prediction'], float(row['probability']))
+        )
+    conn.commit()
+
+
+def insert_bulk(conn, upload_id, df):
+    bulk_insert_predictions(
+        conn, upload_id, df['id'].to_numpy(), df['prediction'].to_numpy(), df['probability'].to_numpy()
+    )
+
+
+def run(n):
+    df = make_frame(n)
+    for name, fn in [('iterrows', insert_iterrows), ('bulk', insert_bulk)]:
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            conn = sqlite3.connect(path)
+            conn.executescript(SCHEMA)
+            start = time.perf_counter()
+            fn(conn, 1, df)
+            elapsed = time.perf_counter() - start
+            assert conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0] == n
+            conn.close()
+        finally:
+            os.unlink(path)
+        print(f"{name:>9} {n:>9} linhas  {elapsed:8.3f}s  {n / elapsed:12.0f} linhas/s")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    for n in sizes:
+        run(n)
@@ -0,0 +1,67 @@
+# Benchmark do armazenamento do rate limiter: memory:// (um contador por
+# worker) vs. app.limiter_storage.SQLiteStorage (arquivo compartilhado).
+# Mede o custo por verificação (FixedWindowRateLimiter.hit, o que o
+# Flask-Limiter faz a cada requisição limitada) com 1 processo e com vários
+# processos disputando o mesmo arquivo, e confere que nenhuma contagem se perde.
+#
+#   python benchmarks/bench_rate_limit_storage.py [hits por processo] [processos]
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from limits import RateLimitItemPerMinute
+from limits.storage import MemoryStorage
+from limits.strategies import FixedWindowRateLimiter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from app.limiter_storage import SQLiteStorage  # noqa: E402
+
+LIMIT = RateLimitItemPerMinute(10 ** 9)
+KEYS = [f"10.0.0.{i}" for i in range(50)]  # alguns clientes diferentes
+
+
+def hit_loop(make_storage, n, results=None):
+    limiter = FixedWindowRateLimiter(make_storage())
+    start = time.perf_counter()
+    for i in range(n):
+        limiter.hit(LIMIT, 'prediction.index', KEYS[i % len(KEYS)])
+    seconds = time.perf_counter() - start
+    if results is not None:
+        results.put(seconds)
+    return seconds
+
+
+def run(name, make_storage, n, processes):
+    seconds = hit_loop(make_storage, n)
+    print(f"{name:>8}  1 processo   {seconds / n * 1e6:7.1f} µs/verificação")
+    if processes > 1:
+        ctx = multiprocessing.get_context('fork')
+        results = ctx.Queue()
+        procs = [ctx.Process(target=hit_loop, args=(make_storage, n, results)) for _ in range(processes)]
+        start = time.perf_counter()
+        for p in procs:
+            p.start()
+        per_proc = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        wall = time.perf_counter() - start
+        print(f"{name:>8}  {processes} processos  {sum(per_proc) / (n * processes) * 1e6:7.1f} µs/verificação  "
+              f"({n * processes / wall:,.0f} verificações/s no total)")
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    path = os.path.join(tempfile.mkdtemp(), 'ratelimit.db')
+    uri = f"sqlite:///{path}"
+
+    run('memory', MemoryStorage, n, processes)
+    SQLiteStorage(uri).reset()
+    run('sqlite', lambda: SQLiteStorage(uri), n, processes)
+
+    # Todos os processos (e a rodada de 1 processo) somaram no mesmo contador
+    storage = SQLiteStorage(uri)
+    counted = sum(storage.get(LIMIT.key_for('prediction.index', key)) for key in KEYS)
+    print(f"contagens no arquivo: {counted} de {n * (processes + 1)}")
@@ -0,0 +1,66 @@
+# Benchmark da tabela de resultados paginada no servidor (app.storage.read_page)
+# sobre um resultado Parquet grande: primeira página, página profunda, ordenação
+# por uma coluna e busca textual. Mede o tempo por requisição e o tamanho da
+# resposta JSON, que não depende do número de linhas do arquivo, e o pico de
+# memória do Arrow.
+#
+#   python benchmarks/bench_results_table.py [linhas]
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from app.storage import ResultWriter, read_page  # noqa: E402
+
+CHUNK_ROWS = 100_000
+
+
+def make_result(path, n):
+    rng = np.random.default_rng(0)
+    with ResultWriter(path) as writer:
+        for start in range(0, n, CHUNK_ROWS):
+            size = min(CHUNK_ROWS, n - start)
+            writer.write(pd.DataFrame({
+                'id': np.arange(start, start + size),
+                'Gender': rng.choice(['Female', 'Male'], size),
+                'Customer Type': rng.choice(['Loyal Customer', 'disloyal Customer'], size),
+                'Age': rng.integers(7, 86, size),
+                'Class': rng.choice(['Business', 'Eco', 'Eco Plus'], size),
+                'Flight Distance': rng.integers(31, 5000, size),
+                'total_delay': rng.exponential(15, size),
+                'service_score': rng.uniform(0, 5, size),
+                'prediction': rng.choice(['satisfied', 'neutral or dissatisfied'], size),
+                'probability': rng.random(size),
+            }))
+
+
+def timed(label, path, repeat=5, **kwargs):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        total, filtered, rows = read_page(path, **kwargs)
+    ms = (time.perf_counter() - start) / repeat * 1000
+    size = len(json.dumps({'recordsTotal': total, 'recordsFiltered': filtered, 'data': rows}))
+    print(f"{label:>28}  {ms:8.1f} ms  {size / 1024:5.1f} KB  ({filtered} linhas filtradas)")
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    path = os.path.join(tempfile.mkdtemp(), 'result.parquet')
+    make_result(path, n)
+    print(f"{n} linhas, {os.path.getsize(path) / 1e6:.1f} MB em Parquet")
+
+    timed('primeira página', path, start=0, length=50)
+    timed('página profunda', path, start=n - 100, length=50)
+    timed('ordenado por probability', path, start=0, length=50, order=('probability', True))
+    timed('ordenado, página profunda', path, start=n // 2, length=50, order=('probability', False))
+    timed('busca "eco plus"', path, repeat=2, start=0, length=50, search='eco plus')
+    timed('busca + ordenação', path, repeat=2, start=0, length=50, order=('probability', True), search='female')
+    # Pico de memória do Arrow em todas as requisições acima
+    print(f"pico de memória do Arrow: {pa.default_memory_pool().max_memory() / 2**20:.1f} MB")
+    os.remove(path)
@@ -0,0 +1,115 @@
+# Benchmark de leitura/escrita concorrente no SQLite: conexão nova por
+# requisição em modo journal padrão (comportamento anterior de get_db) vs.
+# app.database.ConnectionPool (conexões reaproveitadas por thread, WAL e pragmas).
+# Um escritor grava lotes de predições (como um upload) enquanto várias threads
+# fazem leituras curtas (como /history); mede vazão, latência e erros de lock.
+#
+#   python benchmarks/bench_sqlite_concurrency.py [leitores] [segundos]
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+from app.database import ConnectionPool  # noqa: E402
+
+BATCH_ROWS = 20_000
+
+SCHEMA = '''
+    CREATE TABLE uploads (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, filename TEXT,
+                          upload_date DATETIME DEFAULT CURRENT_TIMESTAMP, num_rows INTEGER);
+    CREATE TABLE predictions (id INTEGER PRIMARY KEY AUTOINCREMENT, upload_id INTEGER,
+                              passenger_id TEXT, prediction TEXT, probability REAL);
+'''
+
+
+class Legacy:
+    def __init__(self, database):
+        self.database = database
+
+    def acquire(self):
+        conn = sqlite3.connect(self.database, detect_types=sqlite3.PARSE_DECLTYPES)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def release(self, conn):
+        conn.close()
+
+
+def writer(pool, stop, counters):
+    rng = np.random.default_rng(0)
+    while not stop.is_set():
+        conn = pool.acquire()
+        try:
+            upload_id = conn.execute(
+                'INSERT INTO uploads (user_id, filename, num_rows) VALUES (?, ?, ?)', (1, 'x.csv', BATCH_ROWS)
+            ).lastrowid
+            conn.executemany(
+                'INSERT INTO predictions (upload_id, passenger_id, prediction, probability) VALUES (?, ?, ?, ?)',
+                ((upload_id, str(i), 'satisfied', p) for i, p in enumerate(rng.random(BATCH_ROWS).tolist()))
+            )
+            conn.commit()
+            counters['rows'] += BATCH_ROWS
+        except sqlite3.OperationalError:
+            conn.rollback()
+            counters['write_errors'] += 1
+        finally:
+            pool.release(conn)
+
+
+def reader(pool, stop, latencies, counters):
+    while not stop.is_set():
+        start = time.perf_counter()
+        conn = pool.acquire()
+        try:
+            uploads = conn.execute(
+                'SELECT id, filename, upload_date, num_rows FROM uploads WHERE user_id = ? ORDER BY id DESC LIMIT 20',
+                (1,)
+            ).fetchall()
+            if uploads:
+                conn.execute('SELECT COUNT(*) FROM predictions WHERE upload_id = ?', (uploads[0]['id'],)).fetchone()
+            latencies.append(time.perf_counter() - start)
+        except sqlite3.OperationalError:
+            counters['read_errors'] += 1
+        finally:
+            pool.release(conn)
+
+
+def run(name, make_pool, readers, seconds):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    setup = sqlite3.connect(path)
+    setup.executescript(SCHEMA)
+    setup.close()
+
+    pool = make_pool(path)
+    stop = threading.Event()
+    latencies = []
+    counters = {'rows': 0, 'write_errors': 0, 'read_errors': 0}
+    threads = [threading.Thread(target=writer, args=(pool, stop, counters))]
+    threads += [threading.Thread(target=reader, args=(pool, stop, latencies, counters)) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    lat = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    print(f"{name:>7}  leituras {len(latencies) / seconds:9.0f}/s  p50 {np.percentile(lat, 50):7.2f}ms  "
+          f"p99 {np.percentile(lat, 99):8.2f}ms  escrita {counters['rows'] / seconds:9.0f} linhas/s  "
+          f"erros de lock {counters['read_errors'] + counters['write_errors']}")
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    readers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    run('legacy', Legacy, readers, seconds)
+    run('pool', ConnectionPool, readers, seconds)
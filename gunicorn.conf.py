@@ -0,0 +1,63 @@
+# Configuração do gunicorn para produção (usada pelo Procfile):
+#
+#   gunicorn -c gunicorn.conf.py 'app:create_app()'
+#
+# Os artefatos do modelo são carregados uma única vez no master, antes do fork
+# (preload_app). Os workers herdam essas páginas em copy-on-write, então N
+# workers não significam N cópias do XGBoost/pré-processador na memória.
+# Para medir a memória única de cada worker: python scripts/worker_memory.py <pid do master>
+import gc
+import os
+
+from app import model_registry
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+# Com threads = 1 (workers síncronos) cada processo atende uma requisição por
+# vez: o micro-batching de /api/v1/predict/one não tem o que juntar e prevê cada
+# registro na hora. Para agrupar predições concorrentes use GUNICORN_THREADS > 1
+# (o gunicorn passa a usar workers gthread).
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+preload_app = True
+
+# Recicla workers periodicamente; como há preload, o novo worker volta a
+# compartilhar o modelo carregado no master. Com ASYNC_PREDICTIONS os jobs de
+# predição rodam em threads do próprio worker: reciclá-lo descartaria os jobs
+# na fila e mataria o que estiver rodando (que só seria dado como falho depois
+# de JOB_STALE_SECONDS), então nesse caso a reciclagem fica desligada por padrão.
+async_jobs = os.getenv('ASYNC_PREDICTIONS', 'true').lower() == 'true'
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0 if async_jobs else 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# O warm-up (predição de teste) é feito em cada worker, no post_fork, e não no
+# master: o pool de threads OpenMP do XGBoost não sobrevive a um fork.
+os.environ['MODEL_WARMUP'] = 'false'
+
+
+# --- Master: carrega os modelos depois do preload da aplicação e antes do fork ---
+def on_starting(server):
+    model_registry.get_model_assets()
+    stats = model_registry.get_load_stats()
+    server.log.info(
+        f"Modelos carregados no master em {stats['load_seconds']}s "
+        f"(RSS +{stats['rss_delta_bytes'] / 2**20:.1f} MB)"
+    )
+    # Move os objetos já existentes para a geração permanente do GC. Assim as
+    # coletas nos workers não escrevem nos cabeçalhos desses objetos, o que
+    # copiaria as páginas compartilhadas.
+    gc.collect()
+    gc.freeze()
+
+
+# --- Worker: predição de teste com os artefatos herdados do master ---
+def post_fork(server, worker):
+    model_registry.warm_up()
+    try:
+        memory = model_registry.process_memory()
+    except OSError:
+        return
+    server.log.info(
+        f"Worker {worker.pid} pronto: USS {memory['uss'] / 2**20:.1f} MB, "
+        f"PSS {memory['pss'] / 2**20:.1f} MB, compartilhado {memory['shared'] / 2**20:.1f} MB"
+    )
@@ -0,0 +1,45 @@
+# Treina offline o modelo de segmentação de passageiros (KMeans) usado pela
+# página de resultados e salva-o em models/cluster_model.pkl, ao lado do
+# xgb_final_model.pkl. Deve ser executado com o mesmo CSV de treino do modelo:
+#
+#   python scripts/train_cluster_model.py caminho/para/train.csv
+import argparse
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+from app.features import engineer_features  # noqa: E402
+from app.pipeline import CLUSTER_FEATURES  # noqa: E402
+
+
+def train(csv_path, n_clusters=3, random_state=42):
+    df = engineer_features(pd.read_csv(csv_path))
+    X = df[CLUSTER_FEATURES].dropna().to_numpy(dtype=float)
+    kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10).fit(X)
+
+    # Ordena os centróides pelo total_delay para que os ids sejam estáveis
+    # entre re-treinos (0 = menor atraso)
+    order = np.argsort(kmeans.cluster_centers_[:, 1])
+    kmeans.cluster_centers_ = kmeans.cluster_centers_[order]
+    kmeans.labels_ = np.argsort(order)[kmeans.labels_]
+    return kmeans
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Treina o modelo de clusters de passageiros.')
+    parser.add_argument('csv_path', help='CSV de treino com as colunas originais do dataset')
+    parser.add_argument('--clusters', type=int, default=3)
+    parser.add_argument('--output', default=os.path.join(ROOT, 'models', 'cluster_model.pkl'))
+    args = parser.parse_args()
+
+    model = train(args.csv_path, n_clusters=args.clusters)
+    joblib.dump(model, args.output)
+    print(f"Modelo salvo em {args.output}")
+    for i, center in enumerate(model.cluster_centers_):
+        print(f"  cluster {i}: " + ', '.join(f"{name}={value:.2f}" for name, value in zip(CLUSTER_FEATURES, center)))
@@ -0,0 +1,48 @@
+# Mostra a memória do master do gunicorn e de cada worker a partir de
+# /proc/<pid>/smaps_rollup (Linux). O USS é o custo real de cada worker a mais;
+# com preload_app o modelo aparece como memória compartilhada, não no USS.
+#
+#   python scripts/worker_memory.py <pid do master>
+import argparse
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+from app.model_registry import process_memory  # noqa: E402
+
+
+def children(pid):
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # O campo 4 é o ppid; o nome (campo 2) pode conter espaços
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def report(master_pid):
+    mb = 2 ** 20
+    rows = [('master', master_pid)] + [('worker', pid) for pid in children(master_pid)]
+    total_uss = 0
+    print(f"{'processo':>8} {'pid':>8} {'RSS MB':>9} {'PSS MB':>9} {'USS MB':>9} {'compart. MB':>12}")
+    for role, pid in rows:
+        memory = process_memory(pid)
+        total_uss += memory['uss']
+        print(f"{role:>8} {pid:>8} {memory['rss'] / mb:9.1f} {memory['pss'] / mb:9.1f} "
+              f"{memory['uss'] / mb:9.1f} {memory['shared'] / mb:12.1f}")
+    total_pss = sum(process_memory(pid)['pss'] for _, pid in rows)
+    print(f"total PSS {total_pss / mb:.1f} MB, soma dos USS {total_uss / mb:.1f} MB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Memória (RSS/PSS/USS) dos processos do gunicorn.')
+    parser.add_argument('master_pid', type=int, help='pid do processo master do gunicorn')
+    report(parser.parse_args().master_pid)
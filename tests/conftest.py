@@ -2,24 +2,30 @@ import tempfile
 import os
 import pytest
 from app import create_app
-from app.database import init_db, get_db
+from app.database import init_db, get_db, get_pool
 
 @pytest.fixture
-def app():
+def app(tmp_path):
     # Cria arquivo temporário para banco de dados SQLite
     db_fd, db_path = tempfile.mkstemp()
 
     app = create_app(testing=True)
     app.config['DATABASE'] = db_path  # Aponta para o arquivo temporário
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')  # Arquivos gerados ficam fora do pacote
+    os.makedirs(app.config['UPLOAD_FOLDER'])
 
     with app.app_context():
         init_db()  # Cria as tabelas no banco temporário
 
     yield app
 
-    # Cleanup após teste: fecha e remove arquivo temporário
+    # Cleanup após teste: fecha as conexões do pool e remove arquivo temporário
+    with app.app_context():
+        get_pool().close()
     os.close(db_fd)
-    os.unlink(db_path)
+    for path in (db_path, db_path + '-wal', db_path + '-shm'):
+        if os.path.exists(path):
+            os.unlink(path)
 
 
 @pytest.fixture
@@ -35,3 +41,55 @@ def test_tables_created(app):
             "SELECT name FROM sqlite_master WHERE type='table' AND name='users';"
         ).fetchone()
         assert table_exists is not None
+
+
+# Artefatos de modelo pequenos treinados em dados sintéticos, com o mesmo
+# esquema de colunas do dataset (os .pkl reais ficam no Git LFS)
+def make_passengers(n, seed=0):
+    import numpy as np
+    import pandas as pd
+    from app.features import SERVICE_COLS
+
+    rng = np.random.default_rng(seed)
+    data = {
+        'id': np.arange(n),
+        'Gender': rng.choice(['Male', 'Female'], n),
+        'Customer Type': rng.choice(['Loyal Customer', 'disloyal Customer'], n),
+        'Age': rng.integers(7, 85, n),
+        'Type of Travel': rng.choice(['Business travel', 'Personal Travel'], n),
+        'Class': rng.choice(['Business', 'Eco', 'Eco Plus'], n),
+        'Flight Distance': rng.integers(50, 5000, n),
+    }
+    for col in SERVICE_COLS:
+        data[col] = rng.integers(0, 6, n)
+    data['Departure Delay in Minutes'] = rng.integers(0, 100, n)
+    data['Arrival Delay in Minutes'] = rng.integers(0, 100, n).astype(float)
+    df = pd.DataFrame(data)
+    df['satisfaction'] = np.where(df[SERVICE_COLS].mean(axis=1) > 2.5, 'satisfied', 'neutral or dissatisfied')
+    return df
+
+
+@pytest.fixture(scope='session')
+def model_assets():
+    import pandas as pd
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import LabelEncoder, OneHotEncoder, StandardScaler
+    from xgboost import XGBClassifier
+    from app.model_registry import ModelAssets
+    from app.features import engineer_features
+
+    df = engineer_features(make_passengers(500))
+    label_encoder = LabelEncoder().fit(df['satisfaction'])
+    X = df.drop(columns=['id', 'satisfaction', 'age_group', 'delay_category'])
+    categorical = ['Gender', 'Customer Type', 'Type of Travel', 'Class']
+    numeric = [c for c in X.columns if c not in categorical]
+    preprocessor = ColumnTransformer(
+        [('cat', OneHotEncoder(handle_unknown='ignore'), categorical), ('num', StandardScaler(), numeric)],
+        sparse_threshold=0
+    )
+    X_proc = preprocessor.fit_transform(X)
+    feature_columns = list(preprocessor.get_feature_names_out())
+    model = XGBClassifier(n_estimators=10, max_depth=3).fit(
+        pd.DataFrame(X_proc, columns=feature_columns), label_encoder.transform(df['satisfaction'])
+    )
+    return ModelAssets(model, preprocessor, label_encoder, feature_columns, None)
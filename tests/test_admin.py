@@ -60,24 +60,30 @@ import tempfile
 import os
 import pytest
 from app import create_app
-from app.database import init_db, get_db
+from app.database import init_db, get_db, get_pool
 
 @pytest.fixture
-def app():
+def app(tmp_path):
     # Cria arquivo temporário para banco de dados SQLite
     db_fd, db_path = tempfile.mkstemp()
 
     app = create_app(testing=True)
     app.config['DATABASE'] = db_path  # Aponta para o arquivo temporário
+    app.config['UPLOAD_FOLDER'] = str(tmp_path / 'uploads')  # Arquivos gerados ficam fora do pacote
+    os.makedirs(app.config['UPLOAD_FOLDER'])
 
     with app.app_context():
         init_db()  # Cria as tabelas no banco temporário
 
     yield app
 
-    # Cleanup após teste: fecha e remove arquivo temporário
+    # Cleanup após teste: fecha as conexões do pool e remove arquivo temporário
+    with app.app_context():
+        get_pool().close()
     os.close(db_fd)
-    os.unlink(db_path)
+    for path in (db_path, db_path + '-wal', db_path + '-shm'):
+        if os.path.exists(path):
+            os.unlink(path)
 
 
 @pytest.fixture
@@ -302,3 +308,104 @@ def test_admin_delete(client, app):
     # Tenta deletar de tabela não permitida
     response = client.post('/admin/table/invalid/edit/1', follow_redirects=True)
     assert response.status_code == 403
+
+
+def _login_admin(client, app):
+    client.post('/auth/register', data={
+        'username': 'adminuser',
+        'email': 'admin@example.com',
+        'password': 'adminpass',
+        'confirm_password': 'adminpass'
+    })
+    with app.app_context():
+        db = get_db()
+        db.execute("UPDATE users SET is_admin = 1 WHERE username = ?", ('adminuser',))
+        db.commit()
+    client.post('/auth/login', data={'username': 'adminuser', 'password': 'adminpass'})
+
+
+def _page_ids(html):
+    import re
+    return [int(i) for i in re.findall(r'/admin/table/predictions/edit/(\d+)', html)]
+
+
+def test_admin_table_keyset_pagination(client, app):
+    _login_admin(client, app)
+    with app.app_context():
+        db = get_db()
+        db.executemany("INSERT INTO predictions (upload_id, passenger_id, prediction, probability) VALUES (?, ?, ?, ?)",
+                       [(1, str(i), 'satisfied', 0.5) for i in range(120)])
+        db.commit()
+        ids = [row[0] for row in db.execute("SELECT id FROM predictions ORDER BY id")]
+
+    first = client.get('/admin/table/predictions').get_data(as_text=True)
+    assert _page_ids(first) == ids[:50]
+    assert '120 registros' in first
+    assert f'after={ids[49]}' in first and 'before=' not in first
+
+    second = client.get(f'/admin/table/predictions?after={ids[49]}').get_data(as_text=True)
+    assert _page_ids(second) == ids[50:100]
+    assert f'before={ids[50]}' in second and f'after={ids[99]}' in second
+
+    last = client.get(f'/admin/table/predictions?after={ids[99]}').get_data(as_text=True)
+    assert _page_ids(last) == ids[100:]
+    assert 'after=' not in last
+
+    back = client.get(f'/admin/table/predictions?before={ids[50]}').get_data(as_text=True)
+    assert _page_ids(back) == ids[:50]
+    assert 'before=' not in back
+
+
+def test_estimate_row_count(app, monkeypatch):
+    from app import admin
+    with app.app_context():
+        db = get_db()
+        db.executemany("INSERT INTO logs (action) VALUES (?)", [('a',)] * 30)
+        db.execute("DELETE FROM logs WHERE id % 3 = 0")
+        db.commit()
+        assert admin.estimate_row_count(db.cursor(), 'logs') == (20, True)
+
+        # Acima do limite usa o intervalo de ids, sem COUNT(*)
+        monkeypatch.setattr(admin, 'EXACT_COUNT_LIMIT', 10)
+        assert admin.estimate_row_count(db.cursor(), 'logs') == (29, False)
+        assert admin.estimate_row_count(db.cursor(), 'user_settings') == (0, True)
+
+
+def test_admin_search_uses_fts_index(client, app):
+    _login_admin(client, app)
+    with app.app_context():
+        db = get_db()
+        db.execute("INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
+                   ('joao.silva', 'joao@empresa.com.br', 'hash'))
+        db.execute("INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)",
+                   ('maria', 'maria@outra.org', 'hash'))
+        db.commit()
+
+        plan = ' '.join(row['detail'] for row in db.execute(
+            "EXPLAIN QUERY PLAN SELECT users.* FROM users_fts JOIN users ON users.id = users_fts.rowid "
+            "WHERE users_fts MATCH ? ORDER BY users_fts.rowid LIMIT 51", ('username : "jo"*',)))
+        assert 'VIRTUAL TABLE INDEX' in plan
+
+    # Prefixo e tokens (pontuação ignorada), restritos à coluna escolhida
+    html = client.get('/admin/table/users?search=jo sil&column=username').get_data(as_text=True)
+    assert 'joao.silva' in html and 'maria@outra.org' not in html
+    html = client.get('/admin/table/users?search=empresa.com&column=email').get_data(as_text=True)
+    assert 'joao.silva' in html and 'maria@outra.org' not in html
+    html = client.get('/admin/table/users?search=maria&column=email').get_data(as_text=True)
+    assert 'maria@outra.org' in html and 'joao.silva' not in html
+
+    # Os triggers mantêm o índice em dia com UPDATE e DELETE
+    with app.app_context():
+        db = get_db()
+        db.execute("UPDATE users SET username = 'jose.souza' WHERE username = 'joao.silva'")
+        db.execute("DELETE FROM users WHERE username = 'maria'")
+        db.commit()
+    assert 'jose.souza' not in client.get('/admin/table/users?search=joao&column=username').get_data(as_text=True)
+    assert 'jose.souza' in client.get('/admin/table/users?search=souza&column=username').get_data(as_text=True)
+    assert 'maria@outra.org' not in client.get('/admin/table/users?search=maria&column=email').get_data(as_text=True)
+
+    # Colunas sem índice continuam com LIKE (substring)
+    html = client.get('/admin/table/users?search=ose.sou&column=username').get_data(as_text=True)
+    assert 'jose.souza' not in html
+    html = client.get('/admin/table/users?search=ash&column=password_hash').get_data(as_text=True)
+    assert 'jose.souza' in html
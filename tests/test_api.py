@@ -0,0 +1,81 @@
+import io
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from tests.conftest import make_passengers
+
+
+@pytest.fixture
+def api_client(client, model_assets, monkeypatch):
+    monkeypatch.setattr('app.api.get_model_assets', lambda: model_assets)
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    return client
+
+
+def _columnar(df):
+    return {'data': {col: df[col].tolist() for col in df.columns}}
+
+
+def test_predict_requires_login(client):
+    response = client.post('/api/v1/predict', json={'data': {'Age': [30]}})
+    assert response.status_code == 401
+    assert response.json['error']
+
+
+def test_service_token_authenticates_without_session(client, app, model_assets, monkeypatch):
+    monkeypatch.setattr('app.api.get_model_assets', lambda: model_assets)
+    app.config['API_TOKENS'] = ['token-servico-a', 'token-servico-b']
+    payload = _columnar(make_passengers(3).drop(columns='satisfaction'))
+
+    response = client.post('/api/v1/predict', json=payload, headers={'Authorization': 'Bearer token-servico-b'})
+    assert response.status_code == 200
+    assert response.json['count'] == 3
+
+    for header in ('Bearer outro-token', 'Basic token-servico-a', 'Bearer ', 'token-servico-a'):
+        assert client.post('/api/v1/predict', json=payload, headers={'Authorization': header}).status_code == 401
+
+
+def test_predict_returns_columnar_labels_and_probabilities(api_client, model_assets):
+    df = make_passengers(20, seed=1).drop(columns='satisfaction')
+    response = api_client.post('/api/v1/predict', json=_columnar(df))
+
+    assert response.status_code == 200
+    body = response.json
+    assert body['count'] == 20
+    assert body['id'] == list(range(20))
+    assert set(body['prediction']) <= {'satisfied', 'neutral or dissatisfied'}
+    probas = np.array(body['probability'])
+    assert ((probas >= 0) & (probas <= 1)).all()
+
+
+def test_predict_rejects_batches_over_the_limit(api_client, app):
+    app.config['API_MAX_BATCH_SIZE'] = 5
+    df = make_passengers(6).drop(columns='satisfaction')
+    response = api_client.post('/api/v1/predict', json=_columnar(df))
+    assert response.status_code == 413
+
+
+def test_predict_reports_invalid_payloads(api_client):
+    assert api_client.post('/api/v1/predict', data='Age=30').status_code == 415
+    assert api_client.post('/api/v1/predict', json={'rows': []}).status_code == 400
+    assert api_client.post('/api/v1/predict', json={'data': {'Age': [1, 2], 'Class': ['Eco']}}).status_code == 400
+    assert api_client.post('/api/v1/predict', json={'data': {'Age': [30]}}).status_code == 400
+
+
+def test_predict_accepts_arrow(api_client):
+    df = make_passengers(10, seed=2).drop(columns='satisfaction')
+    sink = io.BytesIO()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    arrow = 'application/vnd.apache.arrow.stream'
+    response = api_client.post('/api/v1/predict', data=sink.getvalue(), content_type=arrow,
+                               headers={'Accept': arrow})
+    assert response.status_code == 200
+    result = pa.ipc.open_stream(response.data).read_all()
+    assert result.column_names == ['id', 'prediction', 'probability']
+    assert result.num_rows == 10
@@ -263,3 +263,66 @@ def test_register_password_too_short(client):
     
     assert response.status_code == 200
     assert b'A senha deve ter pelo menos 8 caracteres.' in response.data
+
+
+def test_user_cache_ttl_and_lru(monkeypatch):
+    from app import auth
+    now = [100.0]
+    monkeypatch.setattr(auth.time, 'monotonic', lambda: now[0])
+    cache = auth.UserCache(max_size=2, ttl=10)
+    loads = []
+
+    def loader(user_id):
+        loads.append(user_id)
+        return {'id': user_id}
+
+    cache.get(1, loader)
+    cache.get(1, loader)
+    assert loads == [1]
+    now[0] += 11  # expirou
+    cache.get(1, loader)
+    assert loads == [1, 1]
+
+    cache.get(2, loader)
+    cache.get(1, loader)
+    cache.get(3, loader)  # descarta o 2, usado há mais tempo
+    cache.get(1, loader)
+    cache.get(2, loader)
+    assert loads == [1, 1, 2, 3, 2]
+
+    cache.invalidate(1)
+    cache.get(1, loader)
+    assert loads[-1] == 1
+    assert cache.stats()['entries'] == 2
+
+
+def test_user_cache_invalidated_by_admin_edit(client, app):
+    from app.auth import get_user_cache
+    from app.database import get_db
+    app.config['USER_CACHE_TTL'] = 30
+    client.post('/auth/register', data={
+        'username': 'adminuser', 'email': 'admin@example.com',
+        'password': 'adminpass', 'confirm_password': 'adminpass'
+    })
+    with app.app_context():
+        db = get_db()
+        db.execute("UPDATE users SET is_admin = 1 WHERE username = ?", ('adminuser',))
+        db.commit()
+        user_id = db.execute("SELECT id FROM users WHERE username = 'adminuser'").fetchone()[0]
+    client.post('/auth/login', data={'username': 'adminuser', 'password': 'adminpass'})
+
+    assert client.get('/admin/').status_code == 200
+    assert client.get('/admin/').status_code == 200
+    with app.app_context():
+        stats = get_user_cache().stats()
+    assert stats['misses'] == 1 and stats['hits'] >= 1
+
+    # Rotas marcadas e 404 não consultam o usuário
+    client.get('/api/v1/predict/stats')
+    client.get('/nao-existe')
+    with app.app_context():
+        assert get_user_cache().stats() == stats
+
+    # O admin remove o próprio acesso: a próxima requisição já vê a alteração
+    client.post(f'/admin/table/users/edit/{user_id}', data={'is_admin': '0'})
+    assert client.get('/admin/').status_code == 403
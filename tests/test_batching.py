@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.batching import MicroBatcher
+from app.features import engineer_features
+from app.pipeline import predict_frame
+from tests.conftest import make_passengers
+
+
+def _records(n, seed=0):
+    return make_passengers(n, seed).drop(columns='satisfaction').to_dict('records')
+
+
+def test_concurrent_records_are_merged_into_batches(model_assets):
+    batcher = MicroBatcher(max_batch_size=16, max_wait=0.05, assets_loader=lambda: model_assets)
+    records = _records(40)
+
+    with ThreadPoolExecutor(max_workers=40) as pool:
+        results = list(pool.map(lambda r: batcher.predict(r, timeout=10), records))
+
+    df = make_passengers(40).drop(columns='satisfaction')
+    engineer_features(df)
+    predict_frame(df, *model_assets[:4])
+    assert [r['prediction'] for r in results] == df['prediction'].tolist()
+    assert np.allclose([r['probability'] for r in results], df['probability'])
+
+    stats = batcher.stats()
+    assert stats['records'] == 40
+    assert stats['batches'] < 40
+    assert stats['max_batch_size'] <= 16
+    assert stats['avg_queue_wait_ms'] >= 0
+    assert stats['throughput_rps'] > 0
+
+
+def test_lone_request_does_not_wait_for_the_window(model_assets):
+    # Worker síncrono: nenhuma outra requisição em andamento, então a janela longa não é esperada
+    batcher = MicroBatcher(max_wait=2.0, assets_loader=lambda: model_assets)
+    batcher.predict(_records(1)[0], timeout=10)  # aquece a thread e o modelo
+
+    start = time.perf_counter()
+    batcher.predict(_records(1, seed=1)[0], timeout=10)
+    assert time.perf_counter() - start < 1.0
+    assert batcher.stats()['max_queue_wait_ms'] < 1000
+    assert batcher.stats()['in_flight'] == 0
+
+
+def test_window_waits_for_request_in_flight(model_assets):
+    batcher = MicroBatcher(max_wait=2.0, assets_loader=lambda: model_assets)
+    first, second = _records(2)
+    results = []
+
+    # Outra requisição já entrou na view (ainda lendo o corpo) quando a primeira é enviada
+    with batcher.in_flight() as slot:
+        worker = threading.Thread(target=lambda: results.append(batcher.predict(first, timeout=10)))
+        worker.start()
+        time.sleep(0.05)
+        results.append(batcher.predict(second, timeout=10, slot=slot))
+    worker.join()
+
+    stats = batcher.stats()
+    assert len(results) == 2
+    assert (stats['batches'], stats['max_batch_size']) == (1, 2)
+    assert stats['in_flight'] == 0
+
+
+def test_invalid_record_does_not_fail_the_batch(model_assets):
+    batcher = MicroBatcher(max_batch_size=8, max_wait=0.05, assets_loader=lambda: model_assets)
+    good, bad = _records(1)[0], {'Age': 30}
+
+    futures = [batcher.submit(good), batcher.submit(bad)]
+    assert futures[0].result(timeout=10)['prediction'] in {'satisfied', 'neutral or dissatisfied'}
+    with pytest.raises(KeyError):
+        futures[1].result(timeout=10)
+
+
+def test_predict_one_endpoint(client, model_assets, monkeypatch):
+    batcher = MicroBatcher(max_wait=0.001, assets_loader=lambda: model_assets)
+    monkeypatch.setattr('app.api.get_batcher', lambda: batcher)
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+
+    record = _records(1)[0]
+    response = client.post('/api/v1/predict/one', json=record)
+    assert response.status_code == 200
+    assert response.json['id'] == record['id']
+    assert 0 <= response.json['probability'] <= 1
+
+    assert client.post('/api/v1/predict/one', json={'Age': 30}).status_code == 400
+    assert client.get('/api/v1/predict/stats').json['records'] == 2
@@ -1,7 +1,7 @@
 import sqlite3
 import pytest
 from unittest.mock import patch, MagicMock
-from app.database import get_db, close_connection, init_db
+from app.database import SCHEMA_VERSION, get_db, get_pool, close_connection, init_db, migrate, schema_version
 from flask import g
 
 
@@ -46,9 +46,10 @@ def test_init_db_creates_tables_and_admin(app):
 # Testa get_db: cobertura para linhas 20-22 (conexao e row_factory)
 def test_get_db_sets_connection_and_row_factory(app):
     with app.app_context():
-        # Limpa g.db antes do teste
+        # Limpa g.db e as conexões ociosas do pool antes do teste
         if 'db' in g:
             g.pop('db')
+        get_pool().close()
 
         with patch('app.database.sqlite3.connect') as mock_connect:
             mock_conn = MagicMock()
@@ -63,15 +64,36 @@ def test_get_db_sets_connection_and_row_factory(app):
             assert mock_conn.row_factory == sqlite3.Row
 
 
-def test_close_connection_closes_db(app):
+def test_close_connection_returns_db_to_pool(app):
     with app.app_context():
         mock_db = MagicMock()
+        mock_db.in_transaction = True
         g.db = mock_db  # simula conexão no contexto
 
         close_connection()
 
-        mock_db.close.assert_called_once()
+        # A conexão não é fechada: a transação pendente é desfeita e ela volta ao pool
+        mock_db.rollback.assert_called_once()
+        mock_db.close.assert_not_called()
         assert 'db' not in g
+        assert get_pool().acquire() is mock_db
+
+
+def test_connections_reused_with_wal(app):
+    for _ in range(3):
+        with app.app_context():
+            get_db().execute('SELECT 1')
+    with app.app_context():
+        db = get_db()
+        assert db.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert db.execute('PRAGMA busy_timeout').fetchone()[0] == 10_000
+        # Contextos aninhados na mesma thread recebem conexões diferentes
+        with app.app_context():
+            assert get_db() is not db
+        stats = get_pool().stats()
+    # Uma conexão do init_db reaproveitada em todos os contextos + a do contexto aninhado
+    assert stats['created'] == 2
+    assert stats['reused'] >= 4
 
 
 def test_init_db_update_admin_operational_error(app):
@@ -98,6 +120,7 @@ def test_init_db_update_admin_operational_error(app):
         mock_conn.cursor.return_value = mock_cursor
 
         with patch('app.database.get_db', return_value=mock_conn), \
+             patch('app.database.migrate'), \
              patch('app.database.current_app') as mock_current_app:
 
             mock_logger = MagicMock()
@@ -106,3 +129,110 @@ def test_init_db_update_admin_operational_error(app):
             init_db()
 
             mock_logger.error.assert_called_once()
+
+
+def test_bulk_insert_predictions(app):
+    import numpy as np
+    from app.database import bulk_insert_predictions
+
+    with app.app_context():
+        db = get_db()
+        stats = bulk_insert_predictions(
+            db, 7,
+            np.array([10, 11, 12]),
+            np.array(['satisfied', 'neutral or dissatisfied', 'satisfied'], dtype=object),
+            np.array([0.9, 0.2, 0.7]),
+            batch_size=2
+        )
+        assert stats['rows'] == 3
+        assert stats['rows_per_sec'] > 0
+
+        rows = db.execute(
+            "SELECT passenger_id, prediction, probability FROM predictions WHERE upload_id = 7 ORDER BY id"
+        ).fetchall()
+        assert [tuple(r) for r in rows] == [
+            ('10', 'satisfied', 0.9),
+            ('11', 'neutral or dissatisfied', 0.2),
+            ('12', 'satisfied', 0.7)
+        ]
+        assert not db.in_transaction
+
+
+def _query_plan(db, sql, params):
+    return ' '.join(row['detail'] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+def test_history_and_predictions_queries_use_indexes(app):
+    with app.app_context():
+        db = get_db()
+        assert schema_version(db) == SCHEMA_VERSION
+
+        plan = _query_plan(db, '''SELECT id, original_filename, filename, upload_date, processed, num_rows
+                                FROM uploads WHERE user_id = ? ORDER BY upload_date DESC''', (1,))
+        assert 'USING INDEX idx_uploads_user_date' in plan
+        assert 'TEMP B-TREE' not in plan  # a ordenação sai do próprio índice
+
+        plan = _query_plan(db, 'SELECT passenger_id, prediction FROM predictions WHERE upload_id = ? ORDER BY id', (1,))
+        assert 'USING INDEX idx_predictions_upload' in plan
+        assert 'TEMP B-TREE' not in plan
+
+
+def test_migrate_legacy_database(tmp_path):
+    # Banco anterior ao controle de versão: users sem is_admin e sem a tabela jobs
+    conn = sqlite3.connect(tmp_path / 'legacy.db')
+    conn.row_factory = sqlite3.Row
+    conn.executescript('''
+        CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL,
+                            email TEXT UNIQUE NOT NULL, password_hash TEXT NOT NULL,
+                            failed_attempts INTEGER DEFAULT 0, locked_until DATETIME, created_at DATETIME);
+        INSERT INTO users (username, email, password_hash) VALUES ('ana', 'ana@example.com', 'x');
+        CREATE TABLE uploads (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+                              filename TEXT NOT NULL, original_filename TEXT NOT NULL,
+                              upload_date DATETIME DEFAULT CURRENT_TIMESTAMP, processed BOOLEAN DEFAULT 0,
+                              num_rows INTEGER);
+    ''')
+    assert schema_version(conn) == 0
+
+    from app import create_app
+    with create_app(testing=True).app_context():
+        assert migrate(conn) == list(range(1, SCHEMA_VERSION + 1))
+        assert migrate(conn) == []
+
+    assert schema_version(conn) == SCHEMA_VERSION
+    assert 'is_admin' in [col[1] for col in conn.execute("PRAGMA table_info(users)")]
+    assert conn.execute("SELECT username FROM users").fetchone()[0] == 'ana'
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'idx_uploads_user_date', 'idx_predictions_upload'} <= indexes
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'jobs'").fetchone() is not None
+    conn.close()
+
+
+def test_login_page_does_not_touch_schema(app, client):
+    with patch('app.database.init_db', wraps=init_db) as mock_init:
+        for _ in range(3):
+            assert client.get('/auth/login').status_code == 200
+    assert mock_init.call_count == 1  # só na primeira requisição do processo
+
+    # A conexão reaproveitada pela próxima requisição não executa nenhuma escrita
+    statements = []
+    with app.app_context():
+        get_db().set_trace_callback(statements.append)
+    client.get('/auth/login')
+    client.get('/auth/register')
+    assert not [sql for sql in statements if sql.split()[0].upper() in ('INSERT', 'UPDATE', 'DELETE', 'COMMIT')]
+
+
+def test_init_db_command(app):
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert result.exit_code == 0
+    assert f'versão do esquema {SCHEMA_VERSION}' in result.output
+
+
+def test_startup_init_leaves_no_pooled_connection(app):
+    from app import init_on_startup
+    init_on_startup(app)
+    with app.app_context():
+        pool = get_pool()
+        # Nada ocioso para os workers herdarem depois do fork
+        assert pool._idle() == []
+        assert schema_version(get_db()) == SCHEMA_VERSION
@@ -1,7 +1,7 @@
 import pandas as pd
 import numpy as np
 import pytest
-from utils import eda
+from app import eda
 
 # Criação de um DataFrame fictício de exemplo
 @pytest.fixture
@@ -60,3 +60,52 @@ def test_build_sorted_correlation_table(sample_df):
     assert 'Feature 1' in table.columns
     assert 'Feature 2' in table.columns
     assert 'Correlation' in table.columns
+
+# Os gráficos não devem embutir o bundle do plotly.js (carregado uma vez pela página)
+def test_charts_do_not_embed_plotlyjs(sample_df):
+    result, _ = eda.perform_eda(sample_df.copy())
+    charts = [result['graph_html'], result['prob_html'], result['age_group_html'], result['delay_cat_html']]
+    charts += list(result['pizza_imgs'].values())
+    for html in filter(None, charts):
+        assert 'Plotly.newPlot' in html
+        assert len(html) < 50_000
+        assert 'cdn.plot.ly' not in html
+
+# O motor de EDA calcula cada etapa uma única vez e não altera o DataFrame
+def test_eda_engine_memoizes_each_stage(sample_df):
+    df = sample_df.copy()
+    df['total_delay'] = df['Departure Delay in Minutes'] + df['Arrival Delay in Minutes']
+    columns_before = list(df.columns)
+    engine = eda.EDAEngine(df)
+
+    first = engine.age_group_chart()
+    engine.cache['age_groups'] = None  # um recálculo do gráfico exigiria as faixas de novo
+    assert engine.age_group_chart() is first
+
+    eda.perform_eda(df, engine)
+    charts = engine.pizza_charts(['Gender', 'Class', 'Age_grupo'])
+    assert charts['Gender'] is engine.cache['pizza:Gender']
+    assert engine.correlation_table() is engine.correlation_table()
+
+    assert list(df.columns) == columns_before
+    for stage in ['graph_html', 'prob_html', 'delay_cat_html', 'correlation_matrix', 'eda_tables']:
+        assert stage in engine.timings
+
+
+def test_chart_payload_does_not_grow_with_rows():
+    def chart_sizes(n):
+        rng = np.random.default_rng(1)
+        proba = rng.random(n)
+        df = pd.DataFrame({
+            'Age': rng.integers(7, 85, n),
+            'total_delay': rng.integers(0, 120, n),
+            'prediction': np.where(proba > 0.5, 'satisfied', 'neutral or dissatisfied')
+        })
+        engine = eda.EDAEngine(df, proba)
+        charts = [engine.prediction_chart(), engine.probability_chart(),
+                  engine.age_group_chart(), engine.delay_category_chart()]
+        return [len(c) for c in charts]
+
+    small, large = chart_sizes(1_000), chart_sizes(100_000)
+    for s, l in zip(small, large):
+        assert l < s * 1.1
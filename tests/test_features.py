@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.features import SERVICE_COLS, engineer_features, service_features
+from tests.conftest import make_passengers
+
+
+# Implementação anterior, em pandas, usada como referência
+def reference_features(df):
+    df['total_delay'] = df['Departure Delay in Minutes'].fillna(0) + df['Arrival Delay in Minutes'].fillna(0)
+    df['delay_ratio'] = df['total_delay'] / (df['Flight Distance'] + 1)
+    df['delay_indicator'] = (df['total_delay'] > 0).astype(int)
+    df['service_score'] = df[SERVICE_COLS].mean(axis=1)
+    df['service_consistency'] = df[SERVICE_COLS].std(axis=1)
+    eps = 1e-9
+    total_service = df[SERVICE_COLS].sum(axis=1) + eps
+    probs = df[SERVICE_COLS].div(total_service, axis=0)
+    df['service_entropy'] = - (probs * np.log(probs + eps)).sum(axis=1)
+    df['age_group'] = pd.cut(df['Age'], bins=[0, 18, 35, 60, 120], labels=['Child', 'Young', 'Adult', 'Senior'])
+    df['delay_category'] = pd.cut(df['total_delay'], bins=[-1, 0, 15, 60, np.inf],
+                                  labels=['No Delay', 'Short', 'Moderate', 'Severe'])
+    return df
+
+
+@pytest.fixture
+def raw():
+    df = make_passengers(2000, seed=4).drop(columns='satisfaction')
+    df.loc[::13, 'Arrival Delay in Minutes'] = np.nan
+    df.loc[0, SERVICE_COLS] = 0  # linha sem nenhuma nota
+    return df
+
+
+def _assert_same_features(result, expected):
+    for col in ['total_delay', 'delay_ratio', 'delay_indicator']:
+        assert np.array_equal(result[col].to_numpy(), expected[col].to_numpy())
+    for col in ['service_score', 'service_consistency', 'service_entropy']:
+        assert result[col].dtype == np.float64
+        assert np.allclose(result[col], expected[col], rtol=1e-6, atol=1e-6, equal_nan=True)
+    for col in ['age_group', 'delay_category']:
+        assert result[col].equals(expected[col])
+
+
+def test_engineer_features_matches_pandas_reference(raw):
+    _assert_same_features(engineer_features(raw.copy()), reference_features(raw.copy()))
+
+
+def test_engineer_features_handles_missing_service_scores(raw):
+    raw[SERVICE_COLS] = raw[SERVICE_COLS].astype(float)
+    raw.loc[::7, 'Cleanliness'] = np.nan
+    raw.loc[3, SERVICE_COLS] = np.nan
+    _assert_same_features(engineer_features(raw.copy()), reference_features(raw.copy()))
+
+
+def test_service_features_returns_one_value_per_row():
+    block = np.array([[5, 5, 5], [1, 2, 3]], dtype=np.float32)
+    score, consistency, entropy = service_features(block)
+    assert np.allclose(score, [5, 2])
+    assert np.allclose(consistency, [0, 1])
+    assert np.isclose(entropy[0], np.log(3), atol=1e-6)
@@ -0,0 +1,198 @@
+import io
+import os
+from unittest.mock import patch
+
+from app.database import get_db
+from app.jobs import create_job, fail_stale_jobs, get_job, run_job, update_job, DONE, FAILED, RUNNING
+
+
+FAKE_CONTEXT = {
+    'num_passengers': 3,
+    'satisfaction_rate': 66.67,
+    'avg_proba': 60.0,
+    'accuracy': None,
+    'roc_auc': None,
+    'avg_total_delay': 5.0,
+    'avg_delay_ratio': 0.01,
+    'delay_indicator_rate': 66.67,
+    'avg_service_score': 3.0,
+    'avg_service_consistency': 0.0,
+    'avg_service_entropy': 2.6391,
+    'graph_html': '<div>graph</div>',
+    'prob_html': '<div>prob</div>',
+    'age_group_html': None,
+    'delay_cat_html': None,
+    'pizza_imgs': {},
+    'df_table_html': '<table class="data"></table>',
+    'tables': ['<table class="data correlation-sorted"></table>'],
+    'filename': 'abc_predictions.csv'
+}
+
+
+def _write_source(app, name='job_upload.csv'):
+    path = f"{app.config['UPLOAD_FOLDER']}/{name}"
+    with open(path, 'w') as f:
+        f.write('id,Age\n1,30\n')
+    return path
+
+
+def test_run_job_success(app):
+    source_path = _write_source(app)
+    with app.app_context():
+        job_id = create_job(1, 'upload.csv', source_path)
+
+    with patch('app.jobs.process_upload', return_value=FAKE_CONTEXT) as mock_process:
+        run_job(app, job_id, assets=None)
+        mock_process.assert_called_once()
+
+    with app.app_context():
+        job = get_job(job_id)
+        assert job['status'] == DONE
+        assert job['progress'] == 100
+        assert job['rows_processed'] == 3
+        assert job['result_path'].endswith(f'{job_id}_result.json')
+
+
+def test_run_job_failure_records_message(app):
+    source_path = _write_source(app)
+    with app.app_context():
+        job_id = create_job(1, 'upload.csv', source_path)
+
+    with patch('app.jobs.process_upload', side_effect=ValueError('coluna ausente')):
+        run_job(app, job_id, assets=None)
+
+    with app.app_context():
+        job = get_job(job_id)
+        assert job['status'] == FAILED
+        assert 'coluna ausente' in job['message']
+
+
+def test_run_job_failure_discards_pending_upload(app):
+    source_path = _write_source(app)
+    result_path = os.path.join(app.config['UPLOAD_FOLDER'], 'failed_predictions.parquet')
+    with app.app_context():
+        job_id = create_job(1, 'upload.csv', source_path)
+
+    # Falha depois que o upload já foi registrado e parte das predições gravada
+    def failing_process(*args, on_upload=None, **kwargs):
+        with open(result_path, 'wb') as f:
+            f.write(b'parcial')
+        conn = get_db()
+        upload_id = conn.execute(
+            "INSERT INTO uploads (user_id, filename, original_filename, processed, num_rows) "
+            "VALUES (1, 'failed_predictions.parquet', 'upload.csv', 0, 0)"
+        ).lastrowid
+        conn.execute("INSERT INTO predictions (upload_id, passenger_id, prediction, probability) "
+                     "VALUES (?, '1', 'satisfied', 0.9)", (upload_id,))
+        conn.commit()
+        on_upload(upload_id)
+        raise KeyError('Age')
+
+    with patch('app.jobs.process_upload', side_effect=failing_process):
+        run_job(app, job_id, assets=None)
+
+    with app.app_context():
+        assert get_job(job_id)['status'] == FAILED
+        conn = get_db()
+        assert conn.execute('SELECT COUNT(*) FROM uploads').fetchone()[0] == 0
+        assert conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0] == 0
+    assert not os.path.exists(result_path)
+
+
+def _stale_job(app, with_upload=True):
+    source_path = _write_source(app, 'stale_upload.csv')
+    result_path = os.path.join(app.config['UPLOAD_FOLDER'], 'stale_predictions.parquet')
+    with open(result_path, 'wb') as f:
+        f.write(b'parcial')
+    with app.app_context():
+        job_id = create_job(1, 'upload.csv', source_path)
+        conn = get_db()
+        upload_id = conn.execute(
+            "INSERT INTO uploads (user_id, filename, original_filename, processed, num_rows) "
+            "VALUES (1, 'stale_predictions.parquet', 'upload.csv', 0, 0)"
+        ).lastrowid
+        conn.execute("INSERT INTO predictions (upload_id, passenger_id, prediction, probability) "
+                     "VALUES (?, '1', 'satisfied', 0.9)", (upload_id,))
+        update_job(job_id, status=RUNNING, upload_id=upload_id if with_upload else None)
+        conn.execute("UPDATE jobs SET updated_at = datetime('now', '-2 hours') WHERE id = ?", (job_id,))
+        conn.commit()
+    return job_id, upload_id, source_path, result_path
+
+
+def test_stale_job_is_failed_and_cleaned_up_on_read(app):
+    job_id, upload_id, source_path, result_path = _stale_job(app)
+
+    with app.app_context():
+        job = get_job(job_id)
+        assert job['status'] == FAILED and 'interrompido' in job['message']
+        conn = get_db()
+        assert conn.execute('SELECT 1 FROM uploads WHERE id = ?', (upload_id,)).fetchone() is None
+        assert conn.execute('SELECT 1 FROM predictions WHERE upload_id = ?', (upload_id,)).fetchone() is None
+        assert fail_stale_jobs() == 0
+    assert not os.path.exists(source_path)
+    assert not os.path.exists(result_path)
+
+    # Um worker que pegue o job depois disso não o reabre
+    with patch('app.jobs.process_upload') as mock_process:
+        run_job(app, job_id)
+        mock_process.assert_not_called()
+
+
+def test_recent_jobs_are_not_stale(app):
+    source_path = _write_source(app)
+    with app.app_context():
+        job_id = create_job(1, 'upload.csv', source_path)
+        assert fail_stale_jobs() == 0
+        assert get_job(job_id)['status'] == 'queued'
+    assert os.path.exists(source_path)
+
+
+def test_job_status_and_results_routes(client, app):
+    source_path = _write_source(app)
+    with app.app_context():
+        job_id = create_job(1, 'upload.csv', source_path)
+    with patch('app.jobs.process_upload', return_value=FAKE_CONTEXT):
+        run_job(app, job_id, assets=None)
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+
+    response = client.get(f'/prediction/jobs/{job_id}')
+    assert response.status_code == 200
+    assert response.json['status'] == DONE
+    assert response.json['results_url'] == f'/prediction/jobs/{job_id}/results'
+
+    response = client.get(response.json['results_url'])
+    assert response.status_code == 200
+    assert b'abc_predictions.csv' in response.data
+
+
+def test_job_routes_are_scoped_to_owner(client, app):
+    source_path = _write_source(app)
+    with app.app_context():
+        job_id = create_job(1, 'upload.csv', source_path)
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = 2
+
+    assert client.get(f'/prediction/jobs/{job_id}').status_code == 404
+    assert client.get(f'/prediction/jobs/{job_id}/view').status_code == 404
+
+
+def test_async_upload_returns_job_id(client, app):
+    app.config['ASYNC_PREDICTIONS'] = True
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+
+    with patch('app.prediction.submit_job') as mock_submit:
+        response = client.post('/prediction/', data={
+            'action': 'upload',
+            'file': (io.BytesIO(b'id,Age\n1,30\n'), 'upload.csv')
+        }, content_type='multipart/form-data', headers={'Accept': 'application/json'})
+
+    assert response.status_code == 202
+    job_id = response.json['job_id']
+    mock_submit.assert_called_once()
+    with app.app_context():
+        job = get_db().execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        assert job['status'] == 'queued'
@@ -0,0 +1,81 @@
+import multiprocessing
+
+from limits import RateLimitItemPerMinute
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+from app import limiter_storage
+from app.limiter_storage import SQLiteStorage
+
+
+def _uri(tmp_path):
+    return f"sqlite:///{tmp_path / 'ratelimit.db'}"
+
+
+def test_registered_scheme(tmp_path):
+    assert isinstance(storage_from_string(_uri(tmp_path)), SQLiteStorage)
+
+
+def test_fixed_window_counts(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(limiter_storage.time, 'time', lambda: now[0])
+    storage = SQLiteStorage(_uri(tmp_path))
+
+    assert storage.incr('k', 60) == 1
+    assert storage.incr('k', 60, amount=2) == 3
+    assert storage.get('k') == 3
+    assert storage.get_expiry('k') == 1060.0
+    assert storage.get('outra') == 0
+
+    # Janela expirada: recomeça a contagem com nova expiração
+    now[0] = 1061.0
+    assert storage.get('k') == 0
+    assert storage.incr('k', 60) == 1
+    assert storage.get_expiry('k') == 1121.0
+
+    storage.clear('k')
+    assert storage.get('k') == 0
+    storage.incr('a', 60)
+    storage.incr('b', 60)
+    assert storage.reset() == 2
+    assert storage.check()
+
+
+def test_counts_shared_between_instances(tmp_path):
+    limit = RateLimitItemPerMinute(3)
+    worker_a = FixedWindowRateLimiter(SQLiteStorage(_uri(tmp_path)))
+    worker_b = FixedWindowRateLimiter(SQLiteStorage(_uri(tmp_path)))
+
+    assert worker_a.hit(limit, '127.0.0.1')
+    assert worker_b.hit(limit, '127.0.0.1')
+    assert worker_a.hit(limit, '127.0.0.1')
+    assert not worker_b.hit(limit, '127.0.0.1')
+
+
+def _hammer(uri, n):
+    storage = SQLiteStorage(uri)
+    for _ in range(n):
+        storage.incr('shared', 60)
+
+
+def test_concurrent_processes_do_not_lose_increments(tmp_path):
+    uri = _uri(tmp_path)
+    ctx = multiprocessing.get_context('fork')
+    procs = [ctx.Process(target=_hammer, args=(uri, 200)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert SQLiteStorage(uri).get('shared') == 800
+
+
+def test_app_uses_sqlite_storage(tmp_path, monkeypatch):
+    from app import create_app
+    monkeypatch.setenv('RATELIMIT_STORAGE_URI', _uri(tmp_path))
+    app = create_app(testing=True)
+    app.config['DATABASE'] = str(tmp_path / 'app.db')
+    assert isinstance(app.limiter.storage, SQLiteStorage)
+
+    client = app.test_client()
+    statuses = [client.get('/auth/login').status_code for _ in range(11)]
+    assert statuses == [200] * 10 + [429]
@@ -0,0 +1,111 @@
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder, StandardScaler
+from xgboost import XGBClassifier
+
+from app import model_registry
+
+
+@pytest.fixture
+def models_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 200
+    X = pd.DataFrame({
+        'Class': rng.choice(['Business', 'Eco', 'Eco Plus'], n),
+        'Age': rng.integers(7, 85, n),
+        'total_delay': rng.integers(0, 120, n)
+    })
+    y = np.where(X['Class'] == 'Business', 'satisfied', 'neutral or dissatisfied')
+
+    preprocessor = ColumnTransformer(
+        [('cat', OneHotEncoder(handle_unknown='ignore'), ['Class']),
+         ('num', StandardScaler(), ['Age', 'total_delay'])],
+        sparse_threshold=0
+    )
+    X_proc = preprocessor.fit_transform(X)
+    feature_columns = list(preprocessor.get_feature_names_out())
+    label_encoder = LabelEncoder().fit(y)
+    model = XGBClassifier(n_estimators=5, max_depth=2).fit(
+        pd.DataFrame(X_proc, columns=feature_columns), label_encoder.transform(y)
+    )
+
+    joblib.dump(model, tmp_path / 'xgb_final_model.pkl')
+    joblib.dump(preprocessor, tmp_path / 'preprocessor.pkl')
+    joblib.dump(label_encoder, tmp_path / 'label_encoder.pkl')
+    (tmp_path / 'feature_columns.json').write_text(json.dumps(feature_columns))
+    return tmp_path
+
+
+@pytest.fixture
+def registry(models_dir, monkeypatch):
+    monkeypatch.setattr(model_registry, 'MODELS_DIR', str(models_dir))
+    model_registry.reset_model_assets()
+    yield model_registry
+    model_registry.reset_model_assets()
+
+
+def test_feature_columns_loaded_as_list(models_dir):
+    assets = model_registry.load_model_assets(str(models_dir))
+    assert isinstance(assets.feature_columns, list)
+    assert assets.feature_columns[0].startswith('cat__')
+    assert assets.cluster_model is None
+
+
+def test_assets_are_loaded_once_per_process(registry, monkeypatch):
+    calls = []
+    load = registry.load_model_assets
+    monkeypatch.setattr(registry, 'load_model_assets', lambda: calls.append(1) or load())
+
+    first = registry.get_model_assets()
+    assert registry.get_model_assets() is first
+    assert len(calls) == 1
+
+
+def test_warm_up_reports_load_stats(registry):
+    registry.warm_up()
+    stats = registry.get_load_stats()
+    assert stats['load_seconds'] >= 0
+    assert stats['warmup_seconds'] >= 0
+    assert stats['rss_bytes'] > 0
+    assert set(stats['artifacts']) == {
+        'xgb_final_model.pkl', 'preprocessor.pkl', 'label_encoder.pkl', 'feature_columns.json'
+    }
+
+
+def test_model_version_follows_cached_assets(registry, models_dir, tmp_path_factory):
+    version = registry.model_version()
+    assert version and registry.get_model_assets().version == version
+
+    # Carregar outra pasta direto (sem o cache) não muda a versão em uso
+    other_dir = tmp_path_factory.mktemp('other_models')
+    for path in models_dir.iterdir():
+        (other_dir / path.name).write_bytes(path.read_bytes())
+    (other_dir / 'feature_columns.json').write_text(
+        json.dumps(registry.get_model_assets().feature_columns[::-1])
+    )
+    other = registry.load_model_assets(str(other_dir))
+    assert other.version != version
+    assert registry.model_version() == version
+
+
+def test_warm_up_uses_served_prediction_path(registry, monkeypatch):
+    calls = []
+    monkeypatch.setattr('app.pipeline.predict_frame', lambda *args, **kwargs: calls.append(args))
+    registry.warm_up()
+    assert len(calls) == 1
+    assert calls[0][1] is registry.get_model_assets().model
+
+
+def test_process_memory_reads_smaps_rollup():
+    try:
+        memory = model_registry.process_memory()
+    except OSError:
+        pytest.skip('smaps_rollup indisponível')
+    assert memory['rss'] > 0
+    assert 0 < memory['uss'] <= memory['rss']
+    assert memory['pss'] <= memory['rss']
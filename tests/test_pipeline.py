@@ -0,0 +1,188 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.features import SERVICE_COLS, engineer_features
+from app.pipeline import RunningAggregates, iter_csv_chunks
+from app.eda import build_sorted_correlation_table, sorted_correlation_pairs
+
+
+@pytest.fixture
+def passengers():
+    rng = np.random.default_rng(0)
+    n = 400
+    data = {
+        'id': np.arange(n),
+        'Age': rng.integers(7, 85, n),
+        'Flight Distance': rng.integers(50, 5000, n),
+        'Departure Delay in Minutes': rng.integers(0, 90, n),
+        'Arrival Delay in Minutes': rng.integers(0, 90, n).astype(float),
+    }
+    for col in SERVICE_COLS:
+        data[col] = rng.integers(0, 6, n)
+    df = pd.DataFrame(data)
+    df.loc[::17, 'Arrival Delay in Minutes'] = np.nan
+    engineer_features(df)
+    df['probability'] = rng.random(n)
+    df['prediction'] = np.where(df['probability'] > 0.5, 'satisfied', 'neutral or dissatisfied')
+    return df
+
+
+def _aggregate(df, n_chunks, charts=True):
+    agg = RunningAggregates(charts=charts)
+    for rows in np.array_split(np.arange(len(df)), n_chunks):
+        chunk = df.iloc[rows]
+        preds = (chunk['prediction'] == 'satisfied').astype(int).to_numpy()
+        agg.update(chunk, preds, chunk['probability'].to_numpy(), preds)
+    return agg
+
+
+def test_iter_csv_chunks(tmp_path, passengers):
+    path = tmp_path / 'upload.csv'
+    passengers.head(25).to_csv(path, index=False)
+    assert len(list(iter_csv_chunks(str(path)))) == 1
+    chunks = list(iter_csv_chunks(str(path), chunksize=10))
+    assert [len(c) for c in chunks] == [10, 10, 5]
+
+
+def test_running_aggregates_match_full_frame(passengers):
+    agg = _aggregate(passengers, 7)
+
+    assert agg.num_rows == len(passengers)
+    metrics = agg.metrics()
+    assert metrics['avg_total_delay'] == round(passengers['total_delay'].mean(), 2)
+    assert metrics['avg_service_entropy'] == round(passengers['service_entropy'].mean(), 4)
+    assert agg.prediction_counts.to_dict() == passengers['prediction'].value_counts().to_dict()
+    assert agg.proba_counts.sum() == len(passengers)
+    assert agg.accuracy() == 100.0
+    assert agg.roc_auc() == 100.0
+
+
+def test_summary_only_aggregates_skip_chart_tables(passengers):
+    agg = _aggregate(passengers, 3, charts=False)
+    assert agg.num_rows == len(passengers)
+    assert agg.metrics() == _aggregate(passengers, 3).metrics()
+    # Gráficos e correlação ficam a cargo do EDAEngine no modo completo
+    assert agg.age_table is None and agg.delay_table is None
+    assert agg.corr_cols is None and agg.rate_counts == {}
+    assert agg.proba_counts.sum() == 0
+
+
+def test_running_correlation_matches_pandas(passengers):
+    agg = _aggregate(passengers, 5)
+    streamed = sorted_correlation_pairs(agg.correlation_matrix())
+    expected = build_sorted_correlation_table(passengers)
+    assert streamed['Correlation'].tolist() == expected['Correlation'].tolist()
+
+
+def test_satisfaction_rates_bin_after_streaming(passengers):
+    agg = _aggregate(passengers, 3)
+    rates = agg.satisfaction_rates()
+    flag = (passengers['prediction'] == 'satisfied').astype(int)
+    expected = (flag.groupby(passengers['Cleanliness']).mean() * 100).round(1)
+    assert np.allclose(rates['Cleanliness'].to_numpy(), expected.to_numpy())
+    assert len(rates['Flight Distance_grupo']) == 5
+
+
+def test_assign_clusters_uses_pretrained_centroids(passengers):
+    from sklearn.cluster import KMeans
+    from app.pipeline import CLUSTER_FEATURES, assign_clusters, nearest_centroid
+
+    X = passengers[CLUSTER_FEATURES].to_numpy(dtype=float)
+    model = KMeans(n_clusters=3, random_state=42, n_init=10).fit(X)
+
+    assert (nearest_centroid(X, model.cluster_centers_) == model.predict(X)).all()
+
+    chunk = passengers.head(50).copy()
+    assert assign_clusters(chunk, model) is model
+    assert (chunk['cluster'].to_numpy() == model.predict(X[:50])).all()
+
+
+def test_sorted_correlation_pairs_upper_triangle_and_top_n(passengers):
+    num = passengers.select_dtypes(include=['number'])
+    table = build_sorted_correlation_table(passengers)
+
+    pairs = list(zip(table['Feature 1'], table['Feature 2']))
+    assert len(pairs) == len({frozenset(p) for p in pairs})
+    assert all(a != b for a, b in pairs)
+    assert table['Correlation'].is_monotonic_decreasing
+    assert (table['Correlation'] >= 0.1).all()
+    a, b = pairs[0]
+    assert table['Correlation'].iloc[0] == round(abs(num[a].corr(num[b])), 2)
+
+    top = build_sorted_correlation_table(passengers, top_n=5)
+    assert top.equals(table.head(5))
+
+
+def test_predict_frame_single_pass_matches_model_predict(model_assets):
+    from tests.conftest import make_passengers
+    from app.pipeline import predict_frame
+
+    model, preprocessor, label_encoder, feature_columns, _ = model_assets
+    df = engineer_features(make_passengers(300, seed=3))
+    X = pd.DataFrame(
+        preprocessor.transform(df.drop(columns=['id', 'satisfaction', 'age_group', 'delay_category'])),
+        columns=feature_columns
+    )
+
+    preds, probas = predict_frame(df, *model_assets[:4])
+    assert (preds == model.predict(X)).all()
+    assert np.allclose(probas, model.predict_proba(X)[:, 1])
+    assert (df['prediction'] == label_encoder.inverse_transform(model.predict(X))).all()
+
+    strict, _ = predict_frame(df.copy(), *model_assets[:4], threshold=0.9)
+    assert (strict == (probas > 0.9)).all()
+    assert strict.sum() <= preds.sum()
+
+
+def test_process_upload_streaming_matches_full_mode(app, model_assets, tmp_path):
+    import pyarrow.parquet as pq
+    from tests.conftest import make_passengers
+    from app.database import get_db
+    from app.pipeline import process_upload
+
+    path = tmp_path / 'upload.csv'
+    make_passengers(230, seed=5).to_csv(path, index=False)
+
+    with app.app_context():
+        full = process_upload(str(path), 'upload.csv', 1, assets=model_assets)
+        streamed = process_upload(str(path), 'upload.csv', 1, assets=model_assets, chunksize=50)
+
+        db = get_db()
+        for context in (full, streamed):
+            assert tuple(db.execute('SELECT num_rows, processed FROM uploads WHERE id = ?',
+                                    (context['upload_id'],)).fetchone()) == (230, 1)
+            assert db.execute('SELECT COUNT(*) FROM predictions WHERE upload_id = ?',
+                              (context['upload_id'],)).fetchone()[0] == 230
+            result = pq.ParquetFile(os.path.join(app.config['UPLOAD_FOLDER'], context['filename']))
+            assert result.metadata.num_rows == 230
+
+    # Um row group por chunk gravado
+    assert result.num_row_groups == 5
+    for key in ['num_passengers', 'satisfaction_rate', 'avg_proba', 'accuracy', 'avg_total_delay',
+                'avg_delay_ratio', 'delay_indicator_rate', 'avg_service_score',
+                'avg_service_consistency', 'avg_service_entropy']:
+        assert streamed[key] == pytest.approx(full[key], abs=0.01), key
+    # A AUC do modo streaming é aproximada por histogramas
+    assert streamed['roc_auc'] == pytest.approx(full['roc_auc'], abs=0.5)
+    assert streamed['graph_html'] and streamed['tables'] and streamed['pizza_imgs']
+
+
+def test_process_upload_failure_leaves_nothing_behind(app, model_assets, tmp_path):
+    from tests.conftest import make_passengers
+    from app.database import get_db
+    from app.pipeline import process_upload
+
+    path = tmp_path / 'upload.csv'
+    make_passengers(120, seed=6).drop(columns=['Age']).to_csv(path, index=False)
+
+    with app.app_context():
+        with pytest.raises(KeyError):
+            process_upload(str(path), 'upload.csv', 1, assets=model_assets, chunksize=50)
+
+        db = get_db()
+        assert db.execute('SELECT COUNT(*) FROM uploads').fetchone()[0] == 0
+        assert db.execute('SELECT COUNT(*) FROM predictions').fetchone()[0] == 0
+    assert not [name for name in os.listdir(app.config['UPLOAD_FOLDER']) if name.endswith('.parquet')]
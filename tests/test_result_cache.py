@@ -0,0 +1,116 @@
+import io
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.database import get_db
+from app.result_cache import ResultCache, content_digest, get_result_cache
+from tests.conftest import make_passengers
+
+
+@pytest.fixture
+def cache_app(app, tmp_path):
+    app.config['RESULT_CACHE_ENABLED'] = True
+    app.config['RESULT_CACHE_DIR'] = str(tmp_path / 'cache')
+    return app
+
+
+def _fake_upload(app, num_rows=3):
+    filename = f'{time.time_ns()}_predictions.csv'
+    with open(os.path.join(app.config['UPLOAD_FOLDER'], filename), 'w') as f:
+        f.write('id,prediction\n' + ''.join(f'{i},satisfied\n' for i in range(num_rows)))
+    conn = get_db()
+    upload_id = conn.execute(
+        'INSERT INTO uploads (user_id, filename, original_filename, processed, num_rows) VALUES (1, ?, ?, 1, ?)',
+        (filename, 'a.csv', num_rows)
+    ).lastrowid
+    conn.executemany(
+        'INSERT INTO predictions (upload_id, passenger_id, prediction, probability) VALUES (?, ?, ?, ?)',
+        [(upload_id, str(i), 'satisfied', 0.9) for i in range(num_rows)]
+    )
+    conn.commit()
+    return {'filename': filename, 'num_passengers': num_rows, 'graph_html': '<div></div>'}, upload_id
+
+
+def test_store_and_restore_copies_upload(cache_app):
+    with cache_app.app_context():
+        cache = get_result_cache()
+        context, upload_id = _fake_upload(cache_app)
+        key = cache.key('abc', 'v1', threshold=0.5)
+
+        assert cache.restore(key, 2, 'a.csv') is None
+        cache.store(key, context, upload_id)
+        restored = cache.restore(key, 2, 'again.csv')
+
+        assert restored['graph_html'] == '<div></div>'
+        assert restored['filename'] != context['filename']
+        assert os.path.exists(os.path.join(cache_app.config['UPLOAD_FOLDER'], restored['filename']))
+        conn = get_db()
+        new_upload = conn.execute('SELECT * FROM uploads WHERE filename = ?', (restored['filename'],)).fetchone()
+        assert new_upload['user_id'] == 2 and new_upload['num_rows'] == 3
+        assert restored['upload_id'] == new_upload['id'] != upload_id
+        assert conn.execute('SELECT COUNT(*) FROM predictions WHERE upload_id = ?',
+                            (new_upload['id'],)).fetchone()[0] == 3
+        assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_restore_discards_entry_when_source_predictions_are_gone(cache_app):
+    with cache_app.app_context():
+        cache = get_result_cache()
+        context, upload_id = _fake_upload(cache_app)
+        cache.store('k', context, upload_id)
+        get_db().execute('DELETE FROM predictions WHERE upload_id = ?', (upload_id,))
+        get_db().commit()
+
+        assert cache.restore('k', 1, 'a.csv') is None
+        assert cache.stats()['entries'] == 0
+
+
+def test_lru_eviction_by_size(cache_app, tmp_path):
+    with cache_app.app_context():
+        cache = ResultCache(str(tmp_path / 'lru'), max_bytes=10**9)
+        entries = []
+        for i in range(3):
+            entries.append(_fake_upload(cache_app, num_rows=300))
+            cache.store(f'k{i}', *entries[-1])
+            os.utime(os.path.join(cache.directory, f'k{i}'), (i, i))
+        cache.max_bytes = cache.stats()['bytes'] - 1
+
+        # k0 foi usada por último; a mais antiga passa a ser k1
+        os.utime(os.path.join(cache.directory, 'k0'))
+        cache.evict()
+        assert sorted(os.listdir(cache.directory)) == ['k0', 'k2']
+        assert cache.stats()['evictions'] == 1
+
+
+def test_content_digest_for_path_and_upload(tmp_path):
+    from werkzeug.datastructures import FileStorage
+    path = tmp_path / 'a.csv'
+    path.write_bytes(b'id,Age\n1,30\n')
+    upload = FileStorage(io.BytesIO(b'id,Age\n1,30\n'), 'a.csv')
+    assert content_digest(str(path)) == content_digest(upload)
+    assert upload.stream.tell() == 0
+
+
+def test_reupload_skips_processing(cache_app, client, model_assets, monkeypatch):
+    monkeypatch.setattr('app.pipeline.get_model_assets', lambda: model_assets)
+    monkeypatch.setattr('app.prediction.model_version', lambda: 'v1')
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    data = make_passengers(50).to_csv(index=False).encode()
+
+    from app.pipeline import process_upload
+    with patch('app.prediction.process_upload', wraps=process_upload) as mock_process:
+        for _ in range(2):
+            response = client.post('/prediction/', data={
+                'action': 'upload', 'file': (io.BytesIO(data), 'upload.csv')
+            }, content_type='multipart/form-data')
+            assert response.status_code == 200
+        assert mock_process.call_count == 1
+
+    stats = client.get('/prediction/cache/stats').json
+    assert stats['hits'] == 1 and stats['misses'] == 1
+    with cache_app.app_context():
+        assert get_db().execute('SELECT COUNT(*) FROM uploads').fetchone()[0] == 2
@@ -5,3 +5,14 @@ def test_protected_route_requires_login(client):
     response = client.get(protected_url, follow_redirects=False)
     assert response.status_code == 302  # deve redirecionar para login quando não autenticado
 
+
+
+def test_plotly_js_is_served_with_long_cache(client):
+    response = client.get('/prediction/assets/plotly.min.js?v=1')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/javascript'
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+
+    etag = response.headers['ETag']
+    response = client.get('/prediction/assets/plotly.min.js?v=1', headers={'If-None-Match': etag})
+    assert response.status_code == 304
@@ -0,0 +1,260 @@
+import gzip
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.features import engineer_features
+from app.database import get_db
+from app.storage import ResultWriter, export_in_background, iter_csv, prune_exports, read_page
+from tests.conftest import make_passengers
+
+
+def _write_chunks(path, df, n_chunks):
+    with ResultWriter(str(path)) as writer:
+        for rows in np.array_split(np.arange(len(df)), n_chunks):
+            writer.write(df.iloc[rows])
+
+
+def test_parquet_round_trip_matches_pandas_csv(tmp_path):
+    df = make_passengers(300)
+    df.loc[::11, 'Arrival Delay in Minutes'] = np.nan
+    engineer_features(df)
+    df['prediction'] = np.where(df['Age'] > 40, 'satisfied', 'neutral or dissatisfied')
+    path = tmp_path / 'result.parquet'
+    _write_chunks(path, df, 4)
+
+    # O download é idêntico ao CSV que o pandas gravaria diretamente
+    streamed = b''.join(iter_csv(str(path), batch_rows=64))
+    assert streamed == df.to_csv(index=False).encode()
+
+
+def test_csv_has_single_header_and_empty_file_keeps_it(tmp_path):
+    df = pd.DataFrame({'id': [1, 2, 3], 'prediction': ['a', 'b, c', 'a']})
+    path = tmp_path / 'result.parquet'
+    _write_chunks(path, df, 3)
+    text = b''.join(iter_csv(str(path), batch_rows=1)).decode()
+    assert text.splitlines() == ['id,prediction', '1,a', '2,"b, c"', '3,a']
+
+    empty = tmp_path / 'empty.parquet'
+    with ResultWriter(str(empty)) as writer:
+        writer.write(df.head(0))
+    assert b''.join(iter_csv(str(empty))) == b'id,prediction\n'
+
+
+def test_download_streams_csv_from_parquet(app, client):
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    filename = 'abc_predictions.parquet'
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    _write_chunks(os.path.join(app.config['UPLOAD_FOLDER'], filename),
+                  pd.DataFrame({'id': [1, 2], 'prediction': ['x', 'y']}), 1)
+
+    response = client.get(f'/history/download/{filename}')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'abc_predictions.csv' in response.headers['Content-Disposition']
+    assert response.get_data(as_text=True) == 'id,prediction\n1,x\n2,y\n'
+
+
+def _parquet_download(app, client, filename='etag_predictions.parquet'):
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    df = pd.DataFrame({'id': range(200), 'prediction': ['satisfied', 'neutral'] * 100})
+    _write_chunks(os.path.join(app.config['UPLOAD_FOLDER'], filename), df, 2)
+    return f'/history/download/{filename}', df.to_csv(index=False).encode()
+
+
+def test_download_conditional_get(app, client):
+    url, _ = _parquet_download(app, client)
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers['ETag'] and first.headers['Last-Modified']
+
+    assert client.get(url, headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+    assert client.get(url, headers={'If-Modified-Since': first.headers['Last-Modified']}).status_code == 304
+    assert client.get(url, headers={'If-None-Match': '"outro"'}).status_code == 200
+
+
+def test_download_gzip_stream(app, client):
+    url, expected = _parquet_download(app, client)
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == expected
+    # A representação comprimida tem ETag própria
+    assert response.headers['ETag'] != client.get(url).headers['ETag']
+
+
+def _wait_for_exports():
+    for thread in threading.enumerate():
+        if thread.name == 'csv-export':
+            thread.join(timeout=10)
+
+
+def test_download_range_resumes(app, client):
+    url, expected = _parquet_download(app, client)
+    etag = client.get(url).headers['ETag']
+
+    # Sem exportação pronta o Range é ignorado (arquivo inteiro) e o CSV é gerado em background
+    first = client.get(url, headers={'Range': 'bytes=100-', 'If-Range': etag})
+    assert first.status_code == 200 and first.data == expected
+    _wait_for_exports()
+
+    response = client.get(url, headers={'Range': 'bytes=100-', 'If-Range': etag})
+    assert response.status_code == 206
+    assert response.data == expected[100:]
+    assert response.headers['Content-Range'] == f'bytes 100-{len(expected) - 1}/{len(expected)}'
+    assert response.headers['ETag'] == etag
+    response.close()
+
+    # If-Range desatualizado: o arquivo inteiro é reenviado
+    stale = client.get(url, headers={'Range': 'bytes=100-', 'If-Range': '"antigo"'})
+    assert stale.status_code == 200 and stale.data == expected
+    stale.close()
+
+
+def test_exports_replace_old_versions_and_stay_under_the_size_limit(tmp_path):
+    source = str(tmp_path / 'r_predictions.parquet')
+    _write_chunks(source, pd.DataFrame({'id': range(100), 'prediction': ['x'] * 100}), 1)
+    exports = str(tmp_path / 'downloads')
+    os.makedirs(exports)
+    size = len(b''.join(iter_csv(source)))
+
+    # Versão anterior do mesmo resultado e exportações de outros resultados, a mais antiga primeiro
+    for i, name in enumerate(['r_predictions-old-1.csv', 'a-1.csv', 'b-1.csv']):
+        path = os.path.join(exports, name)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    export_in_background(source, exports, 'r_predictions', 'new-2', max_bytes=2 * size).join()
+    assert sorted(os.listdir(exports)) == ['b-1.csv', 'r_predictions-new-2.csv']
+    assert prune_exports(exports, max_bytes=size) == 1
+    assert os.listdir(exports) == ['r_predictions-new-2.csv']
+
+
+def test_download_legacy_csv_gzip(app, client):
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    with open(os.path.join(app.config['UPLOAD_FOLDER'], 'old_predictions.csv'), 'wb') as f:
+        f.write(b'id,prediction\n1,x\n')
+    response = client.get('/history/download/old_predictions.csv', headers={'Accept-Encoding': 'gzip'})
+    assert gzip.decompress(response.data) == b'id,prediction\n1,x\n'
+
+
+def _scored_result(path, n=500, n_chunks=3):
+    df = pd.DataFrame({
+        'id': range(n),
+        'Gender': ['Female', 'Male'] * (n // 2),
+        'satisfaction_flag': [0, 1] * (n // 2),
+        'prediction': ['satisfied', 'neutral or dissatisfied'] * (n // 2),
+        'probability': np.linspace(0, 1, n)[::-1],
+        'Age': np.arange(n) % 70,
+    })
+    df.loc[3, 'probability'] = np.nan
+    df['Age'] = df['Age'].astype('category')
+    _write_chunks(path, df, n_chunks)
+    return df
+
+
+def test_read_page_slices_sorts_and_searches(tmp_path):
+    path = str(tmp_path / 'result.parquet')
+    df = _scored_result(path)
+
+    # Colunas na ordem da tabela: rótulos no final, flag escondida
+    total, filtered, rows = read_page(path, 198, 4)
+    assert (total, filtered) == (500, 500)
+    assert [row[0] for row in rows] == [198, 199, 200, 201]
+    assert len(rows[0]) == 5 and rows[0][-2:] == ['satisfied', df['probability'][198]]
+    assert read_page(path, 3, 1)[2][0][-1] is None  # NaN vira null no JSON
+
+    # Ordenação sobre o arquivo inteiro (nulos no fim), não só na página
+    _, _, rows = read_page(path, 0, 3, order=('probability', False))
+    assert [row[0] for row in rows] == [499, 498, 497]
+    _, _, rows = read_page(path, 498, 5, order=('probability', False))
+    assert [row[0] for row in rows] == [0, 3]
+    _, _, rows = read_page(path, 0, 2, order=('Age', True))
+    assert [row[2] for row in rows] == [69, 69]
+
+    # Empates seguem a ordem do arquivo, na seleção parcial e na ordenação completa
+    expected = df.sort_values('Gender', kind='stable')['id'].tolist()
+    _, _, first = read_page(path, 0, 30, order=('Gender', False))
+    _, _, last = read_page(path, 480, 30, order=('Gender', False))
+    assert [row[0] for row in first] == expected[:30]
+    assert [row[0] for row in last] == expected[480:]
+
+    # Busca sem diferenciar maiúsculas, combinada com ordenação e paginação
+    total, filtered, rows = read_page(path, 10, 5, order=('id', True), search='FEMALE')
+    assert (total, filtered) == (500, 250)
+    assert [row[0] for row in rows] == [478, 476, 474, 472, 470]
+    assert read_page(path, 0, 10, search='nada disso')[1:] == (0, [])
+    assert read_page(path, 600, 10)[2] == []
+
+
+def test_read_page_search_scans_in_batches(tmp_path, monkeypatch):
+    path = str(tmp_path / 'result.parquet')
+    df = _scored_result(path)
+    expected = read_page(path, 5, 20, order=('Age', True), search='female')
+
+    # Lotes bem menores que o arquivo: o resultado não muda
+    monkeypatch.setattr('app.storage.ROW_GROUP_ROWS', 64)
+    assert read_page(path, 5, 20, order=('Age', True), search='female') == expected
+    total, filtered, rows = read_page(path, 0, 500, search='female')
+    assert (total, filtered) == (500, 250)
+    assert [row[0] for row in rows] == df.loc[df['Gender'] == 'Female', 'id'].tolist()
+    assert read_page(path, 0, 10, order=('Age', False), search='nada disso')[1:] == (0, [])
+
+
+def test_results_data_endpoint(app, client):
+    filename = 'dt_predictions.parquet'
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    _scored_result(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+    with app.app_context():
+        db = get_db()
+        owner = db.execute("INSERT INTO users (username, email, password_hash) VALUES ('dt', 'dt@x.com', 'x')").lastrowid
+        other = db.execute("INSERT INTO users (username, email, password_hash) VALUES ('ot', 'ot@x.com', 'x')").lastrowid
+        db.execute("INSERT INTO uploads (user_id, filename, original_filename, processed, num_rows) "
+                   "VALUES (?, ?, 'test.csv', 1, 500)", (owner, filename))
+        db.commit()
+
+    with client.session_transaction() as sess:
+        sess['user_id'] = owner
+    url = f'/prediction/results/{filename}/data'
+    response = client.get(url, query_string={
+        'draw': '3', 'start': '20', 'length': '10', 'search[value]': 'male',
+        'order[0][column]': '0', 'order[0][dir]': 'desc',
+    })
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['draw'] == 3
+    assert (payload['recordsTotal'], payload['recordsFiltered']) == (500, 500)
+    assert [row[0] for row in payload['data']] == list(range(479, 469, -1))
+
+    # Página limitada mesmo pedindo todas as linhas (length=-1)
+    assert len(client.get(url, query_string={'length': '-1'}).get_json()['data']) == 100
+
+    # Resultado de outro usuário ou inexistente
+    with client.session_transaction() as sess:
+        sess['user_id'] = other
+    assert client.get(url).status_code == 404
+    assert client.get('/prediction/results/nao_existe.parquet/data').status_code == 404
+
+
+def test_results_page_uses_server_side_table(app):
+    from app.prediction import _render_results
+    filename = 'page_predictions.parquet'
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    _scored_result(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+    context = {
+        'filename': filename, 'tables': [], 'pizza_imgs': {},
+        'avg_service_entropy': None, 'accuracy': None, 'roc_auc': None,
+    }
+    with app.test_request_context('/prediction/'):
+        html = _render_results(context)
+    assert 'data-url="/prediction/results/page_predictions.parquet/data"' in html
+    assert '<th>id</th><th>Gender</th><th>Age</th><th>prediction</th><th>probability</th>' in html
+    assert 'satisfaction_flag' not in html